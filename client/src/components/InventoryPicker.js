@@ -0,0 +1,81 @@
+import React, { useState, useEffect } from 'react';
+import { useQuery } from 'react-query';
+import { inventoryAPI } from '../services/api';
+
+// Wait this long after the last keystroke before searching
+const SEARCH_DELAY_MS = 200;
+const SEARCH_LIMIT = 20;
+
+// Type-ahead over the shop's inventory through /api/inventory/search, so the
+// billing screen never has to load the whole catalog
+const InventoryPicker = ({ selectedName = '', onSelect }) => {
+  const [text, setText] = useState(selectedName);
+  const [term, setTerm] = useState('');
+  const [open, setOpen] = useState(false);
+
+  useEffect(() => {
+    setText(selectedName);
+  }, [selectedName]);
+
+  useEffect(() => {
+    const timer = setTimeout(() => setTerm(text.trim()), SEARCH_DELAY_MS);
+    return () => clearTimeout(timer);
+  }, [text]);
+
+  const { data, isFetching } = useQuery(
+    ['inventory-search', term],
+    () => inventoryAPI.search(term, SEARCH_LIMIT),
+    { enabled: open && term.length > 0, keepPreviousData: true, staleTime: 30000 }
+  );
+  const matches = Array.isArray(data?.data?.data) ? data.data.data : [];
+
+  const choose = (item) => {
+    setText(item.name);
+    setOpen(false);
+    onSelect(item);
+  };
+
+  return (
+    <div className="relative w-full">
+      <input
+        type="text"
+        value={text}
+        onChange={(e) => {
+          setText(e.target.value);
+          setOpen(true);
+        }}
+        onFocus={() => setOpen(true)}
+        onBlur={() => setOpen(false)}
+        placeholder="Search inventory or enter custom below"
+        className="w-full rounded-lg border border-gray-300 px-3 py-2 focus:outline-none focus:ring-2 focus:ring-primary-500"
+      />
+      {open && term.length > 0 && (
+        <ul className="absolute z-10 mt-1 w-full max-h-60 overflow-auto rounded-lg border border-gray-200 bg-white shadow-lg">
+          {matches.map(item => (
+            <li
+              key={item.id}
+              // Keep the input focused so the list stays open for the click
+              onMouseDown={(e) => e.preventDefault()}
+              onClick={() => choose(item)}
+              className="px-3 py-2 text-sm cursor-pointer hover:bg-gray-100"
+            >
+              <div className="font-medium text-gray-900">{item.name}</div>
+              <div className="text-xs text-gray-500">
+                {[item.manufacturer, item.batch_number && `Batch ${item.batch_number}`, `Stock ${item.quantity}`]
+                  .filter(Boolean)
+                  .join(' · ')}
+              </div>
+            </li>
+          ))}
+          {matches.length === 0 && (
+            <li className="px-3 py-2 text-sm text-gray-500">
+              {isFetching ? 'Searching...' : 'No matching items'}
+            </li>
+          )}
+        </ul>
+      )}
+    </div>
+  );
+};
+
+export default InventoryPicker;
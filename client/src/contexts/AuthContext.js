@@ -71,7 +71,9 @@ export const AuthProvider = ({ children }) => {
 
   const changePassword = async (passwordData) => {
     try {
-      await authAPI.changePassword(passwordData);
+      const response = await authAPI.changePassword(passwordData);
+      // Tokens issued before the change no longer work
+      localStorage.setItem('token', response.data.token);
       toast.success('Password changed successfully!');
       return { success: true };
     } catch (error) {
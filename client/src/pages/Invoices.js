@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { useQuery, useMutation, useQueryClient } from 'react-query';
-import { invoicesAPI, customersAPI, inventoryAPI } from '../services/api';
+import { invoicesAPI, customersAPI } from '../services/api';
 import { 
   Plus, 
   Search, 
@@ -15,6 +15,7 @@ import {
   Clock
 } from 'lucide-react';
 import LoadingSpinner from '../components/LoadingSpinner';
+import InventoryPicker from '../components/InventoryPicker';
 import toast from 'react-hot-toast';
 
 // Add GST rates constant
@@ -69,11 +70,6 @@ const Invoices = () => {
     customersAPI.getAll()
   );
 
-  // Fetch inventory for items
-  const { data: inventory } = useQuery('inventory', () =>
-    inventoryAPI.getAll()
-  );
-
   // Fetch invoices statistics
   const { data: stats } = useQuery('invoices-stats', () =>
     invoicesAPI.getStats()
@@ -288,9 +284,8 @@ const Invoices = () => {
     return <div className="text-red-600">Error loading invoices: {error.message}</div>;
   }
 
-  // Get customers and inventory arrays
+  // Get customers array
   const customersArray = Array.isArray(customers?.data?.data) ? customers.data.data : [];
-  const inventoryArray = Array.isArray(inventory?.data?.data) ? inventory.data.data : [];
 
   // Payment methods
   const paymentMethods = [
@@ -722,32 +717,14 @@ const Invoices = () => {
                         <div>
                           <label className="block text-xs font-medium text-gray-700 mb-1">Item</label>
                           <div className="flex gap-2">
-                            <select
-                              value={item.inventory_id || ''}
-                              onChange={(e) => {
-                                const selectedId = e.target.value;
-                                if (selectedId) {
-                                  const inventoryItem = inventoryArray.find(inv => inv.id === parseInt(selectedId));
-                                  updateItem(index, {
-                                    inventory_id: parseInt(selectedId),
-                                    item_text: inventoryItem.name,
-                                    unit_price: inventoryItem.unit_price
-                                  });
-                                } else {
-                                  updateItem(index, {
-                                    inventory_id: null,
-                                    item_text: '',
-                                    unit_price: 0
-                                  });
-                                }
-                              }}
-                              className="w-full rounded-lg border border-gray-300 px-3 py-2 focus:outline-none focus:ring-2 focus:ring-primary-500"
-                            >
-                              <option value="">Select Item or Enter Custom</option>
-                              {inventoryArray.map(inv => (
-                                <option key={inv.id} value={inv.id}>{inv.name}</option>
-                              ))}
-                            </select>
+                            <InventoryPicker
+                              selectedName={item.inventory_id ? item.item_text : ''}
+                              onSelect={(inventoryItem) => updateItem(index, {
+                                inventory_id: inventoryItem.id,
+                                item_text: inventoryItem.name,
+                                unit_price: inventoryItem.unit_price
+                              })}
+                            />
                           </div>
                         </div>
                         
@@ -37,6 +37,22 @@ api.interceptors.response.use(
   }
 );
 
+// List endpoints return one page at a time with a next_cursor; follow it
+// to the end and answer like a single response carrying every row
+const PAGE_LIMIT = 500;
+
+const getAllPages = async (url, params) => {
+  const rows = [];
+  let cursor;
+  let response;
+  do {
+    response = await api.get(url, { params: { limit: PAGE_LIMIT, ...params, cursor } });
+    rows.push(...(response.data?.data || []));
+    cursor = response.data?.next_cursor;
+  } while (cursor);
+  return { ...response, data: { ...response.data, data: rows, next_cursor: null } };
+};
+
 // Auth API
 export const authAPI = {
   login: (credentials) => api.post('/auth/login', credentials),
@@ -47,8 +63,9 @@ export const authAPI = {
 
 // Inventory API
 export const inventoryAPI = {
-  getAll: (params) => api.get('/inventory', { params }),
+  getAll: (params) => getAllPages('/inventory', params),
   getById: (id) => api.get(`/inventory/${id}`),
+  search: (q, limit) => api.get('/inventory/search', { params: { q, limit } }),
   create: (data) => api.post('/inventory', data),
   update: (id, data) => api.put(`/inventory/${id}`, data),
   delete: (id) => api.delete(`/inventory/${id}`),
@@ -59,7 +76,7 @@ export const inventoryAPI = {
 
 // Purchase Orders API
 export const purchaseOrdersAPI = {
-  getAll: (params) => api.get('/purchase-orders', { params }),
+  getAll: (params) => getAllPages('/purchase-orders', params),
   getById: (id) => api.get(`/purchase-orders/${id}`),
   create: (data) => api.post('/purchase-orders', data),
   updateStatus: (id, status) => api.patch(`/purchase-orders/${id}/status`, { status }),
@@ -70,7 +87,7 @@ export const purchaseOrdersAPI = {
 
 // Invoices API
 export const invoicesAPI = {
-  getAll: (params) => api.get('/invoices', { params }),
+  getAll: (params) => getAllPages('/invoices', params),
   getById: (id) => api.get(`/invoices/${id}`),
   create: (data) => api.post('/invoices', data),
   updateStatus: (id, status) => api.patch(`/invoices/${id}/status`, { status }),
@@ -81,7 +98,7 @@ export const invoicesAPI = {
 
 // Bills API
 export const billsAPI = {
-  getAll: (params) => api.get('/bills', { params }),
+  getAll: (params) => getAllPages('/bills', params),
   getById: (id) => api.get(`/bills/${id}`),
   create: (data) => api.post('/bills', data),
   update: (id, data) => api.put(`/bills/${id}`, data),
@@ -91,7 +108,7 @@ export const billsAPI = {
 
 // Customers API
 export const customersAPI = {
-  getAll: (params) => api.get('/customers', { params }),
+  getAll: (params) => getAllPages('/customers', params),
   getById: (id) => api.get(`/customers/${id}`),
   create: (data) => api.post('/customers', data),
   update: (id, data) => api.put(`/customers/${id}`, data),
@@ -100,7 +117,7 @@ export const customersAPI = {
 
 // Staff API
 export const staffAPI = {
-  getAll: (params) => api.get('/staff', { params }),
+  getAll: (params) => getAllPages('/staff', params),
   getById: (id) => api.get(`/staff/${id}`),
   create: (data) => api.post('/staff', data),
   update: (id, data) => api.put(`/staff/${id}`, data),
@@ -109,7 +126,7 @@ export const staffAPI = {
 
 // Wholesalers API
 export const wholesalersAPI = {
-  getAll: (params) => api.get('/wholesalers', { params }),
+  getAll: (params) => getAllPages('/wholesalers', params),
   getById: (id) => api.get(`/wholesalers/${id}`),
   create: (data) => api.post('/wholesalers', data),
   update: (id, data) => api.put(`/wholesalers/${id}`, data),
@@ -118,7 +135,7 @@ export const wholesalersAPI = {
 
 // Categories API
 export const categoriesAPI = {
-  getAll: () => api.get('/categories'),
+  getAll: () => getAllPages('/categories'),
 };
 
 // Dashboard API
@@ -16,6 +16,29 @@ echo "🚀 Starting deployment process..."
 echo "📦 Building and deploying backend..."
 cd server
 gcloud builds submit --tag gcr.io/$PROJECT_ID/medicine-shop-backend .
+
+# Instances never change the schema; they wait until it matches their build.
+# Some migrations rewrite or lock large tables, so run them deliberately,
+# at a quiet hour: RUN_MIGRATIONS=true ./deploy-cloud.sh
+if [ "$RUN_MIGRATIONS" = "true" ]; then
+  echo "🗄️ Applying database migrations..."
+  gcloud run jobs deploy medicine-shop-migrate \
+    --image gcr.io/$PROJECT_ID/medicine-shop-backend \
+    --region $REGION \
+    --set-cloudsql-instances $PROJECT_ID:$REGION:$DB_INSTANCE \
+    --set-env-vars "DB_HOST=/cloudsql/$PROJECT_ID:$REGION:$DB_INSTANCE" \
+    --set-env-vars "DB_NAME=$DB_NAME" \
+    --set-env-vars "DB_USER=$DB_USER" \
+    --set-env-vars "DB_PORT=5432" \
+    --task-timeout 24h \
+    --max-retries 0 \
+    --command python \
+    --args run_migrations.py
+  gcloud run jobs execute medicine-shop-migrate --region $REGION --wait
+fi
+
+# A revision gets traffic once /api/ready answers (database up, schema
+# current); /api/health only checks that the process is alive
 gcloud run deploy medicine-shop-backend \
   --image gcr.io/$PROJECT_ID/medicine-shop-backend \
   --platform managed \
@@ -25,6 +48,8 @@ gcloud run deploy medicine-shop-backend \
   --set-env-vars "DB_NAME=$DB_NAME" \
   --set-env-vars "DB_USER=$DB_USER" \
   --set-env-vars "DB_PORT=5432" \
+  --startup-probe httpGet.path=/api/ready,periodSeconds=10,timeoutSeconds=5,failureThreshold=24 \
+  --liveness-probe httpGet.path=/api/health,periodSeconds=30,timeoutSeconds=5,failureThreshold=3 \
   --allow-unauthenticated
 
 # Build and deploy frontend
@@ -0,0 +1,38 @@
+import os
+import statistics
+import time
+from typing import Awaitable, Callable, List
+
+import asyncpg
+
+async def connect_pool() -> asyncpg.Pool:
+    """Create a pool for a local benchmark database from the DB_* environment"""
+    return await asyncpg.create_pool(
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=int(os.getenv('DB_PORT', '5432')),
+        database=os.getenv('DB_NAME', 'medicine_shop'),
+        user=os.getenv('DB_USER', 'postgres'),
+        password=os.getenv('DB_PASSWORD', ''),
+        min_size=1,
+        max_size=4,
+        # Benchmarks act as one shop; rows they insert take this tenant
+        server_settings={'app.tenant_id': os.getenv('BENCHMARK_TENANT_ID', '1')}
+    )
+
+async def time_async(fn: Callable[[], Awaitable], repeat: int) -> List[float]:
+    """Run an async callable repeatedly and return each run's latency in ms"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def summarize(label: str, timings: List[float]) -> str:
+    """Format median/p95/max latency for a list of ms timings"""
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return (
+        f"{label:<28} n={len(ordered):<5} median={statistics.median(ordered):8.2f} ms  "
+        f"p95={p95:8.2f} ms  max={ordered[-1]:8.2f} ms"
+    )
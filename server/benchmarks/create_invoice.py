@@ -0,0 +1,62 @@
+"""
+Benchmark POST /api/invoices checkout latency for 1, 10 and 100 line items.
+
+Runs the create_invoice route against a local database configured through
+DB_HOST/DB_PORT/DB_NAME/DB_USER/DB_PASSWORD. Every invoice is created inside
+a transaction that is rolled back, so the database is left unchanged.
+
+    cd server && python -m benchmarks.create_invoice --repeat 50
+"""
+
+import argparse
+import asyncio
+
+import database
+from routers.invoices import Invoice, create_invoice
+from benchmarks.common import connect_pool, time_async, summarize
+
+class _Rollback(Exception):
+    pass
+
+async def main(repeat: int):
+    database.pool = await connect_pool()
+    async with database.pool.acquire() as conn:
+        inventory_ids = [
+            row['id'] for row in await conn.fetch(
+                'SELECT id FROM inventory ORDER BY id LIMIT 100'
+            )
+        ]
+        if not inventory_ids:
+            raise SystemExit("Seed the inventory table before running this benchmark")
+
+        for line_count in (1, 10, 100):
+            payload = {
+                "customer": {"customer_name": "Benchmark", "customer_phone": "0000000000"},
+                "items": [
+                    {
+                        "inventory_id": inventory_ids[idx % len(inventory_ids)],
+                        "quantity": 1,
+                        "unit_price": 10.0,
+                        "gst_percentage": 12
+                    }
+                    for idx in range(line_count)
+                ]
+            }
+
+            async def checkout():
+                try:
+                    async with conn.transaction():
+                        await create_invoice(Invoice(**payload), conn)
+                        raise _Rollback()
+                except _Rollback:
+                    pass
+
+            await time_async(checkout, 3)  # warm up the statement cache
+            print(summarize(f"{line_count} line item(s)", await time_async(checkout, repeat)))
+
+    await database.pool.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=50)
+    asyncio.run(main(parser.parse_args().repeat))
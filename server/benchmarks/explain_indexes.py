@@ -0,0 +1,184 @@
+"""
+Before/after EXPLAIN ANALYZE for the indexes in migrations/003_hot_path_indexes.sql.
+
+Runs each hot query twice against a local database configured through
+DB_HOST/DB_PORT/DB_NAME/DB_USER/DB_PASSWORD: once with the migration's
+indexes dropped inside a transaction that is rolled back ("before"), and
+once with them in place ("after"). Apply the migrations first; pass --seed
+to fill an empty database with synthetic data. Migration 006 replaced most
+of these indexes with tenant-leading ones; benchmarks.tenant_scale compares
+those.
+
+    cd server && python -m benchmarks.explain_indexes --seed --invoices 200000
+"""
+
+import argparse
+import asyncio
+import json
+import re
+from pathlib import Path
+
+from benchmarks.common import connect_pool
+
+MIGRATION = Path(__file__).parent.parent / 'migrations' / '003_hot_path_indexes.sql'
+
+HOT_QUERIES = [
+    (
+        "invoice items for a page",
+        "SELECT * FROM invoice_items WHERE invoice_id = ANY($1::integer[])",
+        lambda ids: [list(range(ids['invoice'] - 100, ids['invoice']))]
+    ),
+    (
+        "item sales history",
+        "SELECT COUNT(*) FROM invoice_items WHERE inventory_id = $1",
+        lambda ids: [ids['inventory']]
+    ),
+    (
+        "customer by phone",
+        "SELECT id FROM customers WHERE phone = $1",
+        lambda ids: [ids['phone']]
+    ),
+    (
+        "expiring in 30 days",
+        "SELECT * FROM inventory WHERE expiry_date >= CURRENT_DATE AND expiry_date <= CURRENT_DATE + 30 ORDER BY expiry_date",
+        lambda ids: []
+    ),
+    (
+        "inventory first page",
+        "SELECT * FROM inventory ORDER BY created_at DESC, id DESC LIMIT 101",
+        lambda ids: []
+    ),
+    (
+        "inventory page by category",
+        "SELECT * FROM inventory WHERE category_id = $1 ORDER BY created_at DESC, id DESC LIMIT 101",
+        lambda ids: [ids['category']]
+    ),
+    (
+        "invoices first page",
+        "SELECT * FROM invoices ORDER BY created_at DESC, id DESC LIMIT 101",
+        lambda ids: []
+    ),
+    (
+        "invoices by status page",
+        "SELECT * FROM invoices WHERE status = 'paid' ORDER BY created_at DESC, id DESC LIMIT 101",
+        lambda ids: []
+    ),
+    (
+        "invoices in one month",
+        "SELECT COUNT(*), SUM(total_amount) FROM invoices WHERE invoice_date >= CURRENT_DATE - 30 AND invoice_date < CURRENT_DATE",
+        lambda ids: []
+    ),
+    (
+        "login lookup",
+        "SELECT * FROM users WHERE username = $1 OR email = $1",
+        lambda ids: ['admin']
+    ),
+]
+
+SEED_SQL = '''
+INSERT INTO categories (name, description)
+SELECT 'Category ' || g, 'Synthetic category' FROM generate_series(1, 20) g;
+
+INSERT INTO inventory (name, quantity, unit_price, cost_price, category_id, expiry_date, reorder_level, manufacturer, batch_number, created_at)
+SELECT
+    'Medicine ' || g, (random() * 500)::int, round((random() * 200)::numeric, 2), 1,
+    (SELECT MIN(id) FROM categories) + g % 20,
+    CURRENT_DATE + (random() * 720)::int - 60, 10 + g % 40, 'Maker ' || g % 300, 'B' || g % 7,
+    now() - random() * interval '730 days'
+FROM generate_series(1, $1::integer) g;
+
+INSERT INTO customers (name, phone, created_at)
+SELECT 'Customer ' || g, lpad(g::text, 10, '9'), now() - random() * interval '730 days'
+FROM generate_series(1, $2::integer) g;
+'''
+
+# Monthly invoice partitions covering the seeded history
+SEED_PARTITIONS_SQL = '''
+SELECT create_invoice_partitions((now() - interval '730 days')::date, now()::date)
+'''
+
+SEED_INVOICES_SQL = '''
+WITH customer_ids AS (
+    SELECT array_agg(id ORDER BY id) AS ids FROM customers
+),
+inventory_ids AS (
+    SELECT array_agg(id ORDER BY id) AS ids FROM inventory
+),
+new_invoices AS (
+    INSERT INTO invoices (customer_id, total_amount, status, invoice_date, created_at)
+    SELECT
+        customer_ids.ids[1 + g % cardinality(customer_ids.ids)], round((random() * 900)::numeric, 2),
+        CASE WHEN g % 5 = 0 THEN 'paid' ELSE 'pending' END,
+        stamp, stamp
+    FROM customer_ids, generate_series(1, $1::integer) g,
+        LATERAL (SELECT now() - random() * interval '730 days' + g * interval '0 second' AS stamp) s
+    RETURNING id, created_at
+)
+INSERT INTO invoice_items (invoice_id, invoice_created_at, inventory_id, quantity, unit_price)
+SELECT ni.id, ni.created_at, inventory_ids.ids[1 + (ni.id * 7 + line) % cardinality(inventory_ids.ids)], 1 + line, 9.5
+FROM inventory_ids, new_invoices ni, generate_series(0, 2) line;
+'''
+
+def index_names() -> list:
+    return re.findall(r'CREATE INDEX CONCURRENTLY IF NOT EXISTS (\w+)', MIGRATION.read_text())
+
+async def explain(conn, sql: str, args: list) -> tuple:
+    plan = json.loads(await conn.fetchval(f'EXPLAIN (ANALYZE, FORMAT JSON) {sql}', *args))[0]
+    node = plan['Plan']
+    while node.get('Plans') and node['Node Type'] in ('Limit', 'Aggregate', 'Sort', 'Gather', 'Gather Merge', 'Append', 'Merge Append'):
+        node = node['Plans'][0]
+    scan = node['Node Type'] + (f" using {node['Index Name']}" if node.get('Index Name') else '')
+    return plan['Execution Time'], scan
+
+async def main(seed: bool, invoices: int, items: int, customers: int, repeat: int):
+    pool = await connect_pool()
+    async with pool.acquire() as conn:
+        if seed:
+            print(f"Seeding {items} inventory items, {customers} customers and {invoices} invoices...")
+            await conn.execute(SEED_SQL.replace('$1::integer', str(items)).replace('$2::integer', str(customers)))
+            await conn.execute(SEED_PARTITIONS_SQL)
+            await conn.execute(SEED_INVOICES_SQL, invoices)
+            await conn.execute('ANALYZE')
+
+        ids = dict(await conn.fetchrow('''
+            SELECT
+                (SELECT MAX(id) FROM invoices) AS invoice,
+                (SELECT MIN(inventory_id) FROM invoice_items) AS inventory,
+                (SELECT phone FROM customers WHERE phone IS NOT NULL ORDER BY id DESC LIMIT 1) AS phone,
+                (SELECT MIN(id) FROM categories) AS category
+        '''))
+        indexes = index_names()
+
+        print(f"{'query':<28} {'before ms':>10} {'after ms':>10}  plan before -> after")
+        for label, sql, make_args in HOT_QUERIES:
+            args = make_args(ids)
+
+            async def best_of(drop: bool) -> tuple:
+                results = []
+                for _ in range(repeat):
+                    tr = conn.transaction()
+                    await tr.start()
+                    try:
+                        if drop:
+                            for name in indexes:
+                                await conn.execute(f'DROP INDEX IF EXISTS {name}')
+                        results.append(await explain(conn, sql, args))
+                    finally:
+                        await tr.rollback()
+                return min(results)
+
+            before_ms, before_scan = await best_of(True)
+            after_ms, after_scan = await best_of(False)
+            print(f"{label:<28} {before_ms:>10.2f} {after_ms:>10.2f}  {before_scan} -> {after_scan}")
+
+    await pool.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seed', action='store_true', help='insert synthetic data first')
+    parser.add_argument('--invoices', type=int, default=200000)
+    parser.add_argument('--items', type=int, default=20000)
+    parser.add_argument('--customers', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.seed, args.invoices, args.items, args.customers, args.repeat))
@@ -0,0 +1,119 @@
+"""
+Latency of GET /api/inventory/search queries over a shop's catalog.
+
+Runs the search route's queries for a set of typical cashier inputs against
+a local database configured through DB_HOST/DB_PORT/DB_NAME/DB_USER/DB_PASSWORD,
+once as an expression and a full-text index would serve them ("before":
+under row-level security neither index can bound a scan, so the item's
+lowercased name and text search vector are computed for each of the shop's
+items) and once through the name and word tables of
+migrations/008_inventory_search.sql ("after"). The row-level security
+predicates are added explicitly, since a superuser connection bypasses the
+policies. Pass --seed to create a shop with a synthetic catalog.
+
+    cd server && python -m benchmarks.inventory_search --seed --skus 50000
+"""
+
+import argparse
+import asyncio
+from typing import Optional
+
+import queries
+from benchmarks.common import connect_pool, summarize, time_async
+from routers.inventory import SEARCH_DEFAULT_LIMIT, _search_words
+
+SHOP = "tenant_id = current_tenant_id()"
+BY_NAME_PREFIX_SQL = queries.INVENTORY_SEARCH_BY_NAME_PREFIX.replace('WHERE ', f'WHERE n.{SHOP} AND i.{SHOP} AND ', 1)
+BY_WORDS_SQL = (
+    queries.INVENTORY_SEARCH_BY_WORDS
+    .replace('GROUP BY', f'WHERE t.{SHOP}\n        GROUP BY', 1)
+    .replace('WHERE NOT', f'WHERE i.{SHOP} AND NOT', 1)
+)
+BEFORE_BY_NAME_PREFIX_SQL = f'''
+    SELECT id, name, manufacturer, batch_number, quantity, unit_price, expiry_date, category_id
+    FROM inventory
+    WHERE {SHOP} AND lower(name) COLLATE "C" >= $1 AND lower(name) COLLATE "C" < $1 || chr(1114111)
+    ORDER BY lower(name) COLLATE "C", id
+    LIMIT $2
+'''
+BEFORE_BY_WORDS_SQL = f'''
+    WITH matches AS MATERIALIZED (
+        SELECT id, name, manufacturer, batch_number, quantity, unit_price, expiry_date, category_id
+        FROM inventory
+        WHERE {SHOP} AND to_tsvector('simple', COALESCE(name, '') || ' ' || COALESCE(manufacturer, '') || ' ' || COALESCE(batch_number, ''))
+            @@ to_tsquery('simple', array_to_string(ARRAY(SELECT word || ':*' FROM unnest($1::text[]) AS word), ' & '))
+    )
+    SELECT * FROM matches
+    WHERE NOT starts_with(lower(name), $2)
+    ORDER BY lower(name) COLLATE "C", id
+    LIMIT $3
+'''
+
+TERMS = ['p', 'para', 'paracetamol 500', 'amox', 'cipla', 'b7', 'zz']
+
+SEED_SQL = '''
+WITH shop AS (
+    INSERT INTO tenants (name) VALUES ('Search benchmark shop') RETURNING id
+)
+INSERT INTO inventory (tenant_id, name, manufacturer, batch_number, quantity, unit_price, cost_price, expiry_date, created_at)
+SELECT
+    shop.id,
+    (ARRAY['Paracetamol', 'Amoxicillin', 'Azithromycin', 'Cetirizine', 'Metformin', 'Omeprazole',
+           'Pantoprazole', 'Ibuprofen', 'Atorvastatin', 'Amlodipine', 'Losartan', 'Dolo'])[1 + g % 12]
+        || ' ' || (ARRAY['50', '100', '250', '500', '650', '1000'])[1 + g / 12 % 6] || 'mg '
+        || (ARRAY['Tablet', 'Capsule', 'Syrup', 'Injection'])[1 + g % 4] || ' ' || g,
+    (ARRAY['Cipla', 'Sun Pharma', 'Lupin', 'Mankind', 'Alkem', 'Torrent', 'Zydus'])[1 + g % 7],
+    'B' || g % 97,
+    (random() * 500)::int, round((random() * 200)::numeric, 2), 1,
+    CURRENT_DATE + (random() * 720)::int - 60,
+    now() - random() * interval '730 days'
+FROM shop, generate_series(1, $1::integer) g
+RETURNING tenant_id
+'''
+
+async def search(conn, term: str, sql: tuple, limit: int = SEARCH_DEFAULT_LIMIT) -> list:
+    """Same queries as search_inventory() when the catalog is not loaded"""
+    by_name_prefix_sql, by_words_sql = sql
+    prefix = term.strip().lower()
+    rows = await conn.fetch(by_name_prefix_sql, prefix, limit)
+    if len(rows) < limit:
+        rows += await conn.fetch(by_words_sql, _search_words(term), prefix, limit - len(rows))
+    return rows
+
+async def run_terms(conn, repeat: int, sql: tuple) -> list:
+    results = []
+    for term in TERMS:
+        rows = await search(conn, term, sql)
+        results.append((term, len(rows), await time_async(lambda: search(conn, term, sql), repeat)))
+    return results
+
+async def main(seed: bool, skus: int, tenant_id: Optional[int], repeat: int):
+    pool = await connect_pool()
+    async with pool.acquire() as conn:
+        if seed:
+            print(f"Seeding a shop with {skus} SKUs...")
+            tenant_id = await conn.fetchval(SEED_SQL, skus)
+            await conn.execute('ANALYZE inventory')
+        if tenant_id is None:
+            tenant_id = await conn.fetchval('SELECT MAX(id) FROM tenants')
+        count = await conn.fetchval('SELECT COUNT(*) FROM inventory WHERE tenant_id = $1', tenant_id)
+        print(f"Searching shop {tenant_id} with {count} SKUs")
+        await conn.execute("SELECT set_config('app.tenant_id', $1, false)", str(tenant_id))
+
+        before = await run_terms(conn, repeat, (BEFORE_BY_NAME_PREFIX_SQL, BEFORE_BY_WORDS_SQL))
+        after = await run_terms(conn, repeat, (BY_NAME_PREFIX_SQL, BY_WORDS_SQL))
+
+        for (term, rows, before_ms), (_, _, after_ms) in zip(before, after):
+            print(summarize(f"before {term!r} ({rows} rows)", before_ms))
+            print(summarize(f"after  {term!r} ({rows} rows)", after_ms))
+
+    await pool.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seed', action='store_true', help='create a shop with a synthetic catalog first')
+    parser.add_argument('--skus', type=int, default=50000)
+    parser.add_argument('--tenant', type=int, help='shop to search (default: the newest)')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.seed, args.skus, args.tenant, args.repeat))
@@ -0,0 +1,73 @@
+"""
+Benchmark POST /api/invoices/batch ingestion throughput.
+
+Builds a batch of synthetic invoices (new and repeat customers, three line
+items each) and runs the batch route against a local database configured
+through DB_HOST/DB_PORT/DB_NAME/DB_USER/DB_PASSWORD. Each run is rolled back.
+
+    cd server && python -m benchmarks.invoice_batch --size 10000 --repeat 3
+"""
+
+import argparse
+import asyncio
+import time
+
+import database
+from routers.invoices import InvoiceBatch, create_invoices_batch
+from benchmarks.common import connect_pool
+
+class _Rollback(Exception):
+    pass
+
+def build_batch(size: int, inventory_ids: list) -> InvoiceBatch:
+    invoices = []
+    for idx in range(size):
+        invoices.append({
+            "customer": {
+                "customer_name": f"Customer {idx % 2000}",
+                "customer_phone": f"9{idx % 2000:09d}"
+            },
+            "invoice_date": f"2024-{idx % 12 + 1:02d}-{idx % 28 + 1:02d}",
+            "payment_method": "cash",
+            "items": [
+                {
+                    "inventory_id": inventory_ids[(idx + line) % len(inventory_ids)],
+                    "quantity": 1 + line,
+                    "unit_price": 12.5,
+                    "gst_percentage": 12
+                }
+                for line in range(3)
+            ]
+        })
+    return InvoiceBatch(invoices=invoices)
+
+async def main(size: int, repeat: int):
+    database.pool = await connect_pool()
+    async with database.pool.acquire() as conn:
+        inventory_ids = [row['id'] for row in await conn.fetch('SELECT id FROM inventory LIMIT 500')]
+        if not inventory_ids:
+            raise SystemExit("Seed the inventory table before running this benchmark")
+
+        for run in range(repeat):
+            batch = build_batch(size, inventory_ids)
+            start = time.perf_counter()
+            try:
+                async with conn.transaction():
+                    result = await create_invoices_batch(batch, conn)
+                    elapsed = time.perf_counter() - start
+                    raise _Rollback()
+            except _Rollback:
+                pass
+            print(
+                f"run {run + 1}: {result['data']['created_count']} invoices in {elapsed * 1000:.0f} ms "
+                f"({result['data']['created_count'] / elapsed:,.0f} invoices/s)"
+            )
+
+    await database.pool.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--size', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.size, args.repeat))
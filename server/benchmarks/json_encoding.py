@@ -0,0 +1,59 @@
+"""
+Benchmark encoding a page of inventory rows into a JSON response body.
+
+Compares the previous path (dict copies, FastAPI's jsonable_encoder and the
+stdlib JSONResponse) with page_response(), which hands asyncpg Records
+straight to the orjson-backed FastJSONResponse. Rows come from the local
+database configured through DB_HOST/DB_PORT/DB_NAME/DB_USER/DB_PASSWORD.
+
+    cd server && python -m benchmarks.json_encoding --rows 5000 --repeat 20
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from pagination import page_response
+from benchmarks.common import connect_pool, summarize
+
+def stdlib_body(rows) -> bytes:
+    content = {"success": True, "data": [dict(row) for row in rows], "next_cursor": None}
+    return JSONResponse(jsonable_encoder(content)).body
+
+def fast_body(rows) -> bytes:
+    return page_response(rows, None).body
+
+def time_sync(fn, rows, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+async def main(row_count: int, repeat: int):
+    pool = await connect_pool()
+    async with pool.acquire() as conn:
+        rows = await conn.fetch('SELECT * FROM inventory ORDER BY id LIMIT $1', row_count)
+    await pool.close()
+    if not rows:
+        raise SystemExit("Seed the inventory table before running this benchmark")
+
+    # Both paths must produce the same document
+    if json.loads(stdlib_body(rows)) != json.loads(fast_body(rows)):
+        raise SystemExit("Encoded bodies differ")
+
+    print(f"{len(rows)} rows, {len(fast_body(rows)) / 1024:.0f} KiB")
+    print(summarize("jsonable_encoder + json", time_sync(stdlib_body, rows, repeat)))
+    print(summarize("orjson with Records", time_sync(fast_body, rows, repeat)))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.repeat))
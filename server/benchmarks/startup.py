@@ -0,0 +1,99 @@
+"""
+Cold-start profile: import cost per module and time until the API answers.
+
+Imports main under `python -X importtime` and lists the most expensive
+modules, then starts uvicorn on a spare port and polls /api/health
+(liveness) and /api/ready (database pool and schema ready). The database
+settings come from DB_HOST/DB_PORT/DB_NAME/DB_USER/DB_PASSWORD as for
+the server itself.
+
+    cd server && python -m benchmarks.startup --runs 3
+"""
+
+import argparse
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+SERVER_DIR = Path(__file__).parent.parent
+IMPORT_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+def import_costs(top: int):
+    """Print the modules with the largest cumulative import time"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=SERVER_DIR, capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((int(cumulative_us), int(self_us), len(indent) // 2, name))
+    total = next(cumulative for cumulative, _, depth, name in rows if name == 'main')
+    print(f"import main: {total / 1000:.1f} ms")
+    print(f"{'module':<40} {'cumulative ms':>14} {'self ms':>9}")
+    # Only modules imported directly by main or one level below
+    for cumulative, self_us, depth, name in sorted(
+        (row for row in rows if 1 <= row[2] <= 2), reverse=True
+    )[:top]:
+        print(f"{'  ' * (depth - 1) + name:<40} {cumulative / 1000:>14.1f} {self_us / 1000:>9.1f}")
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for(url: str, deadline: float) -> float:
+    """Poll a URL until it answers 200 and return when that happened"""
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter()
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} did not become ready")
+
+def time_to_ready(timeout: float) -> tuple:
+    """Start a server process and time its first healthy and ready responses"""
+    port = free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+        cwd=SERVER_DIR, env=os.environ.copy(),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = started + timeout
+        healthy = wait_for(f'http://127.0.0.1:{port}/api/health', deadline)
+        ready = wait_for(f'http://127.0.0.1:{port}/api/ready', deadline)
+        return (healthy - started) * 1000, (ready - started) * 1000
+    finally:
+        process.terminate()
+        process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+
+    import_costs(args.top)
+    print()
+    results = [time_to_ready(args.timeout) for _ in range(args.runs)]
+    for label, index in (('first /api/health', 0), ('first /api/ready', 1)):
+        values = [result[index] for result in results]
+        print(f"{label:<20} median={statistics.median(values):8.1f} ms  max={max(values):8.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Per-shop query cost with platform-wide versus tenant-leading indexes.
+
+Runs one shop's hot queries against a local database configured through
+DB_HOST/DB_PORT/DB_NAME/DB_USER/DB_PASSWORD: once with the indexes of
+migrations/006_tenant_indexes.sql swapped back for the platform-wide ones
+they replaced, inside a transaction that is rolled back ("before"), and once
+as migrated ("after"). Each query carries the row-level security predicate
+explicitly, since a superuser connection bypasses the policies. Pass --seed
+to add synthetic shops so that the measured shop is a small slice of the
+platform.
+
+    cd server && python -m benchmarks.tenant_scale --seed --tenants 50
+"""
+
+import argparse
+import asyncio
+import re
+from pathlib import Path
+from typing import Optional
+
+from run_migrations import split_statements
+from benchmarks.common import connect_pool
+from benchmarks.explain_indexes import SEED_PARTITIONS_SQL, explain
+
+MIGRATIONS = Path(__file__).parent.parent / 'migrations'
+TENANT_INDEXES = MIGRATIONS / '006_tenant_indexes.sql'
+PLATFORM_INDEXES = [MIGRATIONS / '003_hot_path_indexes.sql', MIGRATIONS / '004_low_stock_ratio.sql']
+
+SHOP = "tenant_id = current_tenant_id()"
+
+HOT_QUERIES = [
+    ("inventory first page", f"SELECT * FROM inventory WHERE {SHOP} ORDER BY created_at DESC, id DESC LIMIT 101"),
+    ("low stock report", f"SELECT * FROM inventory WHERE {SHOP} AND quantity <= reorder_level ORDER BY stock_ratio, id LIMIT 100"),
+    ("low stock count", f"SELECT COUNT(*) FROM inventory WHERE {SHOP} AND quantity <= reorder_level"),
+    ("expiring in 30 days", f"SELECT * FROM inventory WHERE {SHOP} AND expiry_date >= CURRENT_DATE AND expiry_date <= CURRENT_DATE + 30 ORDER BY expiry_date"),
+    ("customers first page", f"SELECT * FROM customers WHERE {SHOP} ORDER BY created_at DESC, id DESC LIMIT 101"),
+    ("customer by phone", f"SELECT id FROM customers WHERE {SHOP} AND phone = '9999999001'"),
+    ("invoices first page", f"SELECT * FROM invoices WHERE {SHOP} ORDER BY created_at DESC, id DESC LIMIT 101"),
+    ("invoices by status page", f"SELECT * FROM invoices WHERE {SHOP} AND status = 'paid' ORDER BY created_at DESC, id DESC LIMIT 101"),
+    ("invoices in one month", f"SELECT COUNT(*), SUM(total_amount) FROM invoices WHERE {SHOP} AND invoice_date >= CURRENT_DATE - 30 AND invoice_date < CURRENT_DATE"),
+]
+
+SEED_SQL = '''
+WITH shops AS (
+    INSERT INTO tenants (name)
+    SELECT 'Benchmark shop ' || g FROM generate_series(1, $1::integer) g
+    RETURNING id
+),
+items AS (
+    INSERT INTO inventory (tenant_id, name, quantity, unit_price, cost_price, expiry_date, reorder_level, batch_number, created_at)
+    SELECT
+        shops.id, 'Medicine ' || g, (random() * 500)::int, round((random() * 200)::numeric, 2), 1,
+        CURRENT_DATE + (random() * 720)::int - 60, 10 + g % 40, 'B' || g % 7,
+        now() - random() * interval '730 days'
+    FROM shops, generate_series(1, $2::integer) g
+),
+shop_customers AS (
+    INSERT INTO customers (tenant_id, name, phone, created_at)
+    SELECT shops.id, 'Customer ' || g, lpad(g::text, 10, '9'), now() - random() * interval '730 days'
+    FROM shops, generate_series(1, $3::integer) g
+)
+INSERT INTO invoices (tenant_id, customer_name, total_amount, status, invoice_date, created_at)
+SELECT
+    shops.id, 'Customer ' || g, round((random() * 900)::numeric, 2),
+    CASE WHEN g % 5 = 0 THEN 'paid' ELSE 'pending' END, stamp, stamp
+FROM shops, generate_series(1, $4::integer) g,
+    LATERAL (SELECT now() - random() * interval '730 days' + g * interval '0 second' AS stamp) s
+'''
+
+def tenant_index_names() -> list:
+    return re.findall(r'CREATE INDEX CONCURRENTLY IF NOT EXISTS (\w+)', TENANT_INDEXES.read_text())
+
+def platform_index_statements() -> list:
+    """CREATE INDEX statements for the platform-wide indexes 006 dropped"""
+    replaced = set(re.findall(r'DROP INDEX CONCURRENTLY IF EXISTS (\w+)', TENANT_INDEXES.read_text()))
+    statements = []
+    for path in PLATFORM_INDEXES:
+        for statement in split_statements(path.read_text()):
+            match = re.match(r'CREATE INDEX CONCURRENTLY IF NOT EXISTS (\w+)', statement)
+            if match and match.group(1) in replaced:
+                statements.append(statement.replace(' CONCURRENTLY', ''))
+    return statements
+
+async def run_queries(conn, repeat: int) -> list:
+    results = []
+    for _, sql in HOT_QUERIES:
+        results.append(min([await explain(conn, sql, []) for _ in range(repeat)]))
+    return results
+
+async def main(seed: bool, tenants: int, items: int, customers: int, invoices: int, tenant_id: Optional[int], repeat: int):
+    pool = await connect_pool()
+    async with pool.acquire() as conn:
+        if seed:
+            print(f"Seeding {tenants} shops with {items} items, {customers} customers and {invoices} invoices each...")
+            await conn.execute(SEED_PARTITIONS_SQL)
+            await conn.execute(SEED_SQL, tenants, items, customers, invoices)
+            await conn.execute('ANALYZE')
+        if tenant_id is None:
+            tenant_id = await conn.fetchval('SELECT MAX(id) FROM tenants')
+        shop_rows, platform_rows = await conn.fetchrow(
+            'SELECT COUNT(*) FILTER (WHERE tenant_id = $1), COUNT(*) FROM invoices', tenant_id
+        )
+        print(f"Measuring shop {tenant_id}: {shop_rows} of {platform_rows} invoices on the platform")
+        await conn.execute("SELECT set_config('app.tenant_id', $1, false)", str(tenant_id))
+
+        tr = conn.transaction()
+        await tr.start()
+        try:
+            for name in tenant_index_names():
+                await conn.execute(f'DROP INDEX IF EXISTS {name}')
+            for statement in platform_index_statements():
+                await conn.execute(statement)
+            await conn.execute('ANALYZE inventory, customers, invoices')
+            before = await run_queries(conn, repeat)
+        finally:
+            await tr.rollback()
+        after = await run_queries(conn, repeat)
+
+        print(f"{'query':<28} {'before ms':>10} {'after ms':>10}  plan before -> after")
+        for (label, _), (before_ms, before_scan), (after_ms, after_scan) in zip(HOT_QUERIES, before, after):
+            print(f"{label:<28} {before_ms:>10.2f} {after_ms:>10.2f}  {before_scan} -> {after_scan}")
+
+    await pool.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seed', action='store_true', help='insert synthetic shops first')
+    parser.add_argument('--tenants', type=int, default=50)
+    parser.add_argument('--items', type=int, default=400, help='inventory items per seeded shop')
+    parser.add_argument('--customers', type=int, default=400, help='customers per seeded shop')
+    parser.add_argument('--invoices', type=int, default=4000, help='invoices per seeded shop')
+    parser.add_argument('--tenant', type=int, help='shop whose queries are measured (default: the newest)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.seed, args.tenants, args.items, args.customers, args.invoices, args.tenant, args.repeat))
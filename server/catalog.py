@@ -0,0 +1,275 @@
+"""
+In-process copy of each shop's inventory for point-of-sale reads.
+
+A shop's catalog is loaded the first time one of its items is looked up and
+is then kept current from the notifications published by
+migrations/009_inventory_notify.sql: changed rows are re-read by id and
+applied one by one; only statements touching hundreds of rows make the shop
+load again. Catalogs together hold at most CATALOG_MAX_ITEMS rows: the
+least recently used shops are dropped to make room and load again when next
+looked up. A shop is loaded by one task at a time, and after a failed load
+it is not tried again for a while, longer after each further failure, so an
+unreachable database is not met with a load per request. Until a catalog is
+loaded, while the listener connection is down, and for clients pinned to the
+primary after a write, lookups return None and callers fall back to the
+database.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Dict, List, Optional, Set, Tuple
+
+import asyncpg
+from fastapi import Request
+
+import database
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Set to false to serve every inventory read from the database
+CATALOG_ENABLED = os.getenv('INVENTORY_CATALOG_ENABLED', 'true').lower() == 'true'
+CATALOG_CHANNEL = 'inventory_changes'
+# Rows kept across all shops' catalogs in each worker, at roughly 1 KB each;
+# a shop with more items than this is always read from the database
+CATALOG_MAX_ITEMS = int(os.getenv('INVENTORY_CATALOG_MAX_ITEMS', '50000'))
+# Seconds before a shop whose catalog failed to load is tried again, doubled
+# after each further failure up to the maximum
+CATALOG_RETRY_SECONDS = float(os.getenv('INVENTORY_CATALOG_RETRY_SECONDS', '1'))
+CATALOG_RETRY_MAX_SECONDS = float(os.getenv('INVENTORY_CATALOG_RETRY_MAX_SECONDS', '60'))
+
+CATALOG_COLUMNS = (
+    'id', 'name', 'description', 'quantity', 'unit_price', 'category_id',
+    'created_at', 'updated_at', 'manufacturer', 'batch_number', 'expiry_date',
+    'reorder_level', 'dosage_form', 'strength', 'storage_condition',
+    'prescription_required', 'cost_price', 'stock_ratio', 'tenant_id'
+)
+CATALOG_SELECT = f"SELECT {', '.join(CATALOG_COLUMNS)} FROM inventory"
+
+class CatalogItem:
+    """One inventory row: slots instead of a dict, floats instead of Decimals"""
+
+    __slots__ = CATALOG_COLUMNS
+
+    def __init__(self, row: asyncpg.Record):
+        for column, value in zip(CATALOG_COLUMNS, row):
+            setattr(self, column, float(value) if isinstance(value, Decimal) else value)
+
+    def as_dict(self, columns: Tuple[str, ...] = CATALOG_COLUMNS) -> dict:
+        return {column: getattr(self, column) for column in columns}
+
+class ShopCatalog:
+    """A shop's items by id, and (lowercased name, id) pairs in order for prefix lookups"""
+
+    __slots__ = ('items', 'names', 'ready', 'pending', 'refreshing')
+
+    def __init__(self):
+        self.items: Dict[int, CatalogItem] = {}
+        self.names: List[Tuple[str, int]] = []
+        self.ready = False
+        # Ids notified while loading or refreshing, re-read afterwards
+        self.pending: Set[int] = set()
+        self.refreshing = False
+
+    def get(self, item_id: int) -> Optional[CatalogItem]:
+        return self.items.get(item_id)
+
+    def prefix(self, text: str, limit: int) -> List[CatalogItem]:
+        """Items whose lowercased name starts with text, in name order"""
+        found = []
+        index = bisect_left(self.names, (text,))
+        while index < len(self.names) and len(found) < limit:
+            name, item_id = self.names[index]
+            if not name.startswith(text):
+                break
+            found.append(self.items[item_id])
+            index += 1
+        return found
+
+    def load(self, rows: List[asyncpg.Record]):
+        self.items = {row['id']: CatalogItem(row) for row in rows}
+        self.names = sorted((item.name.lower(), item.id) for item in self.items.values())
+
+    def put(self, item: CatalogItem):
+        self.remove(item.id)
+        self.items[item.id] = item
+        insort(self.names, (item.name.lower(), item.id))
+
+    def remove(self, item_id: int):
+        old = self.items.pop(item_id, None)
+        if old is not None:
+            del self.names[bisect_left(self.names, (old.name.lower(), item_id))]
+
+# Least recently used first
+_shops: 'OrderedDict[int, ShopCatalog]' = OrderedDict()
+# Shops found to have more items than CATALOG_MAX_ITEMS
+_oversized: Set[int] = set()
+# Shops whose catalog is being read from the database
+_loading: Set[int] = set()
+# Shops whose last load failed: when the next may start, and the delay after that
+_backoff: Dict[int, Tuple[float, float]] = {}
+# Loads and refreshes in flight; the event loop only keeps weak references
+_tasks: Set[asyncio.Task] = set()
+# Catalogs are only trusted while notifications are being received
+_listening = False
+
+def lookup(request: Request, tenant_id: int) -> Optional[ShopCatalog]:
+    """The shop's loaded catalog, or None when the read must go to the database"""
+    if not _listening or database.pinned(request):
+        return None
+    shop = _shops.get(tenant_id)
+    if shop is None:
+        if tenant_id in _oversized or not _may_load(tenant_id):
+            metrics.increment('catalog.misses')
+            return None
+        shop = _shops[tenant_id] = ShopCatalog()
+        _loading.add(tenant_id)
+        _spawn(_load(tenant_id, shop))
+    _shops.move_to_end(tenant_id)
+    if not shop.ready:
+        metrics.increment('catalog.misses')
+        return None
+    metrics.increment('catalog.hits')
+    return shop
+
+def _may_load(tenant_id: int) -> bool:
+    """False while the shop is loading, or backing off after a failed load"""
+    # A shop dropped while loading, e.g. on a truncate, is not loaded twice
+    if tenant_id in _loading:
+        return False
+    retry = _backoff.get(tenant_id)
+    return retry is None or retry[0] <= time.monotonic()
+
+def _back_off(tenant_id: int):
+    """Hold off the shop's next load, twice as long as the last time"""
+    delay = _backoff[tenant_id][1] if tenant_id in _backoff else CATALOG_RETRY_SECONDS
+    _backoff[tenant_id] = (time.monotonic() + delay, min(delay * 2, CATALOG_RETRY_MAX_SECONDS))
+
+def _evict(keep: ShopCatalog):
+    """Drop the least recently used shops until all catalogs fit in CATALOG_MAX_ITEMS"""
+    total = sum(len(shop.items) for shop in _shops.values())
+    for tenant_id, shop in list(_shops.items()):
+        if total <= CATALOG_MAX_ITEMS:
+            break
+        # Shops still loading hold nothing yet
+        if shop is keep or not shop.items:
+            continue
+        total -= len(shop.items)
+        del _shops[tenant_id]
+        metrics.increment('catalog.evictions')
+
+async def _load(tenant_id: int, shop: ShopCatalog):
+    """Read a shop's whole inventory, then the rows notified meanwhile"""
+    try:
+        async with database.checkout(database.pool, tenant_id) as conn:
+            rows = await conn.fetch(CATALOG_SELECT)
+        if len(rows) > CATALOG_MAX_ITEMS:
+            logger.warning(f"Shop {tenant_id} has {len(rows)} inventory items, too many for the catalog")
+            _oversized.add(tenant_id)
+            _drop(tenant_id, shop)
+            return
+        shop.load(rows)
+        shop.ready = True
+        _backoff.pop(tenant_id, None)
+        _evict(shop)
+        logger.info(f"Loaded {len(rows)} inventory items of shop {tenant_id} into the catalog")
+        if shop.pending:
+            _schedule_refresh(tenant_id, shop)
+    except Exception as e:
+        logger.error(f"Could not load the catalog of shop {tenant_id}: {e}")
+        _back_off(tenant_id)
+        _drop(tenant_id, shop)
+    finally:
+        _loading.discard(tenant_id)
+
+async def _refresh(tenant_id: int, shop: ShopCatalog):
+    """Re-read notified rows until none are left; rows that are gone are removed"""
+    try:
+        while shop.pending and _shops.get(tenant_id) is shop:
+            ids = list(shop.pending)
+            shop.pending.clear()
+            async with database.checkout(database.pool, tenant_id) as conn:
+                rows = await conn.fetch(CATALOG_SELECT + ' WHERE id = ANY($1::integer[])', ids)
+            for row in rows:
+                shop.put(CatalogItem(row))
+            for item_id in set(ids) - {row['id'] for row in rows}:
+                shop.remove(item_id)
+            _evict(shop)
+    except Exception as e:
+        logger.error(f"Could not refresh the catalog of shop {tenant_id}: {e}")
+        _back_off(tenant_id)
+        _drop(tenant_id, shop)
+    finally:
+        shop.refreshing = False
+
+def _schedule_refresh(tenant_id: int, shop: ShopCatalog):
+    if not shop.refreshing:
+        shop.refreshing = True
+        _spawn(_refresh(tenant_id, shop))
+
+def _spawn(coro):
+    task = asyncio.create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+def _drop(tenant_id: int, shop: ShopCatalog):
+    """Forget a shop's catalog; the next lookup loads it afresh"""
+    if _shops.get(tenant_id) is shop:
+        del _shops[tenant_id]
+
+def _on_notification(conn: asyncpg.Connection, pid: int, channel: str, payload: str):
+    change = json.loads(payload)
+    if 'tenant_id' not in change:
+        _shops.clear()
+        return
+    shop = _shops.get(change['tenant_id'])
+    if shop is None:
+        return
+    if 'ids' not in change:
+        _drop(change['tenant_id'], shop)
+        return
+    shop.pending.update(change['ids'])
+    # A loading catalog picks up pending ids once it is in place
+    if shop.ready:
+        _schedule_refresh(change['tenant_id'], shop)
+
+async def listen():
+    """Receive inventory changes while the server runs, reconnecting when the connection drops"""
+    global _listening
+    if not CATALOG_ENABLED:
+        return
+    while True:
+        if database.pool is None:
+            await asyncio.sleep(database.DB_INIT_RETRY_SECONDS)
+            continue
+        listen_pool = None
+        try:
+            # A connection of its own: pooled ones are reset, which would
+            # end the LISTEN
+            listen_pool = await database.create_pool(min_size=1, max_size=1, init=None)
+            conn = await listen_pool.acquire()
+            closed = asyncio.get_running_loop().create_future()
+            conn.add_termination_listener(lambda _: closed.done() or closed.set_result(None))
+            await conn.add_listener(CATALOG_CHANNEL, _on_notification)
+            _listening = True
+            logger.info("✅ Listening for inventory changes")
+            await closed
+            logger.warning("Inventory change listener disconnected")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Inventory change listener failed: {e}")
+        finally:
+            # Changes may have been missed; catalogs load afresh once
+            # listening again
+            _listening = False
+            _shops.clear()
+            if listen_pool is not None:
+                listen_pool.terminate()
+        await asyncio.sleep(database.DB_INIT_RETRY_SECONDS)
@@ -0,0 +1,81 @@
+"""
+Fixtures for the tests that go through the API to a real database.
+
+They connect with the DB_* settings, as the API does, and are skipped when
+that database cannot be reached, is not migrated to this build, or the role
+bypasses row-level security (superusers and BYPASSRLS roles see every
+shop's rows). Each test creates its own shops and removes them afterwards.
+
+    cd server && DB_HOST=localhost DB_USER=shop_app python -m pytest -q
+"""
+
+import uuid
+
+import pytest
+
+# Tables holding shop rows, children before parents; the row counters and
+# the sales rollup last, as deleting from the others updates them
+SHOP_TABLES = [
+    'invoice_items', 'invoices', 'inventory', 'customers', 'categories',
+    'purchase_order_items', 'purchase_orders', 'bills',
+    'daily_sales_rollup', 'table_row_counts'
+]
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+@pytest.fixture
+async def db():
+    """The API's pools, connected for the test"""
+    import database
+
+    try:
+        await database.init_db()
+    except Exception as e:
+        pytest.skip(f"No database for the API tests: {e}")
+    try:
+        async with database.checkout(database.pool) as conn:
+            bypasses = await conn.fetchval(
+                'SELECT rolsuper OR rolbypassrls FROM pg_roles WHERE rolname = current_user'
+            )
+        if bypasses:
+            pytest.skip("The database role bypasses row-level security")
+        yield database
+    finally:
+        await database.close_db()
+
+@pytest.fixture
+async def client(db):
+    """HTTP client calling the app in-process"""
+    import httpx
+    import main
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url='http://test') as c:
+        yield c
+
+@pytest.fixture
+async def make_shop(db):
+    """Create shops with an admin each; returns (shop, auth headers) per call"""
+    from create_shop import create_shop
+    from routers.auth import create_jwt_token, token_claims
+
+    created = []
+
+    async def make(name: str = 'Test shop'):
+        suffix = uuid.uuid4().hex[:10]
+        async with db.checkout(db.pool) as conn:
+            shop = await create_shop(conn, name, f"admin_{suffix}", f"{suffix}@example.com", 'test-password')
+        created.append(shop['tenant']['id'])
+        token = create_jwt_token(token_claims(shop['admin']))
+        return shop, {"Authorization": f"Bearer {token}"}
+
+    yield make
+
+    for tenant_id in created:
+        async with db.checkout(db.pool, tenant_id) as conn:
+            async with conn.transaction():
+                for table in SHOP_TABLES:
+                    await conn.execute(f'DELETE FROM {table}')
+                await conn.execute('DELETE FROM users WHERE tenant_id = $1', tenant_id)
+                await conn.execute('DELETE FROM tenants WHERE id = $1', tenant_id)
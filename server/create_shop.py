@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Onboard a shop: create its tenant and its first admin in one transaction.
+
+    cd server && python create_shop.py "Shop name" admin_username admin@example.com
+
+The password is read from SHOP_ADMIN_PASSWORD, or prompted for. The new
+admin signs in as usual and adds staff through /api/auth/register.
+"""
+
+import argparse
+import asyncio
+import getpass
+import logging
+import os
+
+import asyncpg
+
+import passwords
+import queries
+from secret_store import get_secret
+
+logger = logging.getLogger(__name__)
+
+async def create_shop(conn: asyncpg.Connection, name: str, username: str, email: str, password: str) -> dict:
+    """Insert a tenant and its admin; nothing is created if the login is taken"""
+    hashed_password = await passwords.hash_password(password)
+    async with conn.transaction():
+        existing_user = await conn.fetchrow(queries.USER_BY_USERNAME_OR_EMAIL, username, email)
+        if existing_user:
+            raise ValueError("Username or email already exists")
+        tenant = await conn.fetchrow(queries.TENANT_INSERT, name)
+        admin = await conn.fetchrow(
+            queries.USER_INSERT,
+            username, email, hashed_password, 'admin', tenant['id']
+        )
+    return {"tenant": dict(tenant), "admin": dict(admin)}
+
+async def main(args: argparse.Namespace):
+    password = os.getenv('SHOP_ADMIN_PASSWORD') or getpass.getpass(f"Password for {args.username}: ")
+    conn = await asyncpg.connect(
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=int(os.getenv('DB_PORT', '5432')),
+        database=os.getenv('DB_NAME', 'medicine_shop'),
+        user=os.getenv('DB_USER', 'postgres'),
+        password=await get_secret('db-password') or ''
+    )
+    try:
+        shop = await create_shop(conn, args.name, args.username, args.email, password)
+    except ValueError as e:
+        logger.error(f"❌ {e}")
+        raise SystemExit(1)
+    finally:
+        await conn.close()
+        passwords.shutdown()
+    logger.info(
+        f"✅ Created shop {shop['tenant']['id']} ({shop['tenant']['name']}) "
+        f"with admin {shop['admin']['username']}"
+    )
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Create a shop and its first admin")
+    parser.add_argument('name', help="Shop name")
+    parser.add_argument('username', help="Admin username")
+    parser.add_argument('email', help="Admin email")
+    asyncio.run(main(parser.parse_args()))
@@ -3,24 +3,68 @@ import logging
 import asyncpg
 from typing import Optional, Dict, Any
 import asyncio
+import time
 from contextlib import asynccontextmanager
-from google.cloud import secretmanager
+from fastapi import HTTPException, Request, status
+from starlette.datastructures import MutableHeaders
+
+import metrics
+from queries import SET_TENANT
+from secret_store import get_secret
+from run_migrations import SCHEMA_LOCK_KEY, SCHEMA_VERSION, apply_migrations
 
 logger = logging.getLogger(__name__)
 
-# Database connection pool
+# Seconds before the first retry when the database cannot be initialized
+# at startup; the wait doubles after each failure up to the maximum
+DB_INIT_RETRY_SECONDS = float(os.getenv('DB_INIT_RETRY_SECONDS', '5'))
+DB_INIT_RETRY_MAX_SECONDS = float(os.getenv('DB_INIT_RETRY_MAX_SECONDS', '60'))
+# Attempts before the instance gives up and stays unready, so that the
+# readiness probe fails it; 0 retries forever
+DB_INIT_MAX_ATTEMPTS = int(os.getenv('DB_INIT_MAX_ATTEMPTS', '20'))
+
+# Pool settings
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '20'))
+DB_COMMAND_TIMEOUT = float(os.getenv('DB_COMMAND_TIMEOUT', '60'))
+# Idle connections are closed after this many seconds; 0 keeps them forever
+DB_MAX_INACTIVE_LIFETIME = float(os.getenv('DB_MAX_INACTIVE_LIFETIME', '300'))
+# Prepared statements cached per connection
+DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '100'))
+# Session parameters; empty values are left at the server default
+DB_STATEMENT_TIMEOUT = os.getenv('DB_STATEMENT_TIMEOUT', '60s')
+DB_IDLE_IN_TRANSACTION_TIMEOUT = os.getenv('DB_IDLE_IN_TRANSACTION_TIMEOUT', '')
+DB_APPLICATION_NAME = os.getenv('DB_APPLICATION_NAME', 'medicine-shop-api')
+
+# Optional read replica for GET routes; unset values fall back to the
+# primary's, so DB_READ_NAME alone points at another database on the same server
+DB_READ_HOST = os.getenv('DB_READ_HOST', '')
+DB_READ_PORT = os.getenv('DB_READ_PORT', '')
+DB_READ_NAME = os.getenv('DB_READ_NAME', '')
+DB_READ_POOL_MAX_SIZE = int(os.getenv('DB_READ_POOL_MAX_SIZE', str(DB_POOL_MAX_SIZE)))
+READ_POOL_ENABLED = bool(DB_READ_HOST or DB_READ_NAME)
+# Seconds a client's reads stay on the primary after it writes, to cover
+# replication lag; tracked with a cookie
+DB_READ_PIN_SECONDS = int(os.getenv('DB_READ_PIN_SECONDS', '5'))
+DB_READ_PIN_COOKIE = 'db_read_pin'
+# The frontend calls the API cross-site, which needs SameSite=None; Secure
+DB_READ_PIN_SECURE = os.getenv('DB_READ_PIN_SECURE', 'true').lower() == 'true'
+
+# Tenant that owned all data before shops were separated; the default admin
+# and the first admin created through /api/auth/setup belong to it. Further
+# shops are onboarded with create_shop.py
+DEFAULT_TENANT_ID = 1
+
+# Database connection pool, set once the schema is ready
 pool: Optional[asyncpg.Pool] = None
+# Replica pool for reads, None when not configured or not reachable
+read_pool: Optional[asyncpg.Pool] = None
+# Why the last initialization attempt failed, for the readiness probe
+init_error: Optional[str] = None
 
-def get_secret(secret_id: str) -> str:
-    """Get secret from Google Cloud Secret Manager"""
-    try:
-        client = secretmanager.SecretManagerServiceClient()
-        name = f"projects/galvanic-vim-464504-n5/secrets/{secret_id}/versions/latest"
-        response = client.access_secret_version(request={"name": name})
-        return response.payload.data.decode("UTF-8")
-    except Exception as e:
-        logger.error(f"Failed to get secret {secret_id}: {e}")
-        return None
+# Time waiting for a free connection, and time a request holds one
+_acquire_wait = metrics.timer('db.acquire_wait')
+_connection_hold = metrics.timer('db.connection_hold')
 
 async def get_db_pool() -> asyncpg.Pool:
     """Get the database connection pool"""
@@ -29,222 +73,457 @@ async def get_db_pool() -> asyncpg.Pool:
         raise RuntimeError("Database pool not initialized")
     return pool
 
+@asynccontextmanager
+async def checkout(source: Optional[asyncpg.Pool], tenant_id: Optional[int] = None):
+    """Hold a connection from a pool, scoped to a tenant when one is given"""
+    if source is None:
+        # Still warming up in the background
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database is not ready yet",
+            headers={"Retry-After": "1"}
+        )
+    started = time.perf_counter()
+    async with source.acquire() as conn:
+        acquired = time.perf_counter()
+        _acquire_wait.observe(acquired - started)
+        try:
+            if tenant_id is not None:
+                # Row-level security reads the tenant from app.tenant_id;
+                # RESET ALL on release clears it before the next checkout
+                await conn.execute(SET_TENANT, str(tenant_id))
+            yield conn
+        finally:
+            _connection_hold.observe(time.perf_counter() - acquired)
+
 async def get_db():
     """Dependency to get database connection"""
-    pool = await get_db_pool()
-    async with pool.acquire() as conn:
+    # Not scoped to a tenant: for sign-in and other cross-tenant work.
+    # Shop data is read through the dependencies in tenancy.py
+    async with checkout(pool) as conn:
         yield conn
 
-async def init_db():
-    """Initialize database connection and create tables"""
-    global pool
-    
+def pinned(request: Request) -> bool:
+    """Whether the client wrote within the last DB_READ_PIN_SECONDS"""
+    return bool(request.cookies.get(DB_READ_PIN_COOKIE))
+
+def read_source(request: Request) -> Optional[asyncpg.Pool]:
+    """Pool a read should use: the replica unless there is none or the client just wrote"""
+    if read_pool is None:
+        return pool
+    if pinned(request):
+        metrics.increment('db.reads_pinned')
+        return pool
+    metrics.increment('db.reads_on_replica')
+    return read_pool
+
+async def get_read_db_pool() -> asyncpg.Pool:
+    """Pool for long reads such as exports: the replica when there is one"""
+    return read_pool or await get_db_pool()
+
+class ReadYourWritesMiddleware:
+    """Pins a client's reads to the primary for a few seconds after a successful write"""
+
+    SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+    def __init__(self, app, always: bool = False):
+        self.app = app
+        # Pin even without a replica, for other copies that trail the
+        # primary such as the inventory catalog
+        self.always = always
+        self.cookie = f"{DB_READ_PIN_COOKIE}=1; Max-Age={DB_READ_PIN_SECONDS}; Path=/; HttpOnly"
+        self.cookie += "; SameSite=None; Secure" if DB_READ_PIN_SECURE else "; SameSite=Lax"
+
+    async def __call__(self, scope, receive, send):
+        lagging = read_pool is not None or self.always
+        if scope['type'] != 'http' or not lagging or scope['method'] in self.SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message):
+            if message['type'] == 'http.response.start' and message['status'] < 400:
+                MutableHeaders(scope=message).append('set-cookie', self.cookie)
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
+
+def server_settings() -> Dict[str, str]:
+    """Session parameters sent when each connection starts"""
+    # Passed in the startup packet rather than SET from the init hook: the
+    # pool runs RESET ALL whenever a connection is released, which would
+    # undo a SET but restores these
+    settings = {
+        'application_name': DB_APPLICATION_NAME,
+        'statement_timeout': DB_STATEMENT_TIMEOUT,
+        'idle_in_transaction_session_timeout': DB_IDLE_IN_TRANSACTION_TIMEOUT
+    }
+    return {name: value for name, value in settings.items() if value}
+
+def _connection_closed(conn: asyncpg.Connection):
+    metrics.increment('db.connections_closed')
+
+async def init_connection(conn: asyncpg.Connection):
+    """Set up each new pool connection before it is first handed out"""
+    metrics.increment('db.connections_opened')
+    conn.add_termination_listener(_connection_closed)
+
+def pool_options() -> Dict[str, Any]:
+    """Keyword arguments for asyncpg.create_pool from the pool settings"""
+    return {
+        'min_size': DB_POOL_MIN_SIZE,
+        'max_size': DB_POOL_MAX_SIZE,
+        'command_timeout': DB_COMMAND_TIMEOUT,
+        'max_inactive_connection_lifetime': DB_MAX_INACTIVE_LIFETIME,
+        'statement_cache_size': DB_STATEMENT_CACHE_SIZE,
+        'server_settings': server_settings(),
+        'init': init_connection
+    }
+
+def pool_stats() -> Dict[str, Any]:
+    """Pool occupancy, acquire wait and connection churn"""
+    counters = metrics.snapshot()['counters']
+    stats: Dict[str, Any] = {
+        "ready": pool is not None,
+        "min_size": DB_POOL_MIN_SIZE,
+        "max_size": DB_POOL_MAX_SIZE,
+        "size": 0,
+        "in_use": 0,
+        "idle": 0,
+        "acquire_wait": _acquire_wait.snapshot(),
+        "connection_hold": _connection_hold.snapshot(),
+        "connections_opened": counters.get('db.connections_opened', 0),
+        "connections_closed": counters.get('db.connections_closed', 0)
+    }
+    if pool is not None:
+        stats["size"] = pool.get_size()
+        stats["idle"] = pool.get_idle_size()
+        stats["in_use"] = stats["size"] - stats["idle"]
+    if READ_POOL_ENABLED:
+        stats["read"] = {
+            "ready": read_pool is not None,
+            "max_size": DB_READ_POOL_MAX_SIZE,
+            "size": read_pool.get_size() if read_pool else 0,
+            "idle": read_pool.get_idle_size() if read_pool else 0,
+            "reads_on_replica": counters.get('db.reads_on_replica', 0),
+            "reads_pinned": counters.get('db.reads_pinned', 0)
+        }
+    return stats
+
+async def start_db():
+    """Initialize the database in the background, retrying with backoff"""
+    global init_error
+    delay = DB_INIT_RETRY_SECONDS
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            await init_db()
+            init_error = None
+            return
+        except Exception as e:
+            init_error = str(e)
+            if DB_INIT_MAX_ATTEMPTS and attempt >= DB_INIT_MAX_ATTEMPTS:
+                init_error = f"Gave up after {attempt} attempts: {e}"
+                logger.critical(f"❌ {init_error}")
+                return
+            logger.error(f"Retrying database initialization in {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, DB_INIT_RETRY_MAX_SECONDS)
+
+async def create_pool(
+    db_host: str = '',
+    db_port: str = '',
+    db_name: str = '',
+    **overrides
+) -> asyncpg.Pool:
+    """Open a pool to the configured database; arguments replace the DB_* settings and pool options"""
     # Database configuration
-    db_host = os.getenv('DB_HOST', '/cloudsql/galvanic-vim-464504-n5:us-central1:medicine-shop-db')
-    db_port = int(os.getenv('DB_PORT', '5432'))
-    db_name = os.getenv('DB_NAME', 'medicine_shop')
+    db_host = db_host or os.getenv('DB_HOST', '/cloudsql/galvanic-vim-464504-n5:us-central1:medicine-shop-db')
+    db_port = int(db_port or os.getenv('DB_PORT', '5432'))
+    db_name = db_name or os.getenv('DB_NAME', 'medicine_shop')
     db_user = os.getenv('DB_USER', 'medicine-shop-user')
     
-    # Get password from Secret Manager
-    db_password = get_secret('db-password')
-    if not db_password:
-        raise ValueError("Could not retrieve database password from Secret Manager")
+    # Get password from the configured secret providers
+    db_password = await get_secret('db-password')
+    if db_password is None:
+        raise ValueError("Could not retrieve database password from any secret provider")
     
     logger.info(f"Connecting to database: {db_host}:{db_port}/{db_name}")
     
+    options = {**pool_options(), **overrides}
+    if db_host.startswith('/cloudsql/'):
+        # Cloud SQL with Unix domain socket
+        socket_path = db_host
+        return await asyncpg.create_pool(
+            user=db_user,
+            password=db_password,
+            database=db_name,
+            host=socket_path,
+            port=db_port,
+            **options
+        )
+    # Standard TCP connection
+    return await asyncpg.create_pool(
+        host=db_host,
+        port=db_port,
+        database=db_name,
+        user=db_user,
+        password=db_password,
+        **options
+    )
+
+async def init_db():
+    """Connect the pools once the database schema matches this build"""
+    global pool
+    new_pool: Optional[asyncpg.Pool] = None
+    
     try:
         # Create connection pool
-        if db_host.startswith('/cloudsql/'):
-            # Cloud SQL with Unix domain socket
-            socket_path = db_host
-            pool = await asyncpg.create_pool(
-                user=db_user,
-                password=db_password,
-                database=db_name,
-                host=socket_path,
-                port=db_port,
-                min_size=1,
-                max_size=20,
-                command_timeout=60
-            )
-        else:
-            # Standard TCP connection
-            pool = await asyncpg.create_pool(
-                host=db_host,
-                port=db_port,
-                database=db_name,
-                user=db_user,
-                password=db_password,
-                min_size=1,
-                max_size=20,
-                command_timeout=60
-            )
+        new_pool = await create_pool()
         
-        # Test connection
-        async with pool.acquire() as conn:
-            await conn.execute('SELECT 1')
+        # Test connection; the schema version read doubles as the check
+        async with new_pool.acquire() as conn:
+            version = await get_schema_version(conn)
         
-        logger.info("✅ Database connection established")
+        logger.info(f"✅ Database connection established (pool {DB_POOL_MIN_SIZE}-{DB_POOL_MAX_SIZE})")
         
-        # Create tables
-        await create_tables()
-        logger.info("✅ Database tables created successfully")
+        # Migrations are an operator step: some rewrite or lock large tables,
+        # which must not happen as a side effect of an instance starting
+        if version < SCHEMA_VERSION:
+            raise RuntimeError(
+                f"Database schema is at version {version}, this build needs {SCHEMA_VERSION}; "
+                f"run `python run_migrations.py`"
+            )
+        logger.info(f"✅ Database schema is current (version {version})")
         
-        # Create default admin user
-        await create_default_admin()
-        logger.info("✅ Default admin user created")
+        # Requests only get connections once the schema is in place
+        pool, new_pool = new_pool, None
         
     except Exception as e:
         logger.error(f"❌ Database initialization failed: {e}")
         raise e
-
-async def create_tables():
-    """Create all database tables"""
-    pool = await get_db_pool()
+    finally:
+        # Also when the warm-up is cancelled, which `except Exception` misses
+        if new_pool is not None:
+            new_pool.terminate()
     
-    async with pool.acquire() as conn:
-        # Create users table
-        await conn.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                username VARCHAR(255) UNIQUE NOT NULL,
-                email VARCHAR(255) UNIQUE NOT NULL,
-                password VARCHAR(255) NOT NULL,
-                role VARCHAR(50) DEFAULT 'admin',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create categories table
-        await conn.execute('''
-            CREATE TABLE IF NOT EXISTS categories (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Create inventory table
-        await conn.execute('''
-            CREATE TABLE IF NOT EXISTS inventory (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                description TEXT,
-                quantity INTEGER NOT NULL DEFAULT 0,
-                unit_price DECIMAL(10,2) NOT NULL,
-                category_id INTEGER REFERENCES categories(id),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+    if READ_POOL_ENABLED:
+        await init_read_pool()
+
+async def init_read_pool():
+    """Connect the replica pool; without it reads are served by the primary"""
+    global read_pool
+    try:
+        read_pool = await create_pool(
+            DB_READ_HOST, DB_READ_PORT, DB_READ_NAME,
+            min_size=min(DB_POOL_MIN_SIZE, DB_READ_POOL_MAX_SIZE),
+            max_size=DB_READ_POOL_MAX_SIZE
+        )
+        logger.info(f"✅ Read replica connected (pool up to {DB_READ_POOL_MAX_SIZE})")
+    except Exception as e:
+        logger.warning(f"Read replica unavailable, serving reads from the primary: {e}")
+
+async def max_usable_connections() -> int:
+    """max_connections less the slots reserved for superusers, read over a single connection"""
+    setup_pool = await create_pool(min_size=1, max_size=1, init=None)
+    try:
+        async with setup_pool.acquire() as conn:
+            max_connections = int(await conn.fetchval('SHOW max_connections'))
+            return max_connections - int(await conn.fetchval('SHOW superuser_reserved_connections'))
+    finally:
+        await setup_pool.close()
+
+async def get_schema_version(conn: asyncpg.Connection) -> int:
+    """Schema version recorded by the last bootstrap, 0 for a fresh database"""
+    try:
+        version = await conn.fetchval('SELECT version FROM schema_version')
+    except asyncpg.UndefinedTableError:
+        return 0
+    return version or 0
+
+async def bootstrap_schema(conn: asyncpg.Connection):
+    """Create tables, apply migrations and create the default admin under the schema lock"""
+    # Run by run_migrations.py on a connection without a command_timeout;
+    # two runs at once wait here and the second finds the version current
+    await conn.execute('SELECT pg_advisory_lock($1)', SCHEMA_LOCK_KEY)
+    try:
+        version = await get_schema_version(conn)
+        if version >= SCHEMA_VERSION:
+            logger.info(f"✅ Database schema is current (version {version})")
+            return
         
-        # Create customers table
-        await conn.execute('''
-            CREATE TABLE IF NOT EXISTS customers (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                email VARCHAR(255),
-                phone VARCHAR(20),
-                address TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        # Index builds may outlast the server's statement timeout too
+        await conn.execute('SET statement_timeout = 0')
         
-        # Create invoices table
-        await conn.execute('''
-            CREATE TABLE IF NOT EXISTS invoices (
-                id SERIAL PRIMARY KEY,
-                customer_id INTEGER REFERENCES customers(id),
-                total_amount DECIMAL(10,2) NOT NULL,
-                status VARCHAR(50) DEFAULT 'pending',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        # The unnumbered migrations only run on a database created here
+        fresh = await conn.fetchval("SELECT to_regclass('users') IS NULL")
+        await create_tables(conn)
+        logger.info("✅ Database tables created successfully")
         
-        # Create invoice_items table
-        await conn.execute('''
-            CREATE TABLE IF NOT EXISTS invoice_items (
-                id SERIAL PRIMARY KEY,
-                invoice_id INTEGER REFERENCES invoices(id),
-                item_id INTEGER REFERENCES inventory(id),
-                quantity INTEGER NOT NULL,
-                unit_price DECIMAL(10,2) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        await apply_migrations(conn, fresh)
         
-        # Create purchase_orders table
-        await conn.execute('''
-            CREATE TABLE IF NOT EXISTS purchase_orders (
-                id SERIAL PRIMARY KEY,
-                supplier_id INTEGER,
-                total_amount DECIMAL(10,2) NOT NULL,
-                status VARCHAR(50) DEFAULT 'pending',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        await create_default_admin(conn)
         
-        # Create purchase_order_items table
         await conn.execute('''
-            CREATE TABLE IF NOT EXISTS purchase_order_items (
-                id SERIAL PRIMARY KEY,
-                purchase_order_id INTEGER REFERENCES purchase_orders(id),
-                item_id INTEGER REFERENCES inventory(id),
-                quantity INTEGER NOT NULL,
-                unit_price DECIMAL(10,2) NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            CREATE TABLE IF NOT EXISTS schema_version (
+                id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+                version INTEGER NOT NULL,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
         ''')
-        
-        # Create bills table
         await conn.execute('''
-            CREATE TABLE IF NOT EXISTS bills (
-                id SERIAL PRIMARY KEY,
-                supplier_id INTEGER,
-                amount DECIMAL(10,2) NOT NULL,
-                due_date DATE,
-                status VARCHAR(50) DEFAULT 'pending',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+            INSERT INTO schema_version (version) VALUES ($1)
+            ON CONFLICT (id) DO UPDATE SET version = EXCLUDED.version, updated_at = CURRENT_TIMESTAMP
+        ''', SCHEMA_VERSION)
+        logger.info(f"✅ Database schema at version {SCHEMA_VERSION}")
+    finally:
+        await conn.execute('SELECT pg_advisory_unlock($1)', SCHEMA_LOCK_KEY)
 
-async def create_default_admin():
-    """Create default admin user if it doesn't exist"""
-    import bcrypt
+async def create_tables(conn: asyncpg.Connection):
+    """Create all database tables"""
+    # Create users table
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            username VARCHAR(255) UNIQUE NOT NULL,
+            email VARCHAR(255) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            role VARCHAR(50) DEFAULT 'admin',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Create categories table
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS categories (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
     
-    pool = await get_db_pool()
+    # Create inventory table
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS inventory (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            description TEXT,
+            quantity INTEGER NOT NULL DEFAULT 0,
+            unit_price DECIMAL(10,2) NOT NULL,
+            category_id INTEGER REFERENCES categories(id),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Create customers table
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS customers (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            email VARCHAR(255),
+            phone VARCHAR(20),
+            address TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Create invoices table
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS invoices (
+            id SERIAL PRIMARY KEY,
+            customer_id INTEGER REFERENCES customers(id),
+            total_amount DECIMAL(10,2) NOT NULL,
+            status VARCHAR(50) DEFAULT 'pending',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Create invoice_items table
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS invoice_items (
+            id SERIAL PRIMARY KEY,
+            invoice_id INTEGER REFERENCES invoices(id),
+            item_id INTEGER REFERENCES inventory(id),
+            quantity INTEGER NOT NULL,
+            unit_price DECIMAL(10,2) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
     
-    async with pool.acquire() as conn:
-        # Check if admin user exists
-        admin_user = await conn.fetchrow(
-            'SELECT id FROM users WHERE username = $1',
-            'admin'
+    # Create purchase_orders table
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS purchase_orders (
+            id SERIAL PRIMARY KEY,
+            supplier_id INTEGER,
+            total_amount DECIMAL(10,2) NOT NULL,
+            status VARCHAR(50) DEFAULT 'pending',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
+    ''')
+    
+    # Create purchase_order_items table
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS purchase_order_items (
+            id SERIAL PRIMARY KEY,
+            purchase_order_id INTEGER REFERENCES purchase_orders(id),
+            item_id INTEGER REFERENCES inventory(id),
+            quantity INTEGER NOT NULL,
+            unit_price DECIMAL(10,2) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    
+    # Create bills table
+    await conn.execute('''
+        CREATE TABLE IF NOT EXISTS bills (
+            id SERIAL PRIMARY KEY,
+            supplier_id INTEGER,
+            amount DECIMAL(10,2) NOT NULL,
+            due_date DATE,
+            status VARCHAR(50) DEFAULT 'pending',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+async def create_default_admin(conn: asyncpg.Connection):
+    """Create default admin user if it doesn't exist"""
+    from passwords import hash_password
+    
+    # Check if admin user exists
+    admin_user = await conn.fetchrow(
+        'SELECT id FROM users WHERE username = $1',
+        'admin'
+    )
+    
+    if not admin_user:
+        # Create default admin user
+        admin_password = os.getenv('ADMIN_PASSWORD', 'admin123')
+        hashed_password = await hash_password(admin_password)
+        
+        await conn.execute('''
+            INSERT INTO users (username, email, password, role, tenant_id)
+            VALUES ($1, $2, $3, $4, $5)
+        ''', 'admin', 'admin@example.com', hashed_password, 'admin', DEFAULT_TENANT_ID)
         
-        if not admin_user:
-            # Create default admin user
-            admin_password = os.getenv('ADMIN_PASSWORD', 'admin123')
-            hashed_password = bcrypt.hashpw(admin_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-            
-            await conn.execute('''
-                INSERT INTO users (username, email, password, role)
-                VALUES ($1, $2, $3, $4)
-            ''', 'admin', 'admin@example.com', hashed_password, 'admin')
-            
-            logger.info("✅ Default admin user created")
+        logger.info("✅ Default admin user created")
 
 async def close_db():
     """Close database connection pool"""
-    global pool
+    global pool, read_pool
+    if read_pool:
+        await read_pool.close()
+        read_pool = None
     if pool:
         await pool.close()
+        pool = None
         logger.info("Database connection pool closed")
\ No newline at end of file
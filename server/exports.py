@@ -0,0 +1,141 @@
+import csv
+import io
+import json
+import logging
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import asyncpg
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+
+from database import get_read_db_pool
+from queries import SET_TENANT
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+# Rows fetched per server-side cursor round trip
+EXPORT_PREFETCH = 2000
+# Bytes buffered before a chunk is handed to the response
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+def _json_default(value: Any):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class ExportQuery:
+    """A streamed export over a whitelisted set of column expressions"""
+
+    def __init__(self, source: str, columns: Dict[str, str], order_by: str):
+        self.source = source
+        self.available = columns
+        self.order_by = order_by
+        self.columns: List[str] = list(columns)
+        self.conditions: List[str] = []
+        self.args: List[Any] = []
+
+    def select(self, requested: Optional[str]) -> "ExportQuery":
+        """Restrict the export to a comma separated list of column names"""
+        if not requested:
+            return self
+        columns = [column.strip() for column in requested.split(',') if column.strip()]
+        unknown = [column for column in columns if column not in self.available]
+        if unknown or not columns:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown export columns: {', '.join(unknown)}. Available: {', '.join(self.available)}"
+            )
+        self.columns = columns
+        return self
+
+    def date_range(self, column: str, date_from: Optional[date], date_to: Optional[date]) -> "ExportQuery":
+        """Limit rows to whole days from date_from through date_to"""
+        if date_from:
+            self.args.append(datetime.combine(date_from, time.min))
+            self.conditions.append(f"{column} >= ${len(self.args)}::timestamp")
+        if date_to:
+            self.args.append(datetime.combine(date_to + timedelta(days=1), time.min))
+            self.conditions.append(f"{column} < ${len(self.args)}::timestamp")
+        return self
+
+    def sql(self) -> str:
+        select_list = ', '.join(f'{self.available[column]} AS "{column}"' for column in self.columns)
+        sql = f"SELECT {select_list}\nFROM {self.source}"
+        if self.conditions:
+            sql += "\nWHERE " + " AND ".join(self.conditions)
+        return sql + f"\nORDER BY {self.order_by}"
+
+async def _stream(
+    pool: asyncpg.Pool,
+    query: ExportQuery,
+    export_format: str,
+    tenant_id: int
+) -> AsyncIterator[bytes]:
+    """Yield encoded chunks from a server-side cursor"""
+    sql = query.sql()
+    columns = query.columns
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == 'csv':
+        writer.writerow(columns)
+
+    # The connection is acquired here rather than through Depends(get_db) so
+    # that it stays checked out for as long as the response is streaming
+    async with pool.acquire() as conn:
+        await conn.execute(SET_TENANT, str(tenant_id))
+        try:
+            async with conn.transaction(isolation='repeatable_read', readonly=True):
+                async for record in conn.cursor(sql, *query.args, prefetch=EXPORT_PREFETCH):
+                    if export_format == 'csv':
+                        writer.writerow(record.values())
+                    else:
+                        buffer.write(json.dumps(dict(record.items()), default=_json_default))
+                        buffer.write('\n')
+                    if buffer.tell() >= EXPORT_CHUNK_SIZE:
+                        yield buffer.getvalue().encode('utf-8')
+                        buffer.seek(0)
+                        buffer.truncate()
+        except Exception as e:
+            # Headers are already sent, so the client sees a truncated body
+            logger.error(f"Export failed mid-stream: {e}")
+            raise
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+async def export_response(
+    query: ExportQuery,
+    export_format: str,
+    filename: str,
+    tenant_id: int
+) -> StreamingResponse:
+    """Stream an export of one shop's rows as CSV or NDJSON"""
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported export format: {export_format}. Use one of: {', '.join(EXPORT_FORMATS)}"
+        )
+    # Resolved before the response starts: once the stream has begun, the
+    # client would get a truncated 200 instead of a 503
+    try:
+        pool = await get_read_db_pool()
+    except RuntimeError:
+        pool = None
+    if pool is None or pool.is_closing():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database is not ready yet",
+            headers={"Retry-After": "1"}
+        )
+    return StreamingResponse(
+        _stream(pool, query, export_format, tenant_id),
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'}
+    )
@@ -1,19 +1,25 @@
 from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from contextlib import asynccontextmanager
+import asyncio
 import os
 import logging
 from typing import Optional
-import uvicorn
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
 # Import routers
-from routers import auth, inventory, customers, invoices, bills, purchase_orders, categories, staff, wholesalers, dashboard
-from database import init_db, get_db
+from routers import auth, inventory, customers, invoices, bills, purchase_orders, categories, staff, wholesalers, dashboard, admin
+from database import start_db, close_db, get_db, ReadYourWritesMiddleware
+import catalog
+import database
+import partitions
+import passwords
+from responses import FastJSONResponse
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -29,6 +35,14 @@ allowed_origins = [
     "http://localhost:8080"
 ]
 
+async def warm_up():
+    """Calibrate password hashing and bring up the database in the background"""
+    # Pick the bcrypt cost for this CPU before anything is hashed
+    await passwords.calibrate()
+    await start_db()
+    if database.pool is not None:
+        logger.info("✅ Database initialized successfully")
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
@@ -37,28 +51,40 @@ async def lifespan(app: FastAPI):
     logger.info(f"PORT: {os.getenv('PORT', '8080')}")
     logger.info(f"DB_HOST: {os.getenv('DB_HOST', 'localhost')}")
     
-    # Initialize database
-    try:
-        await init_db()
-        logger.info("✅ Database initialized successfully")
-    except Exception as e:
-        logger.error(f"❌ Database initialization failed: {e}")
-        raise e
+    # Liveness checks are answered while the pool connects; /api/ready
+    # reports when database-backed routes can be served
+    warm_up_task = asyncio.create_task(warm_up())
+    # Keeps invoice partitions ready ahead of time; see partitions.py
+    maintenance_task = asyncio.create_task(partitions.maintenance_loop())
+    # Keeps the in-process inventory catalogs current; see catalog.py
+    catalog_task = asyncio.create_task(catalog.listen())
     
     logger.info("🚀 Server ready to accept requests")
     yield
     
     # Shutdown
     logger.info("Shutting down Medicine Shop SaaS Backend...")
+    background_tasks = [warm_up_task, maintenance_task, catalog_task]
+    for task in background_tasks:
+        task.cancel()
+    # Let them release their connections before the pools close
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await close_db()
+    passwords.shutdown()
 
 # Create FastAPI app
 app = FastAPI(
     title="Medicine Shop SaaS API",
     description="Backend API for Medicine Shop SaaS application",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
+# Keep a client's reads on the primary briefly after it writes, when a
+# read replica is configured or inventory reads are served from the catalog
+app.add_middleware(ReadYourWritesMiddleware, always=catalog.CATALOG_ENABLED)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -74,6 +100,16 @@ async def health_check():
     logger.info("Health check endpoint hit")
     return {"status": "OK", "message": "Server is running"}
 
+# Readiness check endpoint
+@app.get("/api/ready")
+async def readiness_check():
+    if database.pool is None:
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "STARTING", "message": database.init_error or "Database is initializing"}
+        )
+    return {"status": "OK", "message": "Database is ready"}
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(inventory.router, prefix="/api/inventory", tags=["Inventory"])
@@ -85,6 +121,7 @@ app.include_router(categories.router, prefix="/api/categories", tags=["Categorie
 app.include_router(staff.router, prefix="/api/staff", tags=["Staff"])
 app.include_router(wholesalers.router, prefix="/api/wholesalers", tags=["Wholesalers"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
 
 # Root endpoint
 @app.get("/")
@@ -96,6 +133,8 @@ async def root():
     }
 
 if __name__ == "__main__":
+    import uvicorn
+    
     port = int(os.getenv("PORT", 8080))
     uvicorn.run(
         "main:app",
@@ -0,0 +1,70 @@
+import threading
+from collections import deque
+from typing import Deque, Dict
+
+# Recent samples kept per timer for percentile estimates
+METRICS_WINDOW = 1024
+
+class Timer:
+    """Running latency statistics in milliseconds over all and recent samples"""
+
+    def __init__(self, window: int = METRICS_WINDOW):
+        self._lock = threading.Lock()
+        self._recent: Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float):
+        """Record one duration given in seconds"""
+        ms = seconds * 1000
+        with self._lock:
+            self.count += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+            self._recent.append(ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            recent = sorted(self._recent)
+            count, total_ms, max_ms = self.count, self.total_ms, self.max_ms
+
+        def percentile(fraction: float) -> float:
+            if not recent:
+                return 0.0
+            return round(recent[min(len(recent) - 1, int(len(recent) * fraction))], 3)
+
+        return {
+            "count": count,
+            "mean_ms": round(total_ms / count, 3) if count else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": round(max_ms, 3)
+        }
+
+_timers: Dict[str, Timer] = {}
+_counters: Dict[str, int] = {}
+_lock = threading.Lock()
+
+def timer(name: str) -> Timer:
+    """Get or create the named timer"""
+    with _lock:
+        if name not in _timers:
+            _timers[name] = Timer()
+        return _timers[name]
+
+def increment(name: str, amount: int = 1):
+    """Add to the named counter"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+def snapshot() -> dict:
+    """Current values of every counter and timer"""
+    with _lock:
+        timers = dict(_timers)
+        counters = dict(_counters)
+    return {
+        "counters": counters,
+        "timers": {name: t.snapshot() for name, t in sorted(timers.items())}
+    }
@@ -0,0 +1,75 @@
+-- Row counts behind the dashboard, maintained by statement-level triggers
+-- so the dashboard never has to COUNT(*) the business tables
+CREATE TABLE IF NOT EXISTS table_row_counts (
+    table_name TEXT PRIMARY KEY,
+    row_count BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION count_inserted_rows() RETURNS trigger AS $$
+DECLARE
+    delta BIGINT;
+BEGIN
+    SELECT COUNT(*) INTO delta FROM new_rows;
+    IF delta > 0 THEN
+        UPDATE table_row_counts SET row_count = row_count + delta WHERE table_name = TG_TABLE_NAME;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION count_deleted_rows() RETURNS trigger AS $$
+DECLARE
+    delta BIGINT;
+BEGIN
+    SELECT COUNT(*) INTO delta FROM old_rows;
+    IF delta > 0 THEN
+        UPDATE table_row_counts SET row_count = row_count - delta WHERE table_name = TG_TABLE_NAME;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION count_truncated_rows() RETURNS trigger AS $$
+BEGIN
+    UPDATE table_row_counts SET row_count = 0 WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    counted TEXT;
+BEGIN
+    FOREACH counted IN ARRAY ARRAY['inventory', 'customers', 'invoices', 'bills'] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', counted || '_count_insert', counted);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', counted || '_count_delete', counted);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', counted || '_count_truncate', counted);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT ON %I REFERENCING NEW TABLE AS new_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION count_inserted_rows()',
+            counted || '_count_insert', counted
+        );
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER DELETE ON %I REFERENCING OLD TABLE AS old_rows '
+            'FOR EACH STATEMENT EXECUTE FUNCTION count_deleted_rows()',
+            counted || '_count_delete', counted
+        );
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION count_truncated_rows()',
+            counted || '_count_truncate', counted
+        );
+    END LOOP;
+END;
+$$;
+
+-- Seed the counters; the lock keeps writes from slipping in between the
+-- trigger creation and the initial counts
+LOCK TABLE inventory, customers, invoices, bills IN SHARE MODE;
+
+INSERT INTO table_row_counts (table_name, row_count)
+SELECT 'inventory', COUNT(*) FROM inventory
+UNION ALL SELECT 'customers', COUNT(*) FROM customers
+UNION ALL SELECT 'invoices', COUNT(*) FROM invoices
+UNION ALL SELECT 'bills', COUNT(*) FROM bills
+ON CONFLICT (table_name) DO UPDATE SET row_count = EXCLUDED.row_count;
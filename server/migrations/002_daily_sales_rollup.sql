@@ -0,0 +1,115 @@
+-- Daily sales per category, maintained incrementally from invoice_items so
+-- the dashboard charts never scan invoices or invoice_items.
+-- category_id 0 collects custom (non-inventory) and uncategorised lines.
+-- Lines are attributed to the item's category at the time the trigger runs.
+CREATE TABLE IF NOT EXISTS daily_sales_rollup (
+    day DATE NOT NULL,
+    category_id INTEGER NOT NULL DEFAULT 0,
+    line_count BIGINT NOT NULL DEFAULT 0,
+    quantity BIGINT NOT NULL DEFAULT 0,
+    sales_amount NUMERIC(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, category_id)
+);
+
+-- Folds signed invoice item changes into the rollup; the transition tables
+-- of the calling trigger are visible to the dynamic query
+CREATE OR REPLACE FUNCTION rollup_invoice_items() RETURNS trigger AS $$
+DECLARE
+    changes TEXT;
+BEGIN
+    changes := CASE TG_OP
+        WHEN 'INSERT' THEN
+            'SELECT invoice_id, inventory_id, quantity, unit_price, discount_amount, gst_amount, 1 AS sign FROM new_rows'
+        WHEN 'DELETE' THEN
+            'SELECT invoice_id, inventory_id, quantity, unit_price, discount_amount, gst_amount, -1 AS sign FROM old_rows'
+        ELSE
+            'SELECT invoice_id, inventory_id, quantity, unit_price, discount_amount, gst_amount, 1 AS sign FROM new_rows '
+            'UNION ALL '
+            'SELECT invoice_id, inventory_id, quantity, unit_price, discount_amount, gst_amount, -1 AS sign FROM old_rows'
+    END;
+
+    EXECUTE format($sql$
+        INSERT INTO daily_sales_rollup AS r (day, category_id, line_count, quantity, sales_amount)
+        SELECT
+            COALESCE(i.invoice_date, i.created_at)::date,
+            COALESCE(inv.category_id, 0),
+            SUM(c.sign),
+            SUM(c.sign * c.quantity),
+            SUM(c.sign * (c.quantity * c.unit_price - COALESCE(c.discount_amount, 0) + COALESCE(c.gst_amount, 0)))
+        FROM (%s) c
+        JOIN invoices i ON i.id = c.invoice_id
+        LEFT JOIN inventory inv ON inv.id = c.inventory_id
+        GROUP BY 1, 2
+        ON CONFLICT (day, category_id) DO UPDATE SET
+            line_count = r.line_count + EXCLUDED.line_count,
+            quantity = r.quantity + EXCLUDED.quantity,
+            sales_amount = r.sales_amount + EXCLUDED.sales_amount
+    $sql$, changes);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Moves the lines of invoices whose invoice_date changed to their new day
+CREATE OR REPLACE FUNCTION rollup_invoice_dates() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO daily_sales_rollup AS r (day, category_id, line_count, quantity, sales_amount)
+    SELECT
+        moved.day,
+        COALESCE(inv.category_id, 0),
+        SUM(moved.sign),
+        SUM(moved.sign * ii.quantity),
+        SUM(moved.sign * (ii.quantity * ii.unit_price - COALESCE(ii.discount_amount, 0) + COALESCE(ii.gst_amount, 0)))
+    FROM (
+        SELECT n.id, COALESCE(n.invoice_date, n.created_at)::date AS day, 1 AS sign
+        FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE COALESCE(n.invoice_date, n.created_at)::date <> COALESCE(o.invoice_date, o.created_at)::date
+        UNION ALL
+        SELECT o.id, COALESCE(o.invoice_date, o.created_at)::date, -1
+        FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE COALESCE(n.invoice_date, n.created_at)::date <> COALESCE(o.invoice_date, o.created_at)::date
+    ) moved
+    JOIN invoice_items ii ON ii.invoice_id = moved.id
+    LEFT JOIN inventory inv ON inv.id = ii.inventory_id
+    GROUP BY 1, 2
+    ON CONFLICT (day, category_id) DO UPDATE SET
+        line_count = r.line_count + EXCLUDED.line_count,
+        quantity = r.quantity + EXCLUDED.quantity,
+        sales_amount = r.sales_amount + EXCLUDED.sales_amount;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS invoice_items_rollup_insert ON invoice_items;
+DROP TRIGGER IF EXISTS invoice_items_rollup_update ON invoice_items;
+DROP TRIGGER IF EXISTS invoice_items_rollup_delete ON invoice_items;
+DROP TRIGGER IF EXISTS invoices_rollup_dates ON invoices;
+
+CREATE TRIGGER invoice_items_rollup_insert
+    AFTER INSERT ON invoice_items REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_invoice_items();
+CREATE TRIGGER invoice_items_rollup_update
+    AFTER UPDATE ON invoice_items REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_invoice_items();
+CREATE TRIGGER invoice_items_rollup_delete
+    AFTER DELETE ON invoice_items REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_invoice_items();
+CREATE TRIGGER invoices_rollup_dates
+    AFTER UPDATE ON invoices REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_invoice_dates();
+
+-- Backfill from existing sales
+LOCK TABLE invoices, invoice_items IN SHARE MODE;
+
+TRUNCATE daily_sales_rollup;
+
+INSERT INTO daily_sales_rollup (day, category_id, line_count, quantity, sales_amount)
+SELECT
+    COALESCE(i.invoice_date, i.created_at)::date,
+    COALESCE(inv.category_id, 0),
+    COUNT(*),
+    SUM(ii.quantity),
+    SUM(ii.quantity * ii.unit_price - COALESCE(ii.discount_amount, 0) + COALESCE(ii.gst_amount, 0))
+FROM invoice_items ii
+JOIN invoices i ON i.id = ii.invoice_id
+LEFT JOIN inventory inv ON inv.id = ii.inventory_id
+GROUP BY 1, 2;
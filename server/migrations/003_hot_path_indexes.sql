@@ -0,0 +1,67 @@
+-- migrate:no-transaction
+-- Secondary indexes for the hot query paths, built without blocking writes.
+-- A build that fails leaves an INVALID index behind; run_migrations.py
+-- drops it and builds it again when the migration is re-run.
+-- users.username and users.email are already covered by their UNIQUE
+-- constraints, so the login OR lookup becomes a BitmapOr of those two.
+
+-- Invoice line items by invoice (invoice list page, exports, FK checks)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_invoice_items_invoice_id
+    ON invoice_items (invoice_id);
+
+-- Line items by inventory item (FK checks on inventory deletes, item history)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_invoice_items_inventory_id
+    ON invoice_items (inventory_id);
+
+-- Customer resolution by phone at checkout and in batch ingestion
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_customers_phone
+    ON customers (phone);
+
+-- Expiring items report and dashboard count
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_inventory_expiry_date
+    ON inventory (expiry_date);
+
+-- Inventory CSV import upsert key
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_inventory_name_batch
+    ON inventory (name, (COALESCE(batch_number, '')));
+
+-- Keyset pagination: ORDER BY created_at DESC, id DESC on every list
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_inventory_created_at
+    ON inventory (created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_inventory_category_created_at
+    ON inventory (category_id, created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_customers_created_at
+    ON customers (created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_invoices_created_at
+    ON invoices (created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_invoices_status_created_at
+    ON invoices (status, created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_invoices_customer_id
+    ON invoices (customer_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bills_created_at
+    ON bills (created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bills_status_created_at
+    ON bills (status, created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_purchase_orders_created_at
+    ON purchase_orders (created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_purchase_orders_status_created_at
+    ON purchase_orders (status, created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_categories_created_at
+    ON categories (created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_role_created_at
+    ON users (role, created_at DESC, id DESC);
+
+-- Invoice date ranges (exports, reports)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_invoices_invoice_date
+    ON invoices (invoice_date);
@@ -0,0 +1,21 @@
+-- migrate:no-transaction
+-- Precomputed stock ratio for the low-stock report. Out-of-stock items rank
+-- first at 0; a reorder level of 0 leaves the ratio NULL instead of dividing
+-- by zero. Adding a stored column rewrites inventory once.
+ALTER TABLE inventory ADD COLUMN IF NOT EXISTS stock_ratio DOUBLE PRECISION
+    GENERATED ALWAYS AS (
+        CASE
+            WHEN quantity <= 0 THEN 0
+            ELSE quantity::double precision / NULLIF(reorder_level, 0)
+        END
+    ) STORED;
+
+-- Only items at or below their reorder level are indexed, already in report
+-- order; also serves the dashboard low-stock count
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_inventory_low_stock
+    ON inventory (stock_ratio, id)
+    WHERE quantity <= reorder_level;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_inventory_low_stock_category
+    ON inventory (category_id, stock_ratio, id)
+    WHERE quantity <= reorder_level;
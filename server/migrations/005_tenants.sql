@@ -0,0 +1,147 @@
+-- Shops hosted in this database. Every business table carries the owning
+-- tenant_id and row-level security limits a session to the rows of the
+-- tenant in app.tenant_id, which the API sets on each connection it hands
+-- out. Existing data becomes tenant 1.
+CREATE TABLE IF NOT EXISTS tenants (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO tenants (id, name) VALUES (1, 'Default shop') ON CONFLICT (id) DO NOTHING;
+SELECT setval(pg_get_serial_sequence('tenants', 'id'), (SELECT MAX(id) FROM tenants));
+
+-- NULL when the setting is missing or was reset, so a session without a
+-- tenant sees no rows and cannot insert any. Simple enough to be inlined,
+-- which lets tenant-leading indexes serve the policy predicate.
+CREATE OR REPLACE FUNCTION current_tenant_id() RETURNS INTEGER AS $$
+    SELECT NULLIF(current_setting('app.tenant_id', true), '')::integer
+$$ LANGUAGE sql STABLE;
+
+-- Users are looked up by login before the tenant is known, so they carry a
+-- tenant but are not under row-level security; queries filter explicitly
+ALTER TABLE users ADD COLUMN IF NOT EXISTS tenant_id INTEGER NOT NULL DEFAULT 1 REFERENCES tenants(id);
+ALTER TABLE users ALTER COLUMN tenant_id DROP DEFAULT;
+
+DO $$
+DECLARE
+    scoped TEXT;
+BEGIN
+    FOREACH scoped IN ARRAY ARRAY[
+        'categories', 'inventory', 'customers', 'invoices', 'invoice_items',
+        'purchase_orders', 'purchase_order_items', 'bills',
+        'daily_sales_rollup', 'table_row_counts'
+    ] LOOP
+        -- A constant default fills existing rows without rewriting the
+        -- table; new rows then take the session's tenant
+        EXECUTE format(
+            'ALTER TABLE %I ADD COLUMN IF NOT EXISTS tenant_id INTEGER NOT NULL DEFAULT 1 REFERENCES tenants(id)',
+            scoped
+        );
+        EXECUTE format('ALTER TABLE %I ALTER COLUMN tenant_id SET DEFAULT current_tenant_id()', scoped);
+        EXECUTE format('ALTER TABLE %I ENABLE ROW LEVEL SECURITY', scoped);
+        -- The API connects as the table owner, which is exempt unless forced
+        EXECUTE format('ALTER TABLE %I FORCE ROW LEVEL SECURITY', scoped);
+        EXECUTE format('DROP POLICY IF EXISTS tenant_isolation ON %I', scoped);
+        EXECUTE format(
+            'CREATE POLICY tenant_isolation ON %I '
+            'USING (tenant_id = current_tenant_id()) '
+            'WITH CHECK (tenant_id = current_tenant_id())',
+            scoped
+        );
+    END LOOP;
+END;
+$$;
+
+-- Counters and the sales rollup are kept per tenant
+ALTER TABLE table_row_counts DROP CONSTRAINT table_row_counts_pkey;
+ALTER TABLE table_row_counts ADD PRIMARY KEY (tenant_id, table_name);
+
+ALTER TABLE daily_sales_rollup DROP CONSTRAINT daily_sales_rollup_pkey;
+ALTER TABLE daily_sales_rollup ADD PRIMARY KEY (tenant_id, day, category_id);
+
+CREATE OR REPLACE FUNCTION count_inserted_rows() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO table_row_counts AS t (tenant_id, table_name, row_count)
+    SELECT tenant_id, TG_TABLE_NAME, COUNT(*) FROM new_rows GROUP BY tenant_id
+    ON CONFLICT (tenant_id, table_name) DO UPDATE SET row_count = t.row_count + EXCLUDED.row_count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION count_deleted_rows() RETURNS trigger AS $$
+BEGIN
+    UPDATE table_row_counts t
+    SET row_count = t.row_count - d.deleted
+    FROM (SELECT tenant_id, COUNT(*) AS deleted FROM old_rows GROUP BY tenant_id) d
+    WHERE t.tenant_id = d.tenant_id AND t.table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rollup_invoice_items() RETURNS trigger AS $$
+DECLARE
+    changes TEXT;
+BEGIN
+    changes := CASE TG_OP
+        WHEN 'INSERT' THEN
+            'SELECT tenant_id, invoice_id, inventory_id, quantity, unit_price, discount_amount, gst_amount, 1 AS sign FROM new_rows'
+        WHEN 'DELETE' THEN
+            'SELECT tenant_id, invoice_id, inventory_id, quantity, unit_price, discount_amount, gst_amount, -1 AS sign FROM old_rows'
+        ELSE
+            'SELECT tenant_id, invoice_id, inventory_id, quantity, unit_price, discount_amount, gst_amount, 1 AS sign FROM new_rows '
+            'UNION ALL '
+            'SELECT tenant_id, invoice_id, inventory_id, quantity, unit_price, discount_amount, gst_amount, -1 AS sign FROM old_rows'
+    END;
+
+    EXECUTE format($sql$
+        INSERT INTO daily_sales_rollup AS r (tenant_id, day, category_id, line_count, quantity, sales_amount)
+        SELECT
+            c.tenant_id,
+            COALESCE(i.invoice_date, i.created_at)::date,
+            COALESCE(inv.category_id, 0),
+            SUM(c.sign),
+            SUM(c.sign * c.quantity),
+            SUM(c.sign * (c.quantity * c.unit_price - COALESCE(c.discount_amount, 0) + COALESCE(c.gst_amount, 0)))
+        FROM (%s) c
+        JOIN invoices i ON i.id = c.invoice_id
+        LEFT JOIN inventory inv ON inv.id = c.inventory_id
+        GROUP BY 1, 2, 3
+        ON CONFLICT (tenant_id, day, category_id) DO UPDATE SET
+            line_count = r.line_count + EXCLUDED.line_count,
+            quantity = r.quantity + EXCLUDED.quantity,
+            sales_amount = r.sales_amount + EXCLUDED.sales_amount
+    $sql$, changes);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rollup_invoice_dates() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO daily_sales_rollup AS r (tenant_id, day, category_id, line_count, quantity, sales_amount)
+    SELECT
+        moved.tenant_id,
+        moved.day,
+        COALESCE(inv.category_id, 0),
+        SUM(moved.sign),
+        SUM(moved.sign * ii.quantity),
+        SUM(moved.sign * (ii.quantity * ii.unit_price - COALESCE(ii.discount_amount, 0) + COALESCE(ii.gst_amount, 0)))
+    FROM (
+        SELECT n.id, n.tenant_id, COALESCE(n.invoice_date, n.created_at)::date AS day, 1 AS sign
+        FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE COALESCE(n.invoice_date, n.created_at)::date <> COALESCE(o.invoice_date, o.created_at)::date
+        UNION ALL
+        SELECT o.id, o.tenant_id, COALESCE(o.invoice_date, o.created_at)::date, -1
+        FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE COALESCE(n.invoice_date, n.created_at)::date <> COALESCE(o.invoice_date, o.created_at)::date
+    ) moved
+    JOIN invoice_items ii ON ii.invoice_id = moved.id
+    LEFT JOIN inventory inv ON inv.id = ii.inventory_id
+    GROUP BY 1, 2, 3
+    ON CONFLICT (tenant_id, day, category_id) DO UPDATE SET
+        line_count = r.line_count + EXCLUDED.line_count,
+        quantity = r.quantity + EXCLUDED.quantity,
+        sales_amount = r.sales_amount + EXCLUDED.sales_amount;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,79 @@
+-- migrate:no-transaction
+-- Rebuilds the hot-path indexes from 003 and 004 with tenant_id leading, so
+-- a shop's pages, reports and lookups read only that shop's index range.
+-- Lookups by a row id (invoice items by invoice or inventory item, invoices
+-- by customer) are already tenant-selective and keep their indexes.
+-- A build that fails leaves an INVALID index behind; run_migrations.py
+-- drops it and builds it again when the migration is re-run.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_customers_tenant_phone
+    ON customers (tenant_id, phone);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_inventory_tenant_expiry_date
+    ON inventory (tenant_id, expiry_date);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_inventory_tenant_name_batch
+    ON inventory (tenant_id, name, (COALESCE(batch_number, '')));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_inventory_tenant_created_at
+    ON inventory (tenant_id, created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_inventory_tenant_category_created_at
+    ON inventory (tenant_id, category_id, created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_inventory_tenant_low_stock
+    ON inventory (tenant_id, stock_ratio, id)
+    WHERE quantity <= reorder_level;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_inventory_tenant_low_stock_category
+    ON inventory (tenant_id, category_id, stock_ratio, id)
+    WHERE quantity <= reorder_level;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_customers_tenant_created_at
+    ON customers (tenant_id, created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_invoices_tenant_created_at
+    ON invoices (tenant_id, created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_invoices_tenant_status_created_at
+    ON invoices (tenant_id, status, created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_invoices_tenant_invoice_date
+    ON invoices (tenant_id, invoice_date);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bills_tenant_created_at
+    ON bills (tenant_id, created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_bills_tenant_status_created_at
+    ON bills (tenant_id, status, created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_purchase_orders_tenant_created_at
+    ON purchase_orders (tenant_id, created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_purchase_orders_tenant_status_created_at
+    ON purchase_orders (tenant_id, status, created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_categories_tenant_created_at
+    ON categories (tenant_id, created_at DESC, id DESC);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_tenant_role_created_at
+    ON users (tenant_id, role, created_at DESC, id DESC);
+
+-- The platform-wide versions are superseded
+DROP INDEX CONCURRENTLY IF EXISTS idx_customers_phone;
+DROP INDEX CONCURRENTLY IF EXISTS idx_inventory_expiry_date;
+DROP INDEX CONCURRENTLY IF EXISTS idx_inventory_name_batch;
+DROP INDEX CONCURRENTLY IF EXISTS idx_inventory_created_at;
+DROP INDEX CONCURRENTLY IF EXISTS idx_inventory_category_created_at;
+DROP INDEX CONCURRENTLY IF EXISTS idx_inventory_low_stock;
+DROP INDEX CONCURRENTLY IF EXISTS idx_inventory_low_stock_category;
+DROP INDEX CONCURRENTLY IF EXISTS idx_customers_created_at;
+DROP INDEX CONCURRENTLY IF EXISTS idx_invoices_created_at;
+DROP INDEX CONCURRENTLY IF EXISTS idx_invoices_status_created_at;
+DROP INDEX CONCURRENTLY IF EXISTS idx_invoices_invoice_date;
+DROP INDEX CONCURRENTLY IF EXISTS idx_bills_created_at;
+DROP INDEX CONCURRENTLY IF EXISTS idx_bills_status_created_at;
+DROP INDEX CONCURRENTLY IF EXISTS idx_purchase_orders_created_at;
+DROP INDEX CONCURRENTLY IF EXISTS idx_purchase_orders_status_created_at;
+DROP INDEX CONCURRENTLY IF EXISTS idx_categories_created_at;
+DROP INDEX CONCURRENTLY IF EXISTS idx_users_role_created_at;
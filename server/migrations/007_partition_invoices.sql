@@ -0,0 +1,206 @@
+-- Monthly range partitions for invoices (on created_at) and invoice_items
+-- (on the created_at of their invoice, copied into invoice_created_at), so
+-- lists, date filters and maintenance touch only the months involved and a
+-- shop's history no longer grows one heap and one set of indexes forever.
+-- Existing rows are copied into the new tables while both are locked.
+-- There is deliberately no default partition: partitions.py creates months
+-- ahead of time, and a row outside every partition fails loudly instead of
+-- piling up where pruning cannot skip it.
+-- Invoices are keyed by (id, created_at) from here on; 012 adds the map
+-- that id lookups go through. The copy holds both tables exclusively for
+-- its whole run, so this is applied only by run_migrations.py, at a quiet
+-- hour, never by an instance starting up.
+
+-- The owner copies every shop's rows, so the policies must not hide them
+ALTER TABLE invoices NO FORCE ROW LEVEL SECURITY;
+ALTER TABLE invoice_items NO FORCE ROW LEVEL SECURITY;
+LOCK TABLE invoices, invoice_items IN ACCESS EXCLUSIVE MODE;
+
+UPDATE invoices SET created_at = COALESCE(invoice_date, updated_at, CURRENT_TIMESTAMP) WHERE created_at IS NULL;
+
+ALTER TABLE invoice_items RENAME TO invoice_items_unpartitioned;
+ALTER TABLE invoices RENAME TO invoices_unpartitioned;
+-- The id sequences outlive the old tables
+ALTER SEQUENCE invoices_id_seq OWNED BY NONE;
+ALTER SEQUENCE invoice_items_id_seq OWNED BY NONE;
+
+CREATE TABLE invoices (LIKE invoices_unpartitioned INCLUDING DEFAULTS)
+    PARTITION BY RANGE (created_at);
+ALTER TABLE invoices ALTER COLUMN created_at SET NOT NULL;
+ALTER SEQUENCE invoices_id_seq OWNED BY invoices.id;
+
+CREATE TABLE invoice_items (
+    LIKE invoice_items_unpartitioned INCLUDING DEFAULTS,
+    invoice_created_at TIMESTAMP NOT NULL
+) PARTITION BY RANGE (invoice_created_at);
+ALTER SEQUENCE invoice_items_id_seq OWNED BY invoice_items.id;
+
+-- Creates the monthly partitions of both tables from first_month through
+-- last_month that do not exist yet; returns how many months were added
+CREATE OR REPLACE FUNCTION create_invoice_partitions(first_month DATE, last_month DATE) RETURNS INTEGER AS $$
+DECLARE
+    month_start DATE := date_trunc('month', first_month);
+    suffix TEXT;
+    added INTEGER := 0;
+BEGIN
+    WHILE month_start <= last_month LOOP
+        suffix := to_char(month_start, 'YYYY_MM');
+        IF to_regclass('invoices_p' || suffix) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF invoices FOR VALUES FROM (%L) TO (%L)',
+                'invoices_p' || suffix, month_start, month_start + interval '1 month'
+            );
+            added := added + 1;
+        END IF;
+        IF to_regclass('invoice_items_p' || suffix) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF invoice_items FOR VALUES FROM (%L) TO (%L)',
+                'invoice_items_p' || suffix, month_start, month_start + interval '1 month'
+            );
+        END IF;
+        month_start := month_start + interval '1 month';
+    END LOOP;
+    RETURN added;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT create_invoice_partitions(
+    LEAST(
+        COALESCE((SELECT MIN(created_at) FROM invoices_unpartitioned), CURRENT_TIMESTAMP),
+        COALESCE((SELECT MIN(created_at) FROM invoice_items_unpartitioned), CURRENT_TIMESTAMP)
+    )::date,
+    GREATEST(
+        COALESCE((SELECT MAX(created_at) FROM invoices_unpartitioned), CURRENT_TIMESTAMP),
+        CURRENT_TIMESTAMP + interval '3 months'
+    )::date
+);
+
+INSERT INTO invoices SELECT * FROM invoices_unpartitioned;
+
+-- Items without an invoice keep their own timestamp as the partition key
+INSERT INTO invoice_items
+SELECT ii.*, COALESCE(i.created_at, ii.created_at, CURRENT_TIMESTAMP)
+FROM invoice_items_unpartitioned ii
+LEFT JOIN invoices_unpartitioned i ON i.id = ii.invoice_id;
+
+DROP TABLE invoice_items_unpartitioned;
+DROP TABLE invoices_unpartitioned;
+
+-- Constraints and indexes are added to the parents, which cascades them to
+-- every partition, once the old tables have given up their names
+ALTER TABLE invoices ADD PRIMARY KEY (id, created_at);
+ALTER TABLE invoices ADD FOREIGN KEY (customer_id) REFERENCES customers(id);
+ALTER TABLE invoices ADD FOREIGN KEY (tenant_id) REFERENCES tenants(id);
+ALTER TABLE invoice_items ADD PRIMARY KEY (id, invoice_created_at);
+ALTER TABLE invoice_items ADD FOREIGN KEY (invoice_id, invoice_created_at) REFERENCES invoices(id, created_at);
+ALTER TABLE invoice_items ADD FOREIGN KEY (inventory_id) REFERENCES inventory(id);
+ALTER TABLE invoice_items ADD FOREIGN KEY (tenant_id) REFERENCES tenants(id);
+
+CREATE INDEX idx_invoices_tenant_created_at ON invoices (tenant_id, created_at DESC, id DESC);
+CREATE INDEX idx_invoices_tenant_status_created_at ON invoices (tenant_id, status, created_at DESC, id DESC);
+CREATE INDEX idx_invoices_tenant_invoice_date ON invoices (tenant_id, invoice_date);
+CREATE INDEX idx_invoices_customer_id ON invoices (customer_id);
+CREATE INDEX idx_invoice_items_invoice_id ON invoice_items (invoice_id);
+CREATE INDEX idx_invoice_items_inventory_id ON invoice_items (inventory_id);
+
+ALTER TABLE invoices ENABLE ROW LEVEL SECURITY;
+ALTER TABLE invoices FORCE ROW LEVEL SECURITY;
+CREATE POLICY tenant_isolation ON invoices
+    USING (tenant_id = current_tenant_id())
+    WITH CHECK (tenant_id = current_tenant_id());
+ALTER TABLE invoice_items ENABLE ROW LEVEL SECURITY;
+ALTER TABLE invoice_items FORCE ROW LEVEL SECURITY;
+CREATE POLICY tenant_isolation ON invoice_items
+    USING (tenant_id = current_tenant_id())
+    WITH CHECK (tenant_id = current_tenant_id());
+
+-- The rollup joins carry the partition key so each lookup is pruned to one month
+CREATE OR REPLACE FUNCTION rollup_invoice_items() RETURNS trigger AS $$
+DECLARE
+    changes TEXT;
+BEGIN
+    changes := CASE TG_OP
+        WHEN 'INSERT' THEN
+            'SELECT tenant_id, invoice_id, invoice_created_at, inventory_id, quantity, unit_price, discount_amount, gst_amount, 1 AS sign FROM new_rows'
+        WHEN 'DELETE' THEN
+            'SELECT tenant_id, invoice_id, invoice_created_at, inventory_id, quantity, unit_price, discount_amount, gst_amount, -1 AS sign FROM old_rows'
+        ELSE
+            'SELECT tenant_id, invoice_id, invoice_created_at, inventory_id, quantity, unit_price, discount_amount, gst_amount, 1 AS sign FROM new_rows '
+            'UNION ALL '
+            'SELECT tenant_id, invoice_id, invoice_created_at, inventory_id, quantity, unit_price, discount_amount, gst_amount, -1 AS sign FROM old_rows'
+    END;
+
+    EXECUTE format($sql$
+        INSERT INTO daily_sales_rollup AS r (tenant_id, day, category_id, line_count, quantity, sales_amount)
+        SELECT
+            c.tenant_id,
+            COALESCE(i.invoice_date, i.created_at)::date,
+            COALESCE(inv.category_id, 0),
+            SUM(c.sign),
+            SUM(c.sign * c.quantity),
+            SUM(c.sign * (c.quantity * c.unit_price - COALESCE(c.discount_amount, 0) + COALESCE(c.gst_amount, 0)))
+        FROM (%s) c
+        JOIN invoices i ON i.id = c.invoice_id AND i.created_at = c.invoice_created_at
+        LEFT JOIN inventory inv ON inv.id = c.inventory_id
+        GROUP BY 1, 2, 3
+        ON CONFLICT (tenant_id, day, category_id) DO UPDATE SET
+            line_count = r.line_count + EXCLUDED.line_count,
+            quantity = r.quantity + EXCLUDED.quantity,
+            sales_amount = r.sales_amount + EXCLUDED.sales_amount
+    $sql$, changes);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rollup_invoice_dates() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO daily_sales_rollup AS r (tenant_id, day, category_id, line_count, quantity, sales_amount)
+    SELECT
+        moved.tenant_id,
+        moved.day,
+        COALESCE(inv.category_id, 0),
+        SUM(moved.sign),
+        SUM(moved.sign * ii.quantity),
+        SUM(moved.sign * (ii.quantity * ii.unit_price - COALESCE(ii.discount_amount, 0) + COALESCE(ii.gst_amount, 0)))
+    FROM (
+        SELECT n.id, n.created_at, n.tenant_id, COALESCE(n.invoice_date, n.created_at)::date AS day, 1 AS sign
+        FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE COALESCE(n.invoice_date, n.created_at)::date <> COALESCE(o.invoice_date, o.created_at)::date
+        UNION ALL
+        SELECT o.id, o.created_at, o.tenant_id, COALESCE(o.invoice_date, o.created_at)::date, -1
+        FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE COALESCE(n.invoice_date, n.created_at)::date <> COALESCE(o.invoice_date, o.created_at)::date
+    ) moved
+    JOIN invoice_items ii ON ii.invoice_id = moved.id AND ii.invoice_created_at = moved.created_at
+    LEFT JOIN inventory inv ON inv.id = ii.inventory_id
+    GROUP BY 1, 2, 3
+    ON CONFLICT (tenant_id, day, category_id) DO UPDATE SET
+        line_count = r.line_count + EXCLUDED.line_count,
+        quantity = r.quantity + EXCLUDED.quantity,
+        sales_amount = r.sales_amount + EXCLUDED.sales_amount;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Triggers of the old tables went with them
+CREATE TRIGGER invoices_count_insert
+    AFTER INSERT ON invoices REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION count_inserted_rows();
+CREATE TRIGGER invoices_count_delete
+    AFTER DELETE ON invoices REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION count_deleted_rows();
+CREATE TRIGGER invoices_count_truncate
+    AFTER TRUNCATE ON invoices
+    FOR EACH STATEMENT EXECUTE FUNCTION count_truncated_rows();
+CREATE TRIGGER invoices_rollup_dates
+    AFTER UPDATE ON invoices REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_invoice_dates();
+CREATE TRIGGER invoice_items_rollup_insert
+    AFTER INSERT ON invoice_items REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_invoice_items();
+CREATE TRIGGER invoice_items_rollup_update
+    AFTER UPDATE ON invoice_items REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_invoice_items();
+CREATE TRIGGER invoice_items_rollup_delete
+    AFTER DELETE ON invoice_items REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_invoice_items();
@@ -0,0 +1,100 @@
+-- Lookups behind GET /api/inventory/search, kept within one shop. An
+-- expression index on lower(name) or a full-text index over the item could
+-- not serve them: under row-level security the planner only uses a
+-- condition to bound an index scan if its functions are leakproof, and
+-- neither lower() nor tsvector @@ is, so each search would read every item
+-- of the shop. Lowercased names, and the words of each item's name,
+-- manufacturer and batch number ('simple', unstemmed), are kept here
+-- instead, keyed by shop in the "C" collation. A name or word prefix is
+-- then a range scan of that shop's part of a primary key, with plain text
+-- comparisons, which are leakproof.
+
+CREATE TABLE IF NOT EXISTS inventory_search_names (
+    tenant_id INTEGER NOT NULL DEFAULT current_tenant_id() REFERENCES tenants(id),
+    name_key TEXT COLLATE "C" NOT NULL,
+    inventory_id INTEGER NOT NULL REFERENCES inventory(id) ON DELETE CASCADE,
+    PRIMARY KEY (tenant_id, name_key, inventory_id)
+);
+
+CREATE TABLE IF NOT EXISTS inventory_search_terms (
+    tenant_id INTEGER NOT NULL DEFAULT current_tenant_id() REFERENCES tenants(id),
+    term TEXT COLLATE "C" NOT NULL,
+    inventory_id INTEGER NOT NULL REFERENCES inventory(id) ON DELETE CASCADE,
+    PRIMARY KEY (tenant_id, term, inventory_id)
+);
+
+-- Item deletes cascade through these, and renames replace an item's keys
+CREATE INDEX IF NOT EXISTS idx_inventory_search_names_inventory_id
+    ON inventory_search_names (inventory_id);
+CREATE INDEX IF NOT EXISTS idx_inventory_search_terms_inventory_id
+    ON inventory_search_terms (inventory_id);
+
+CREATE OR REPLACE FUNCTION inventory_terms(item_name TEXT, manufacturer TEXT, batch_number TEXT)
+RETURNS TEXT[] AS $$
+    SELECT tsvector_to_array(to_tsvector('simple',
+        COALESCE(item_name, '') || ' ' || COALESCE(manufacturer, '') || ' ' || COALESCE(batch_number, '')
+    ))
+$$ LANGUAGE sql IMMUTABLE;
+
+-- New items, once per statement so that a CSV import indexes in one pass
+CREATE OR REPLACE FUNCTION index_inserted_inventory_terms() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO inventory_search_names (tenant_id, name_key, inventory_id)
+    SELECT n.tenant_id, lower(n.name), n.id
+    FROM new_rows n;
+    INSERT INTO inventory_search_terms (tenant_id, term, inventory_id)
+    SELECT n.tenant_id, term, n.id
+    FROM new_rows n, unnest(inventory_terms(n.name, n.manufacturer, n.batch_number)) AS term
+    ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Renamed items; stock updates do not touch the searched columns and skip it
+CREATE OR REPLACE FUNCTION index_updated_inventory_terms() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM inventory_search_names WHERE inventory_id = OLD.id;
+    INSERT INTO inventory_search_names (tenant_id, name_key, inventory_id)
+    VALUES (NEW.tenant_id, lower(NEW.name), NEW.id);
+    DELETE FROM inventory_search_terms WHERE inventory_id = OLD.id;
+    INSERT INTO inventory_search_terms (tenant_id, term, inventory_id)
+    SELECT NEW.tenant_id, term, NEW.id
+    FROM unnest(inventory_terms(NEW.name, NEW.manufacturer, NEW.batch_number)) AS term
+    ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS inventory_terms_insert ON inventory;
+DROP TRIGGER IF EXISTS inventory_terms_update ON inventory;
+
+CREATE TRIGGER inventory_terms_insert
+    AFTER INSERT ON inventory REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION index_inserted_inventory_terms();
+CREATE TRIGGER inventory_terms_update
+    AFTER UPDATE OF name, manufacturer, batch_number, tenant_id ON inventory
+    FOR EACH ROW
+    WHEN ((OLD.name, OLD.manufacturer, OLD.batch_number, OLD.tenant_id)
+          IS DISTINCT FROM (NEW.name, NEW.manufacturer, NEW.batch_number, NEW.tenant_id))
+    EXECUTE FUNCTION index_updated_inventory_terms();
+
+-- Existing items, before the policies apply: this runs without a tenant
+INSERT INTO inventory_search_names (tenant_id, name_key, inventory_id)
+SELECT tenant_id, lower(name), id FROM inventory;
+INSERT INTO inventory_search_terms (tenant_id, term, inventory_id)
+SELECT i.tenant_id, term, i.id
+FROM inventory i, unnest(inventory_terms(i.name, i.manufacturer, i.batch_number)) AS term
+ON CONFLICT DO NOTHING;
+
+ALTER TABLE inventory_search_names ENABLE ROW LEVEL SECURITY;
+ALTER TABLE inventory_search_names FORCE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS tenant_isolation ON inventory_search_names;
+CREATE POLICY tenant_isolation ON inventory_search_names
+    USING (tenant_id = current_tenant_id())
+    WITH CHECK (tenant_id = current_tenant_id());
+ALTER TABLE inventory_search_terms ENABLE ROW LEVEL SECURITY;
+ALTER TABLE inventory_search_terms FORCE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS tenant_isolation ON inventory_search_terms;
+CREATE POLICY tenant_isolation ON inventory_search_terms
+    USING (tenant_id = current_tenant_id())
+    WITH CHECK (tenant_id = current_tenant_id());
@@ -0,0 +1,57 @@
+-- Publishes inventory changes on the inventory_changes channel so that the
+-- in-process catalogs of every API worker (catalog.py) can apply them. Each
+-- statement sends one notification per shop it touched, carrying the ids
+-- of the changed rows; listeners re-read those rows by id. Payloads are
+-- capped well below the 8000 byte NOTIFY limit: a statement changing more
+-- rows than fit (a CSV import, say) sends the shop alone and listeners
+-- reload that shop. Notifications are delivered when the transaction
+-- commits and dropped when it rolls back.
+CREATE OR REPLACE FUNCTION notify_inventory_changes() RETURNS trigger AS $$
+DECLARE
+    changes TEXT;
+    shop RECORD;
+BEGIN
+    changes := CASE TG_OP
+        WHEN 'INSERT' THEN 'SELECT tenant_id, id FROM new_rows'
+        WHEN 'DELETE' THEN 'SELECT tenant_id, id FROM old_rows'
+        ELSE 'SELECT tenant_id, id FROM new_rows UNION SELECT tenant_id, id FROM old_rows'
+    END;
+
+    FOR shop IN EXECUTE format(
+        'SELECT tenant_id, array_agg(DISTINCT id ORDER BY id) AS ids FROM (%s) c GROUP BY tenant_id', changes
+    ) LOOP
+        IF cardinality(shop.ids) > 500 THEN
+            PERFORM pg_notify('inventory_changes', json_build_object('tenant_id', shop.tenant_id)::text);
+        ELSE
+            PERFORM pg_notify('inventory_changes', json_build_object('tenant_id', shop.tenant_id, 'ids', shop.ids)::text);
+        END IF;
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- An empty payload asks listeners to drop every shop
+CREATE OR REPLACE FUNCTION notify_inventory_truncate() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('inventory_changes', '{}');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS inventory_notify_insert ON inventory;
+DROP TRIGGER IF EXISTS inventory_notify_update ON inventory;
+DROP TRIGGER IF EXISTS inventory_notify_delete ON inventory;
+DROP TRIGGER IF EXISTS inventory_notify_truncate ON inventory;
+
+CREATE TRIGGER inventory_notify_insert
+    AFTER INSERT ON inventory REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_inventory_changes();
+CREATE TRIGGER inventory_notify_update
+    AFTER UPDATE ON inventory REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_inventory_changes();
+CREATE TRIGGER inventory_notify_delete
+    AFTER DELETE ON inventory REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_inventory_changes();
+CREATE TRIGGER inventory_notify_truncate
+    AFTER TRUNCATE ON inventory
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_inventory_truncate();
@@ -0,0 +1,35 @@
+-- Spreads each shop's row counters over shards. With a single row per shop
+-- and table, every insert or delete took that row's lock until commit, so a
+-- shop's concurrent invoice writes queued behind one another. Each
+-- statement now adds its delta to one of 8 shards picked at random, and
+-- readers sum the shards. Deletes add a negative delta the same way
+-- instead of updating a row every writer shares.
+ALTER TABLE table_row_counts ADD COLUMN IF NOT EXISTS shard SMALLINT NOT NULL DEFAULT 0;
+ALTER TABLE table_row_counts DROP CONSTRAINT table_row_counts_pkey;
+ALTER TABLE table_row_counts ADD PRIMARY KEY (tenant_id, table_name, shard);
+
+CREATE OR REPLACE FUNCTION row_count_shard() RETURNS SMALLINT AS $$
+    SELECT floor(random() * 8)::SMALLINT
+$$ LANGUAGE sql VOLATILE;
+
+-- Shops are taken in key order so that statements spanning several shops
+-- lock their counter rows in the same order
+CREATE OR REPLACE FUNCTION count_inserted_rows() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO table_row_counts AS t (tenant_id, table_name, shard, row_count)
+    SELECT tenant_id, TG_TABLE_NAME, row_count_shard(), COUNT(*)
+    FROM new_rows GROUP BY tenant_id ORDER BY tenant_id
+    ON CONFLICT (tenant_id, table_name, shard) DO UPDATE SET row_count = t.row_count + EXCLUDED.row_count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION count_deleted_rows() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO table_row_counts AS t (tenant_id, table_name, shard, row_count)
+    SELECT tenant_id, TG_TABLE_NAME, row_count_shard(), -COUNT(*)
+    FROM old_rows GROUP BY tenant_id ORDER BY tenant_id
+    ON CONFLICT (tenant_id, table_name, shard) DO UPDATE SET row_count = t.row_count + EXCLUDED.row_count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,77 @@
+-- Folds rollup changes in key order. Two invoices for the same shop,
+-- each touching several categories, upserted their rollup rows in whatever
+-- order the aggregate produced them and could deadlock on each other's
+-- rows; sorting on (tenant_id, day, category_id) makes every writer take
+-- the locks in the same order.
+-- The day no longer depends on finding the invoice: a line falls on its
+-- invoice's date if it has one, otherwise on the invoice's creation day,
+-- which the item carries itself. An item whose invoice row is not visible
+-- is still counted, on that day, rather than dropped by the join.
+CREATE OR REPLACE FUNCTION rollup_invoice_items() RETURNS trigger AS $$
+DECLARE
+    changes TEXT;
+BEGIN
+    changes := CASE TG_OP
+        WHEN 'INSERT' THEN
+            'SELECT tenant_id, invoice_id, invoice_created_at, inventory_id, quantity, unit_price, discount_amount, gst_amount, 1 AS sign FROM new_rows'
+        WHEN 'DELETE' THEN
+            'SELECT tenant_id, invoice_id, invoice_created_at, inventory_id, quantity, unit_price, discount_amount, gst_amount, -1 AS sign FROM old_rows'
+        ELSE
+            'SELECT tenant_id, invoice_id, invoice_created_at, inventory_id, quantity, unit_price, discount_amount, gst_amount, 1 AS sign FROM new_rows '
+            'UNION ALL '
+            'SELECT tenant_id, invoice_id, invoice_created_at, inventory_id, quantity, unit_price, discount_amount, gst_amount, -1 AS sign FROM old_rows'
+    END;
+
+    EXECUTE format($sql$
+        INSERT INTO daily_sales_rollup AS r (tenant_id, day, category_id, line_count, quantity, sales_amount)
+        SELECT
+            c.tenant_id,
+            COALESCE(i.invoice_date, c.invoice_created_at)::date,
+            COALESCE(inv.category_id, 0),
+            SUM(c.sign),
+            SUM(c.sign * c.quantity),
+            SUM(c.sign * (c.quantity * c.unit_price - COALESCE(c.discount_amount, 0) + COALESCE(c.gst_amount, 0)))
+        FROM (%s) c
+        LEFT JOIN invoices i ON i.id = c.invoice_id AND i.created_at = c.invoice_created_at
+        LEFT JOIN inventory inv ON inv.id = c.inventory_id
+        GROUP BY 1, 2, 3
+        ORDER BY 1, 2, 3
+        ON CONFLICT (tenant_id, day, category_id) DO UPDATE SET
+            line_count = r.line_count + EXCLUDED.line_count,
+            quantity = r.quantity + EXCLUDED.quantity,
+            sales_amount = r.sales_amount + EXCLUDED.sales_amount
+    $sql$, changes);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rollup_invoice_dates() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO daily_sales_rollup AS r (tenant_id, day, category_id, line_count, quantity, sales_amount)
+    SELECT
+        moved.tenant_id,
+        moved.day,
+        COALESCE(inv.category_id, 0),
+        SUM(moved.sign),
+        SUM(moved.sign * ii.quantity),
+        SUM(moved.sign * (ii.quantity * ii.unit_price - COALESCE(ii.discount_amount, 0) + COALESCE(ii.gst_amount, 0)))
+    FROM (
+        SELECT n.id, n.created_at, n.tenant_id, COALESCE(n.invoice_date, n.created_at)::date AS day, 1 AS sign
+        FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE COALESCE(n.invoice_date, n.created_at)::date <> COALESCE(o.invoice_date, o.created_at)::date
+        UNION ALL
+        SELECT o.id, o.created_at, o.tenant_id, COALESCE(o.invoice_date, o.created_at)::date, -1
+        FROM new_rows n JOIN old_rows o ON o.id = n.id
+        WHERE COALESCE(n.invoice_date, n.created_at)::date <> COALESCE(o.invoice_date, o.created_at)::date
+    ) moved
+    JOIN invoice_items ii ON ii.invoice_id = moved.id AND ii.invoice_created_at = moved.created_at
+    LEFT JOIN inventory inv ON inv.id = ii.inventory_id
+    GROUP BY 1, 2, 3
+    ORDER BY 1, 2, 3
+    ON CONFLICT (tenant_id, day, category_id) DO UPDATE SET
+        line_count = r.line_count + EXCLUDED.line_count,
+        quantity = r.quantity + EXCLUDED.quantity,
+        sales_amount = r.sales_amount + EXCLUDED.sales_amount;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
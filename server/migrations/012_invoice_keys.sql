@@ -0,0 +1,64 @@
+-- Maps each invoice id to its created_at. Invoices are partitioned on
+-- created_at and keyed by (id, created_at) since 007, so a lookup by id
+-- alone probes the index of every monthly partition, a cost that grows with
+-- the shop's history. Id lookups read the map first and then visit only the
+-- partition holding the invoice. Kept by statement-level triggers; archiving
+-- a partition (partitions.py) drops its invoices' entries.
+CREATE TABLE IF NOT EXISTS invoice_keys (
+    id INTEGER PRIMARY KEY,
+    created_at TIMESTAMP NOT NULL,
+    tenant_id INTEGER NOT NULL DEFAULT current_tenant_id() REFERENCES tenants(id)
+);
+
+CREATE OR REPLACE FUNCTION add_invoice_keys() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO invoice_keys (id, created_at, tenant_id)
+    SELECT id, created_at, tenant_id FROM new_rows;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Nothing moves an invoice to another month today, but the map must follow
+CREATE OR REPLACE FUNCTION move_invoice_keys() RETURNS trigger AS $$
+BEGIN
+    UPDATE invoice_keys k
+    SET created_at = n.created_at
+    FROM new_rows n JOIN old_rows o ON o.id = n.id
+    WHERE k.id = n.id AND n.created_at <> o.created_at;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION drop_invoice_keys() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM invoice_keys k USING old_rows o WHERE k.id = o.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS invoices_keys_insert ON invoices;
+DROP TRIGGER IF EXISTS invoices_keys_update ON invoices;
+DROP TRIGGER IF EXISTS invoices_keys_delete ON invoices;
+
+CREATE TRIGGER invoices_keys_insert
+    AFTER INSERT ON invoices REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION add_invoice_keys();
+CREATE TRIGGER invoices_keys_update
+    AFTER UPDATE ON invoices REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION move_invoice_keys();
+CREATE TRIGGER invoices_keys_delete
+    AFTER DELETE ON invoices REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION drop_invoice_keys();
+
+-- Existing invoices, before the policy applies: this runs without a tenant.
+-- Creating the triggers locked out writers until this transaction commits
+INSERT INTO invoice_keys (id, created_at, tenant_id)
+SELECT id, created_at, tenant_id FROM invoices
+ON CONFLICT (id) DO NOTHING;
+
+ALTER TABLE invoice_keys ENABLE ROW LEVEL SECURITY;
+ALTER TABLE invoice_keys FORCE ROW LEVEL SECURITY;
+DROP POLICY IF EXISTS tenant_isolation ON invoice_keys;
+CREATE POLICY tenant_isolation ON invoice_keys
+    USING (tenant_id = current_tenant_id())
+    WITH CHECK (tenant_id = current_tenant_id());
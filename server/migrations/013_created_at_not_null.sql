@@ -0,0 +1,32 @@
+-- Makes created_at NOT NULL on every table listed in (created_at, id) keyset
+-- order, as 007 did for invoices. A row without one broke its page: the
+-- next-page cursor could not be encoded from it, and the keyset comparison
+-- skipped it on every later page. Legacy rows without one take their last
+-- update time, or the migration's. SET NOT NULL scans each table under an
+-- exclusive lock, which these tables are small enough for.
+DO $$
+DECLARE
+    paged TEXT;
+BEGIN
+    FOREACH paged IN ARRAY ARRAY[
+        'users', 'categories', 'inventory', 'customers', 'purchase_orders', 'bills'
+    ] LOOP
+        -- The owner fills every shop's rows, so the policies must not hide
+        -- them; FORCE is restored below, before the transaction commits
+        EXECUTE format('ALTER TABLE %I NO FORCE ROW LEVEL SECURITY', paged);
+        EXECUTE format(
+            'UPDATE %I SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP) WHERE created_at IS NULL',
+            paged
+        );
+        EXECUTE format('ALTER TABLE %I ALTER COLUMN created_at SET NOT NULL', paged);
+        EXECUTE format('ALTER TABLE %I ALTER COLUMN created_at SET DEFAULT CURRENT_TIMESTAMP', paged);
+    END LOOP;
+END;
+$$;
+
+-- users is not under row-level security
+ALTER TABLE categories FORCE ROW LEVEL SECURITY;
+ALTER TABLE inventory FORCE ROW LEVEL SECURITY;
+ALTER TABLE customers FORCE ROW LEVEL SECURITY;
+ALTER TABLE purchase_orders FORCE ROW LEVEL SECURITY;
+ALTER TABLE bills FORCE ROW LEVEL SECURITY;
@@ -0,0 +1,63 @@
+-- Makes (name, batch number) unique within a shop, the key the CSV import
+-- has always matched items on. The import now upserts with ON CONFLICT on
+-- this index, so two concurrent imports, or an import racing a create, can
+-- no longer both insert the same item.
+-- Items already entered more than once are merged into the oldest of them:
+-- the others' stock is added to it, their invoice and purchase order lines
+-- point at it (also in archived invoice partitions, which keep their
+-- foreign key), and they are deleted. Shops are taken one at a time as the
+-- tenant of the transaction, since row-level security applies to the owner
+-- too. The index is built in this transaction, so that no duplicate can be
+-- written between the merge and the build; inventory writes wait for it.
+DO $$
+DECLARE
+    shop INTEGER;
+    archived REGCLASS;
+BEGIN
+    FOR shop IN SELECT id FROM tenants ORDER BY id LOOP
+        PERFORM set_config('app.tenant_id', shop::text, true);
+
+        CREATE TEMP TABLE inventory_merge ON COMMIT DROP AS
+        SELECT id, keep_id FROM (
+            SELECT id, min(id) OVER (PARTITION BY name, COALESCE(batch_number, '')) AS keep_id
+            FROM inventory
+        ) items
+        WHERE id <> keep_id;
+
+        UPDATE inventory keep
+        SET quantity = keep.quantity + merged.quantity, updated_at = CURRENT_TIMESTAMP
+        FROM (
+            SELECT m.keep_id, SUM(i.quantity) AS quantity
+            FROM inventory_merge m JOIN inventory i ON i.id = m.id
+            GROUP BY m.keep_id
+        ) merged
+        WHERE keep.id = merged.keep_id;
+
+        UPDATE invoice_items ii SET inventory_id = m.keep_id
+        FROM inventory_merge m WHERE ii.inventory_id = m.id;
+        UPDATE purchase_order_items poi SET item_id = m.keep_id
+        FROM inventory_merge m WHERE poi.item_id = m.id;
+        FOR archived IN
+            SELECT c.conrelid::regclass
+            FROM pg_constraint c
+            JOIN pg_class r ON r.oid = c.conrelid
+            JOIN pg_namespace n ON n.oid = r.relnamespace
+            WHERE c.confrelid = 'inventory'::regclass AND c.contype = 'f' AND n.nspname = 'invoice_archive'
+        LOOP
+            EXECUTE format(
+                'UPDATE %s ii SET inventory_id = m.keep_id FROM inventory_merge m WHERE ii.inventory_id = m.id',
+                archived
+            );
+        END LOOP;
+        DELETE FROM inventory i USING inventory_merge m WHERE i.id = m.id;
+
+        DROP TABLE inventory_merge;
+    END LOOP;
+END;
+$$;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_inventory_tenant_name_batch_unique
+    ON inventory (tenant_id, name, (COALESCE(batch_number, '')));
+
+-- Superseded by the unique index, which serves the same lookups
+DROP INDEX IF EXISTS idx_inventory_tenant_name_batch;
@@ -0,0 +1,6 @@
+-- Counts each user's password changes. Tokens carry the count they were
+-- issued at, in their token_version claim, and are refused once it moves
+-- on, so that changing a password signs out every other session. Tokens
+-- issued before this claim existed count as version 0 and stay valid until
+-- the user's first change.
+ALTER TABLE users ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,113 @@
+import base64
+import binascii
+from datetime import date, datetime, time, timedelta
+from typing import Any, List, Optional, Tuple
+
+import asyncpg
+from fastapi import HTTPException, Query, status
+
+from responses import FastJSONResponse, json_response
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """Encode a (created_at, id) keyset position as an opaque cursor"""
+    raw = f"{created_at.isoformat()}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    """Decode an opaque cursor back into its (created_at, id) keyset position"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+        created_at, row_id = raw.rsplit('|', 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+class PageParams:
+    """Query parameters shared by every paginated list endpoint"""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+        cursor: Optional[str] = None,
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
+    ):
+        self.limit = limit
+        self.position = decode_cursor(cursor)
+        self.date_from = date_from
+        self.date_to = date_to
+
+class KeysetQuery:
+    """SELECT builder that adds filters and (created_at, id) keyset paging"""
+
+    def __init__(self, select: str, alias: Optional[str] = None):
+        self.select = select
+        self.prefix = f"{alias}." if alias else ""
+        self.conditions: List[str] = []
+        self.args: List[Any] = []
+
+    def param(self, value: Any) -> str:
+        """Bind a value and return its positional placeholder"""
+        self.args.append(value)
+        return f"${len(self.args)}"
+
+    def where(self, condition: str, *values: Any) -> "KeysetQuery":
+        """Add a condition, filling each {} in it with a bound value"""
+        self.conditions.append(condition.format(*(self.param(value) for value in values)))
+        return self
+
+    def where_equal(self, column: str, value: Any) -> "KeysetQuery":
+        """Add an equality filter unless the value was not supplied"""
+        if value is not None:
+            self.where(f"{column} = {{}}", value)
+        return self
+
+    def build(self, page: PageParams) -> str:
+        """Return the SQL for one page; fetches one extra row to detect more pages"""
+        created_at = f"{self.prefix}created_at"
+        row_id = f"{self.prefix}id"
+        if page.date_from:
+            self.where(f"{created_at} >= {{}}::timestamp", datetime.combine(page.date_from, time.min))
+        if page.date_to:
+            self.where(f"{created_at} < {{}}::timestamp", datetime.combine(page.date_to + timedelta(days=1), time.min))
+        if page.position:
+            # The plain bound is implied by the row comparison, but only it
+            # lets the planner skip partitions newer than the cursor
+            self.where(
+                f"{created_at} <= {{0}}::timestamp AND ({created_at}, {row_id}) < ({{0}}::timestamp, {{1}}::integer)",
+                *page.position
+            )
+
+        sql = self.select
+        if self.conditions:
+            sql += "\nWHERE " + " AND ".join(self.conditions)
+        sql += f"\nORDER BY {created_at} DESC, {row_id} DESC\nLIMIT {self.param(page.limit + 1)}"
+        return sql
+
+async def fetch_page(
+    conn: asyncpg.Connection,
+    query: KeysetQuery,
+    page: PageParams
+) -> Tuple[List[asyncpg.Record], Optional[str]]:
+    """Fetch one page of rows and the cursor for the page after it"""
+    rows = await conn.fetch(query.build(page), *query.args)
+    if len(rows) <= page.limit:
+        return rows, None
+    rows = rows[:page.limit]
+    return rows, encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+
+def page_response(rows: List[Any], next_cursor: Optional[str]) -> FastJSONResponse:
+    """Standard list envelope carrying the next page cursor"""
+    return json_response({
+        "success": True,
+        "data": rows,
+        "next_cursor": next_cursor
+    })
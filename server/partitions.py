@@ -0,0 +1,225 @@
+"""
+Upkeep of the monthly invoice partitions created by migrations/007.
+
+Creates the partitions for the coming months before any invoice needs them,
+freezes closed months so that autovacuum never has to rescan them in an
+anti-wraparound pass, and, when a retention period is set, detaches months
+past it into the invoice_archive schema, where they can be dumped and
+dropped without touching the live tables. The API runs this in the
+background on a connection of its own, outside the request pool; it can
+also be run from a scheduler:
+
+    cd server && python partitions.py
+"""
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+from dotenv import load_dotenv
+
+# Load environment variables from .env file when run as a script
+load_dotenv()
+
+import database
+
+logger = logging.getLogger(__name__)
+
+# Months of partitions kept ready beyond the current one
+INVOICE_PARTITIONS_AHEAD = int(os.getenv('INVOICE_PARTITIONS_AHEAD', '3'))
+# Months after which a partition is considered closed and may be frozen
+INVOICE_FREEZE_AFTER_MONTHS = int(os.getenv('INVOICE_FREEZE_AFTER_MONTHS', '1'))
+# Months of invoices kept in the live tables; 0 keeps everything
+INVOICE_RETENTION_MONTHS = int(os.getenv('INVOICE_RETENTION_MONTHS', '0'))
+# Hours between background runs in the API; 0 disables them
+PARTITION_MAINTENANCE_HOURS = float(os.getenv('PARTITION_MAINTENANCE_HOURS', '24'))
+# Seconds a single maintenance statement (a VACUUM of a partition) may take
+PARTITION_MAINTENANCE_TIMEOUT = float(os.getenv('PARTITION_MAINTENANCE_TIMEOUT', '3600'))
+# Wait for the lock on invoices or invoice_items before creating or
+# detaching partitions gives up until the next run. Invoice reads and writes
+# queue behind the waiting statement, so this bounds their stall
+PARTITION_LOCK_TIMEOUT = os.getenv('PARTITION_LOCK_TIMEOUT', '5s')
+
+ARCHIVE_SCHEMA = 'invoice_archive'
+# Session advisory lock held by whichever worker runs the maintenance
+MAINTENANCE_LOCK_KEY = 7201541
+
+PARTITIONS_SQL = r'''
+    SELECT
+        c.relname AS name,
+        to_date(substring(c.relname from '_p(\d{4}_\d{2})$'), 'YYYY_MM') AS month,
+        age(c.relfrozenxid) AS xid_age
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = $1::regclass AND c.relname ~ '_p\d{4}_\d{2}$'
+    ORDER BY month
+'''
+
+async def partitions_of(conn: asyncpg.Connection, parent: str) -> List[asyncpg.Record]:
+    """Monthly partitions of a table, oldest first"""
+    return await conn.fetch(PARTITIONS_SQL, parent)
+
+async def set_lock_timeout(conn: asyncpg.Connection):
+    """Give up on a table lock after PARTITION_LOCK_TIMEOUT for the rest of the transaction"""
+    await conn.execute("SELECT set_config('lock_timeout', $1, true)", PARTITION_LOCK_TIMEOUT)
+
+async def ensure_partitions(conn: asyncpg.Connection, months_ahead: int = INVOICE_PARTITIONS_AHEAD) -> int:
+    """Create any missing partitions up to months_ahead after the current month"""
+    try:
+        async with conn.transaction():
+            await set_lock_timeout(conn)
+            return await conn.fetchval('''
+                SELECT create_invoice_partitions(
+                    date_trunc('month', CURRENT_DATE)::date,
+                    (date_trunc('month', CURRENT_DATE) + make_interval(months => $1))::date
+                )
+            ''', months_ahead)
+    except asyncpg.LockNotAvailableError:
+        # The months already made cover the time until the next run
+        logger.warning("Invoices are busy; partitions will be created on the next run")
+        return 0
+
+async def archive_partitions(conn: asyncpg.Connection, retention_months: int = INVOICE_RETENTION_MONTHS) -> List[str]:
+    """Detach months older than the retention period into the archive schema"""
+    if retention_months <= 0:
+        return []
+    cutoff = await conn.fetchval(
+        "SELECT (date_trunc('month', CURRENT_DATE) - make_interval(months => $1))::date",
+        retention_months
+    )
+    items_by_month = {row['month']: row['name'] for row in await partitions_of(conn, 'invoice_items')}
+    archived = []
+    for partition in await partitions_of(conn, 'invoices'):
+        if partition['month'] >= cutoff:
+            break
+        await conn.execute(f'CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}')
+        try:
+            await archive_partition(conn, partition['name'], items_by_month.get(partition['month']))
+        except asyncpg.LockNotAvailableError:
+            logger.warning(f"Invoices are busy; {partition['name']} will be archived on the next run")
+            break
+        logger.info(f"Archived invoices of {partition['month']:%Y-%m} to {ARCHIVE_SCHEMA}.{partition['name']}")
+        archived.append(partition['name'])
+    return archived
+
+async def archive_partition(conn: asyncpg.Connection, partition: str, items: Optional[str]):
+    """Detach one month of invoices, and its items, into the archive schema in one transaction"""
+    # Detaching locks out every reader and writer of the parent table; the
+    # lock timeout keeps a detach queued behind a long export from holding
+    # them up, and rolls the whole month back to be retried
+    async with conn.transaction():
+        await set_lock_timeout(conn)
+        if items:
+            # Items go first; their copy of the foreign key would
+            # otherwise keep the invoices partition from detaching
+            await conn.execute(f'ALTER TABLE invoice_items DETACH PARTITION "{items}"')
+            for constraint in await conn.fetch('''
+                SELECT conname FROM pg_constraint
+                WHERE conrelid = $1::regclass AND confrelid = 'invoices'::regclass
+            ''', items):
+                await conn.execute(f'ALTER TABLE "{items}" DROP CONSTRAINT "{constraint["conname"]}"')
+            await conn.execute(f'ALTER TABLE "{items}" SET SCHEMA {ARCHIVE_SCHEMA}')
+        await conn.execute(f'ALTER TABLE invoices DETACH PARTITION "{partition}"')
+        await conn.execute(f'ALTER TABLE "{partition}" SET SCHEMA {ARCHIVE_SCHEMA}')
+        await discount_archived_invoices(conn, partition)
+
+async def discount_archived_invoices(conn: asyncpg.Connection, partition: str):
+    """Take an archived partition's invoices out of the per-shop row counters and the id map"""
+    # The counters are under row-level security, so each shop's row is
+    # updated with that shop as the transaction's tenant
+    counts = await conn.fetch(
+        f'SELECT tenant_id, COUNT(*) AS archived FROM {ARCHIVE_SCHEMA}."{partition}" GROUP BY tenant_id'
+    )
+    for row in counts:
+        await conn.execute("SELECT set_config('app.tenant_id', $1, true)", str(row['tenant_id']))
+        await conn.execute('''
+            INSERT INTO table_row_counts AS t (table_name, shard, row_count)
+            VALUES ('invoices', row_count_shard(), -$1::bigint)
+            ON CONFLICT (tenant_id, table_name, shard) DO UPDATE SET row_count = t.row_count + EXCLUDED.row_count
+        ''', row['archived'])
+        await conn.execute(f'''
+            DELETE FROM invoice_keys
+            WHERE id IN (SELECT id FROM {ARCHIVE_SCHEMA}."{partition}" WHERE tenant_id = current_tenant_id())
+        ''')
+
+async def freeze_partitions(conn: asyncpg.Connection, after_months: int = INVOICE_FREEZE_AFTER_MONTHS) -> List[str]:
+    """VACUUM FREEZE closed partitions whose oldest unfrozen row has aged past vacuum_freeze_min_age"""
+    cutoff = await conn.fetchval(
+        "SELECT (date_trunc('month', CURRENT_DATE) - make_interval(months => $1))::date",
+        after_months
+    )
+    min_age = int(await conn.fetchval('SHOW vacuum_freeze_min_age'))
+    frozen = []
+    for parent in ('invoices', 'invoice_items'):
+        for partition in await partitions_of(conn, parent):
+            if partition['month'] >= cutoff:
+                break
+            # A frozen partition's age restarts near zero, so each closed
+            # month is frozen again only every min_age transactions, and
+            # then only its pages changed since are read
+            if partition['xid_age'] < min_age:
+                continue
+            await conn.execute(
+                f'VACUUM (FREEZE, ANALYZE) "{partition["name"]}"',
+                timeout=PARTITION_MAINTENANCE_TIMEOUT
+            )
+            frozen.append(partition['name'])
+    return frozen
+
+async def run_maintenance(pool: asyncpg.Pool) -> Dict[str, Any]:
+    """Create, archive and freeze partitions unless another process is already at it"""
+    async with pool.acquire() as conn:
+        if not await conn.fetchval('SELECT pg_try_advisory_lock($1)', MAINTENANCE_LOCK_KEY):
+            logger.info("Partition maintenance is running elsewhere")
+            return {}
+        try:
+            # VACUUMs are bounded by PARTITION_MAINTENANCE_TIMEOUT instead
+            await conn.execute('SET statement_timeout = 0')
+            result = {
+                "created": await ensure_partitions(conn),
+                "archived": await archive_partitions(conn),
+                "frozen": await freeze_partitions(conn)
+            }
+        finally:
+            await conn.execute('SELECT pg_advisory_unlock($1)', MAINTENANCE_LOCK_KEY)
+    logger.info(
+        f"Partition maintenance: {result['created']} months created, "
+        f"{len(result['archived'])} archived, {len(result['frozen'])} frozen"
+    )
+    return result
+
+async def run_dedicated_maintenance() -> Dict[str, Any]:
+    """Run the maintenance on a connection of its own rather than one from the request pool"""
+    pool = await database.create_pool(
+        min_size=1,
+        max_size=1,
+        init=None,
+        server_settings={**database.server_settings(), 'application_name': 'medicine-shop-maintenance'}
+    )
+    try:
+        return await run_maintenance(pool)
+    finally:
+        await pool.close()
+
+async def maintenance_loop():
+    """Run the maintenance once the database is up, then every PARTITION_MAINTENANCE_HOURS"""
+    if PARTITION_MAINTENANCE_HOURS <= 0:
+        return
+    while True:
+        if database.pool is None:
+            await asyncio.sleep(database.DB_INIT_RETRY_SECONDS)
+            continue
+        try:
+            await run_dedicated_maintenance()
+        except Exception as e:
+            logger.error(f"Partition maintenance failed: {e}")
+        await asyncio.sleep(PARTITION_MAINTENANCE_HOURS * 3600)
+
+async def main():
+    await run_dedicated_maintenance()
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
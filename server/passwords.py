@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+import bcrypt
+from fastapi import HTTPException, status
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# bcrypt releases the GIL, so a small thread pool hashes in parallel while
+# the event loop keeps serving other requests
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Hashes waiting or running before new ones are turned away with a 503;
+# the default lets a full shift log in at once on a single CPU
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', str(max(32, PASSWORD_HASH_WORKERS * 8))))
+
+# Hash time the cost factor is calibrated towards on the current CPU
+BCRYPT_TARGET_MS = float(os.getenv('BCRYPT_TARGET_MS', '250'))
+# Never go below this cost, however slow the instance
+BCRYPT_MIN_ROUNDS = int(os.getenv('BCRYPT_MIN_ROUNDS', '10'))
+BCRYPT_MAX_ROUNDS = int(os.getenv('BCRYPT_MAX_ROUNDS', '16'))
+# A fixed cost skips calibration; set it when instance sizes are mixed so
+# that logins on different hardware do not keep re-hashing the same password
+BCRYPT_ROUNDS = os.getenv('BCRYPT_ROUNDS')
+
+_executor: Optional[ThreadPoolExecutor] = None
+_pending = 0
+_rounds = int(BCRYPT_ROUNDS) if BCRYPT_ROUNDS else 12
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+    return _executor
+
+def _timed(name: str, func: Callable[..., T], submitted: float, *args) -> T:
+    started = time.perf_counter()
+    metrics.timer('password.queue_wait').observe(started - submitted)
+    try:
+        return func(*args)
+    finally:
+        metrics.timer(name).observe(time.perf_counter() - started)
+
+async def _run(name: str, func: Callable[..., T], *args) -> T:
+    """Run a bcrypt call on the hashing pool, refusing work once it is saturated"""
+    global _pending
+    if _pending >= PASSWORD_HASH_MAX_PENDING:
+        metrics.increment('password.rejected')
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again",
+            headers={"Retry-After": "1"}
+        )
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_get_executor(), _timed, name, func, time.perf_counter(), *args)
+    finally:
+        _pending -= 1
+
+def _hash(password: str) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=_rounds)).decode('utf-8')
+
+def _verify(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+async def hash_password(password: str) -> str:
+    """Hash a password with bcrypt off the event loop"""
+    return await _run('password.hash', _hash, password)
+
+async def verify_password(password: str, hashed: str) -> bool:
+    """Check a password against a bcrypt hash off the event loop"""
+    return await _run('password.verify', _verify, password, hashed)
+
+def _measure_rounds() -> int:
+    """Pick the cost whose hash time is closest to the target on this CPU"""
+    # Each extra round doubles the work, so one sample at the floor is
+    # enough to extrapolate; take the best of three to skip warm-up noise
+    samples = []
+    for _ in range(3):
+        started = time.perf_counter()
+        bcrypt.hashpw(b'calibration', bcrypt.gensalt(rounds=BCRYPT_MIN_ROUNDS))
+        samples.append((time.perf_counter() - started) * 1000)
+    extra = round(math.log2(BCRYPT_TARGET_MS / max(min(samples), 0.001)))
+    return max(BCRYPT_MIN_ROUNDS, min(BCRYPT_MAX_ROUNDS, BCRYPT_MIN_ROUNDS + extra))
+
+async def calibrate() -> int:
+    """Set the bcrypt cost used for new hashes and return it"""
+    global _rounds
+    if BCRYPT_ROUNDS:
+        _rounds = int(BCRYPT_ROUNDS)
+    else:
+        loop = asyncio.get_running_loop()
+        _rounds = await loop.run_in_executor(_get_executor(), _measure_rounds)
+    logger.info(f"bcrypt cost set to {_rounds} (target {BCRYPT_TARGET_MS:.0f} ms)")
+    return _rounds
+
+def rounds() -> int:
+    """Cost factor used for new hashes"""
+    return _rounds
+
+def needs_rehash(hashed: str) -> bool:
+    """Whether a stored hash was made with a different cost than the current one"""
+    try:
+        return int(hashed.split('$')[2]) != _rounds
+    except (IndexError, ValueError):
+        return False
+
+def pending() -> int:
+    """Hashes currently queued or running"""
+    return _pending
+
+def shutdown():
+    """Stop the hashing pool"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,541 @@
+# SQL run by the routers. Statements are constants so every request sends
+# identical text: asyncpg prepares each one on its first use on a connection
+# and reuses it from the connection's statement cache after that. List
+# statements are the base of a pagination.KeysetQuery, which appends the
+# filters and the keyset order. Exports are assembled by exports.ExportQuery
+# from the column whitelists in their routers.
+
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Tenant of the session, read by the row-level security policies
+SET_TENANT = "SELECT set_config('app.tenant_id', $1, false)"
+
+# Shops, created together with their first admin by create_shop.py
+TENANT_INSERT = 'INSERT INTO tenants (name) VALUES ($1) RETURNING id, name'
+
+# Users (not under row-level security: sign-in happens before the tenant is known)
+USER_BY_LOGIN = 'SELECT * FROM users WHERE username = $1 OR email = $1'
+USER_BY_USERNAME_OR_EMAIL = 'SELECT id FROM users WHERE username = $1 OR email = $2'
+USER_COUNT = 'SELECT COUNT(*) FROM users'
+USER_INSERT = '''
+    INSERT INTO users (username, email, password, role, tenant_id)
+    VALUES ($1, $2, $3, $4, $5)
+    RETURNING id, username, email, role, tenant_id, token_version
+'''
+USER_PROFILE = 'SELECT id, username, email, role, tenant_id, created_at FROM users WHERE id = $1'
+USER_PASSWORD = 'SELECT password FROM users WHERE id = $1'
+# Moving token_version on refuses every token issued before the change
+USER_SET_PASSWORD = '''
+    UPDATE users
+    SET password = $1, token_version = token_version + 1, updated_at = CURRENT_TIMESTAMP
+    WHERE id = $2
+    RETURNING id, username, email, role, tenant_id, token_version
+'''
+USER_TOKEN_VERSION = 'SELECT token_version FROM users WHERE id = $1'
+# Only replaces the hash it was computed from, so a concurrent change wins
+USER_REHASH_PASSWORD = 'UPDATE users SET password = $1 WHERE id = $2 AND password = $3'
+USER_LIST = 'SELECT * FROM users'
+
+# Customers
+CUSTOMER_LIST = 'SELECT * FROM customers'
+CUSTOMER_BY_ID = 'SELECT * FROM customers WHERE id = $1'
+CUSTOMER_ID_BY_PHONE = 'SELECT id FROM customers WHERE phone = $1'
+CUSTOMER_INSERT = '''
+    INSERT INTO customers (name, email, phone, address)
+    VALUES ($1, $2, $3, $4)
+    RETURNING *
+'''
+CUSTOMER_DELETE = 'DELETE FROM customers WHERE id = $1'
+CUSTOMER_UPDATE_COLUMNS = ('name', 'email', 'phone', 'address')
+
+# Inventory
+INVENTORY_LIST = 'SELECT * FROM inventory'
+INVENTORY_BY_ID = 'SELECT * FROM inventory WHERE id = $1'
+INVENTORY_INSERT = '''
+    INSERT INTO inventory (name, description, quantity, unit_price, cost_price, category_id, expiry_date, reorder_level, manufacturer, batch_number)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+    RETURNING *
+'''
+INVENTORY_DELETE = 'DELETE FROM inventory WHERE id = $1'
+INVENTORY_SET_STOCK = '''
+    UPDATE inventory
+    SET quantity = $1, updated_at = CURRENT_TIMESTAMP
+    WHERE id = $2
+    RETURNING *
+'''
+INVENTORY_UPDATE_COLUMNS = (
+    'name', 'description', 'quantity', 'unit_price', 'cost_price', 'category_id',
+    'expiry_date', 'reorder_level', 'manufacturer', 'batch_number'
+)
+# Both low-stock variants are answered from the partial low-stock indexes
+INVENTORY_LOW_STOCK = '''
+    SELECT * FROM inventory
+    WHERE quantity <= reorder_level
+    ORDER BY stock_ratio, id
+    LIMIT $1
+'''
+INVENTORY_LOW_STOCK_BY_CATEGORY = '''
+    SELECT * FROM inventory
+    WHERE quantity <= reorder_level AND category_id = $1
+    ORDER BY stock_ratio, id
+    LIMIT $2
+'''
+INVENTORY_EXPIRING = '''
+    SELECT * FROM inventory
+    WHERE expiry_date IS NOT NULL
+    AND expiry_date <= CURRENT_DATE + $1::integer
+    AND expiry_date >= CURRENT_DATE
+    ORDER BY expiry_date ASC
+'''
+# Inventory search: items whose name starts with the search text come
+# first, read in name order from the shop's lowercased names; word prefix
+# matches anywhere in name, manufacturer or batch number fill the rest. Both
+# are kept in tables keyed by shop (see
+# migrations/008_inventory_search.sql), since under row-level security
+# only plain comparisons with their key columns can bound an index scan. The
+# prefix is a range rather than LIKE so that generic plans can use the index
+# too
+INVENTORY_SEARCH_BY_NAME_PREFIX = '''
+    SELECT i.id, i.name, i.manufacturer, i.batch_number, i.quantity, i.unit_price, i.expiry_date, i.category_id
+    FROM inventory_search_names n
+    JOIN inventory i ON i.id = n.inventory_id
+    WHERE n.name_key >= $1 AND n.name_key < $1 || chr(1114111)
+    ORDER BY n.name_key, n.inventory_id
+    LIMIT $2
+'''
+# Items having a word that starts with each searched word. The range ends are
+# computed apart so that the comparisons with the term column stay plain
+INVENTORY_SEARCH_BY_WORDS = '''
+    WITH words AS MATERIALIZED (
+        SELECT n, word COLLATE "C" AS word_start, (word || chr(1114111)) COLLATE "C" AS word_end
+        FROM unnest($1::text[]) WITH ORDINALITY AS w(word, n)
+    ),
+    matches AS MATERIALIZED (
+        SELECT t.inventory_id
+        FROM words w
+        JOIN inventory_search_terms t ON t.term >= w.word_start AND t.term < w.word_end
+        GROUP BY t.inventory_id
+        HAVING count(DISTINCT w.n) = cardinality($1::text[])
+    )
+    SELECT i.id, i.name, i.manufacturer, i.batch_number, i.quantity, i.unit_price, i.expiry_date, i.category_id
+    FROM matches
+    JOIN inventory i ON i.id = matches.inventory_id
+    WHERE NOT starts_with(lower(i.name), $2)
+    ORDER BY lower(i.name) COLLATE "C", i.id
+    LIMIT $3
+'''
+# Quantities are summed per item first since UPDATE ... FROM applies only
+# one source row to each target row
+INVENTORY_DECREMENT_STOCK = '''
+    UPDATE inventory inv
+    SET quantity = inv.quantity - sold.quantity
+    FROM (
+        SELECT inventory_id, SUM(quantity) AS quantity
+        FROM unnest($1::integer[], $2::integer[]) AS s(inventory_id, quantity)
+        GROUP BY inventory_id
+    ) sold
+    WHERE inv.id = sold.inventory_id
+'''
+
+# Inventory CSV import: the file is copied into inventory_import, checked,
+# cut down to one row per item and merged in one statement
+INVENTORY_IMPORT_STAGE = '''
+    CREATE TEMP TABLE inventory_import (
+        line_no INTEGER,
+        name VARCHAR(255),
+        description TEXT,
+        quantity INTEGER,
+        unit_price DOUBLE PRECISION,
+        cost_price DOUBLE PRECISION,
+        category_id INTEGER,
+        expiry_date DATE,
+        reorder_level INTEGER,
+        manufacturer VARCHAR(255),
+        batch_number VARCHAR(100)
+    ) ON COMMIT DROP
+'''
+# Rows pointing at unknown categories would fail the whole merge
+INVENTORY_IMPORT_REJECT_UNKNOWN_CATEGORIES = '''
+    DELETE FROM inventory_import s
+    WHERE s.category_id IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM categories c WHERE c.id = s.category_id)
+    RETURNING line_no, category_id
+'''
+# The last occurrence of a (name, batch_number) pair in the file wins; an
+# upsert may touch each item only once
+INVENTORY_IMPORT_LATEST = '''
+    CREATE TEMP TABLE inventory_import_latest ON COMMIT DROP AS
+    SELECT DISTINCT ON (name, COALESCE(batch_number, '')) *
+    FROM inventory_import
+    ORDER BY name, COALESCE(batch_number, ''), line_no DESC
+'''
+# The unique (tenant_id, name, batch) index arbitrates between concurrent
+# imports and creates: a row inserted meanwhile by another transaction is
+# updated instead of added twice
+INVENTORY_IMPORT_MERGE = '''
+    WITH merged AS (
+        INSERT INTO inventory (
+            name, description, quantity, unit_price, cost_price, category_id,
+            expiry_date, reorder_level, manufacturer, batch_number
+        )
+        SELECT
+            s.name, s.description, s.quantity, s.unit_price, s.cost_price, s.category_id,
+            s.expiry_date, s.reorder_level, s.manufacturer, s.batch_number
+        FROM inventory_import_latest s
+        ORDER BY s.line_no
+        ON CONFLICT (tenant_id, name, (COALESCE(batch_number, ''))) DO UPDATE
+        SET description = EXCLUDED.description,
+            quantity = EXCLUDED.quantity,
+            unit_price = EXCLUDED.unit_price,
+            cost_price = EXCLUDED.cost_price,
+            category_id = EXCLUDED.category_id,
+            expiry_date = EXCLUDED.expiry_date,
+            reorder_level = EXCLUDED.reorder_level,
+            manufacturer = EXCLUDED.manufacturer,
+            updated_at = CURRENT_TIMESTAMP
+        -- xmax is only set on rows the statement updated
+        RETURNING xmax = 0 AS inserted
+    )
+    SELECT
+        COUNT(*) FILTER (WHERE inserted) AS inserted,
+        COUNT(*) FILTER (WHERE NOT inserted) AS updated
+    FROM merged
+'''
+
+# Invoices
+INVOICE_LIST = '''
+    SELECT
+        i.*,
+        c.name as customer_name,
+        c.email as customer_email,
+        c.phone as customer_phone,
+        c.address as customer_address
+    FROM invoices i
+    LEFT JOIN customers c ON i.customer_id = c.id
+'''
+INVOICE_INSERT = '''
+    INSERT INTO invoices (
+        customer_id, customer_name, customer_phone, customer_address,
+        invoice_date, total_amount, status, payment_method, notes,
+        due_date
+    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
+    RETURNING id, created_at
+'''
+# Items are partitioned by their invoice's created_at, passed as $2
+INVOICE_ITEMS_INSERT = '''
+    INSERT INTO invoice_items (
+        invoice_id, invoice_created_at, inventory_id, item_text,
+        quantity, unit_price,
+        discount_percentage, discount_amount,
+        gst_percentage, gst_amount
+    )
+    SELECT $1, $2, * FROM unnest(
+        $3::integer[], $4::text[],
+        $5::integer[], $6::numeric[],
+        $7::numeric[], $8::numeric[],
+        $9::numeric[], $10::numeric[]
+    )
+'''
+# Invoices are keyed by (id, created_at); created_at comes from the
+# invoice_keys map so that only the invoice's own partition is visited
+INVOICE_BY_ID = '''
+    SELECT
+        i.*,
+        c.name as customer_name,
+        c.email as customer_email,
+        c.phone as customer_phone,
+        c.address as customer_address
+    FROM invoices i
+    LEFT JOIN customers c ON i.customer_id = c.id
+    WHERE i.id = $1
+      AND i.created_at = (SELECT created_at FROM invoice_keys WHERE id = $1)
+'''
+INVOICE_ITEMS_FOR_INVOICES = '''
+    SELECT
+        ii.*,
+        inv.name as inventory_name,
+        inv.description as inventory_description
+    FROM invoice_items ii
+    LEFT JOIN inventory inv ON ii.inventory_id = inv.id
+    WHERE ii.invoice_id = ANY($1::integer[])
+      AND ii.invoice_created_at BETWEEN $2 AND $3
+    ORDER BY ii.invoice_id, ii.id
+'''
+
+# Invoice batch: the records are copied into invoice_batch and
+# invoice_item_batch, then merged with a fixed number of statements. Amounts
+# are staged as floats, matching the request models, and become NUMERIC when
+# merged
+INVOICE_BATCH_STAGE = '''
+    CREATE TEMP TABLE invoice_batch (
+        rec_no INTEGER PRIMARY KEY,
+        customer_id INTEGER,
+        customer_name TEXT,
+        customer_phone TEXT,
+        customer_address TEXT,
+        customer_email TEXT,
+        invoice_date TIMESTAMP,
+        due_date DATE,
+        total_amount DOUBLE PRECISION,
+        payment_method TEXT,
+        notes TEXT,
+        invoice_id INTEGER
+    ) ON COMMIT DROP;
+    CREATE TEMP TABLE invoice_item_batch (
+        rec_no INTEGER,
+        line_no INTEGER,
+        inventory_id INTEGER,
+        item_text TEXT,
+        quantity INTEGER,
+        unit_price DOUBLE PRECISION,
+        discount_percentage DOUBLE PRECISION,
+        discount_amount DOUBLE PRECISION,
+        gst_percentage DOUBLE PRECISION,
+        gst_amount DOUBLE PRECISION
+    ) ON COMMIT DROP;
+'''
+# Records that reference missing customers or inventory, one reason each
+INVOICE_BATCH_MISSING_REFERENCES = '''
+    SELECT DISTINCT ON (rec_no) rec_no, reason FROM (
+        SELECT b.rec_no, 'Customer ' || b.customer_id || ' not found' AS reason
+        FROM invoice_batch b
+        WHERE b.customer_id IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM customers c WHERE c.id = b.customer_id)
+        UNION ALL
+        SELECT i.rec_no, 'Inventory item ' || i.inventory_id || ' not found'
+        FROM invoice_item_batch i
+        WHERE i.inventory_id IS NOT NULL
+          AND NOT EXISTS (SELECT 1 FROM inventory inv WHERE inv.id = i.inventory_id)
+    ) problems
+    ORDER BY rec_no
+'''
+INVOICE_BATCH_DISCARD = 'DELETE FROM invoice_batch WHERE rec_no = ANY($1::integer[])'
+INVOICE_ITEM_BATCH_DISCARD = 'DELETE FROM invoice_item_batch WHERE rec_no = ANY($1::integer[])'
+# Named customers are resolved by phone, then the ones still missing are
+# created. Records sharing a phone number share one new customer
+INVOICE_BATCH_RESOLVE_CUSTOMERS = '''
+    UPDATE invoice_batch b
+    SET customer_id = c.id
+    FROM (
+        SELECT DISTINCT ON (phone) id, phone
+        FROM customers
+        WHERE phone IN (SELECT customer_phone FROM invoice_batch)
+        ORDER BY phone, id
+    ) c
+    WHERE b.customer_id IS NULL
+      AND b.customer_name IS NOT NULL
+      AND b.customer_phone = c.phone;
+
+    CREATE TEMP TABLE customer_batch ON COMMIT DROP AS
+    SELECT DISTINCT ON (customer_key)
+        customer_key, customer_name, customer_email, customer_phone, customer_address,
+        rec_no AS first_rec_no, NULL::integer AS id
+    FROM (
+        SELECT *, COALESCE(customer_phone, 'record:' || rec_no) AS customer_key
+        FROM invoice_batch
+        WHERE customer_id IS NULL AND customer_name IS NOT NULL
+    ) pending
+    ORDER BY customer_key, rec_no;
+
+    UPDATE customer_batch c
+    SET id = allocated.id
+    FROM (
+        SELECT customer_key, nextval(pg_get_serial_sequence('customers', 'id')) AS id
+        FROM (SELECT customer_key FROM customer_batch ORDER BY first_rec_no) ordered
+    ) allocated
+    WHERE c.customer_key = allocated.customer_key;
+
+    INSERT INTO customers (id, name, email, phone, address)
+    SELECT id, customer_name, customer_email, customer_phone, customer_address
+    FROM customer_batch;
+
+    UPDATE invoice_batch b
+    SET customer_id = n.id
+    FROM customer_batch n
+    WHERE b.customer_id IS NULL
+      AND b.customer_name IS NOT NULL
+      AND COALESCE(b.customer_phone, 'record:' || b.rec_no) = n.customer_key;
+'''
+# Invoice ids are allocated up front so items can be joined to their invoice
+INVOICE_BATCH_MERGE = '''
+    UPDATE invoice_batch b
+    SET invoice_id = allocated.invoice_id
+    FROM (
+        SELECT rec_no, nextval(pg_get_serial_sequence('invoices', 'id')) AS invoice_id
+        FROM (SELECT rec_no FROM invoice_batch ORDER BY rec_no) ordered
+    ) allocated
+    WHERE b.rec_no = allocated.rec_no;
+
+    INSERT INTO invoices (
+        id, customer_id, customer_name, customer_phone, customer_address,
+        invoice_date, total_amount, status, payment_method, notes,
+        due_date
+    )
+    SELECT
+        invoice_id, customer_id, customer_name, customer_phone, customer_address,
+        invoice_date, total_amount, 'pending', payment_method, notes,
+        due_date
+    FROM invoice_batch
+    ORDER BY rec_no;
+
+    -- The invoices above took CURRENT_TIMESTAMP, the transaction start
+    INSERT INTO invoice_items (
+        invoice_id, invoice_created_at, inventory_id, item_text,
+        quantity, unit_price,
+        discount_percentage, discount_amount,
+        gst_percentage, gst_amount
+    )
+    SELECT
+        b.invoice_id, CURRENT_TIMESTAMP, i.inventory_id, i.item_text,
+        i.quantity, i.unit_price,
+        i.discount_percentage, i.discount_amount,
+        i.gst_percentage, i.gst_amount
+    FROM invoice_item_batch i
+    JOIN invoice_batch b ON b.rec_no = i.rec_no
+    ORDER BY i.rec_no, i.line_no;
+
+    UPDATE inventory inv
+    SET quantity = inv.quantity - sold.quantity
+    FROM (
+        SELECT i.inventory_id, SUM(i.quantity) AS quantity
+        FROM invoice_item_batch i
+        JOIN invoice_batch b ON b.rec_no = i.rec_no
+        WHERE i.inventory_id IS NOT NULL
+        GROUP BY i.inventory_id
+    ) sold
+    WHERE inv.id = sold.inventory_id;
+'''
+INVOICE_BATCH_CREATED = 'SELECT rec_no, invoice_id, customer_id FROM invoice_batch ORDER BY rec_no'
+
+# Categories, bills and purchase orders
+CATEGORY_LIST = 'SELECT * FROM categories'
+BILL_LIST = 'SELECT * FROM bills'
+PURCHASE_ORDER_LIST = 'SELECT * FROM purchase_orders'
+
+# Dashboard. Table totals are sums of trigger-maintained counter shards;
+# everything is read in a single round trip
+DASHBOARD_STATS = '''
+    SELECT
+        COALESCE(SUM(row_count) FILTER (WHERE table_name = 'inventory'), 0)::bigint AS total_inventory,
+        COALESCE(SUM(row_count) FILTER (WHERE table_name = 'customers'), 0)::bigint AS total_customers,
+        COALESCE(SUM(row_count) FILTER (WHERE table_name = 'invoices'), 0)::bigint AS total_invoices,
+        COALESCE(SUM(row_count) FILTER (WHERE table_name = 'bills'), 0)::bigint AS total_bills,
+        (
+            SELECT COALESCE(SUM(sales_amount), 0)
+            FROM daily_sales_rollup
+            WHERE day = CURRENT_DATE
+        ) AS today_sales,
+        (
+            -- Matches the predicate of the partial low-stock index
+            SELECT COUNT(*)
+            FROM inventory
+            WHERE quantity <= reorder_level
+        ) AS low_stock_count,
+        (
+            SELECT COUNT(*)
+            FROM inventory
+            WHERE expiry_date >= CURRENT_DATE AND expiry_date <= CURRENT_DATE + $1::integer
+        ) AS expiring_count
+    FROM table_row_counts
+'''
+# One point per day from $1 through $2, empty days included
+DASHBOARD_SALES_BY_DAY = '''
+    SELECT
+        d.day::date AS day,
+        COALESCE(SUM(r.sales_amount), 0) AS sales,
+        COALESCE(SUM(r.quantity), 0) AS quantity,
+        COALESCE(SUM(r.line_count), 0) AS line_count
+    FROM generate_series($1::date, $2::date, interval '1 day') AS d(day)
+    LEFT JOIN daily_sales_rollup r
+        ON r.day = d.day::date
+        AND ($3::integer IS NULL OR r.category_id = $3::integer)
+    GROUP BY d.day
+    ORDER BY d.day
+'''
+DASHBOARD_SALES_BY_CATEGORY = '''
+    SELECT
+        r.category_id,
+        COALESCE(c.name, 'Uncategorised') AS category_name,
+        SUM(r.sales_amount) AS sales,
+        SUM(r.quantity) AS quantity
+    FROM daily_sales_rollup r
+    LEFT JOIN categories c ON c.id = r.category_id
+    WHERE r.day BETWEEN $1 AND $2
+    GROUP BY r.category_id, c.name
+    ORDER BY sales DESC
+'''
+# Stock is aggregated over the catalogue; sales come from the rollup
+DASHBOARD_INVENTORY_BY_CATEGORY = '''
+    WITH stock AS (
+        SELECT
+            COALESCE(category_id, 0) AS category_id,
+            COUNT(*) AS item_count,
+            SUM(quantity) AS quantity,
+            SUM(quantity * unit_price) AS stock_value
+        FROM inventory
+        GROUP BY 1
+    ),
+    sales AS (
+        SELECT category_id, SUM(quantity) AS sold_quantity, SUM(sales_amount) AS sales
+        FROM daily_sales_rollup
+        WHERE day > CURRENT_DATE - $1::integer
+        GROUP BY category_id
+    )
+    SELECT
+        COALESCE(s.category_id, x.category_id) AS category_id,
+        COALESCE(c.name, 'Uncategorised') AS category_name,
+        COALESCE(s.item_count, 0) AS item_count,
+        COALESCE(s.quantity, 0) AS quantity,
+        COALESCE(s.stock_value, 0) AS stock_value,
+        COALESCE(x.sold_quantity, 0) AS sold_quantity,
+        COALESCE(x.sales, 0) AS sales
+    FROM stock s
+    FULL JOIN sales x ON x.category_id = s.category_id
+    LEFT JOIN categories c ON c.id = COALESCE(s.category_id, x.category_id)
+    ORDER BY stock_value DESC
+'''
+DASHBOARD_RECENT_ACTIVITY = '''
+    SELECT * FROM (
+        (
+            SELECT 'invoice' AS type, id, total_amount AS amount, status,
+                   customer_name AS description, created_at
+            FROM invoices
+            ORDER BY created_at DESC, id DESC
+            LIMIT $1
+        )
+        UNION ALL
+        (
+            SELECT 'bill' AS type, id, amount, status,
+                   NULL AS description, created_at
+            FROM bills
+            ORDER BY created_at DESC, id DESC
+            LIMIT $1
+        )
+    ) recent
+    ORDER BY created_at DESC
+    LIMIT $1
+'''
+
+@lru_cache(maxsize=256)
+def update_statement(table: str, columns: Tuple[str, ...]) -> str:
+    """Canonical UPDATE ... RETURNING * for one set of changed columns"""
+    assignments = ', '.join(f"{column} = ${index}" for index, column in enumerate(columns, 1))
+    return (
+        f"UPDATE {table} SET {assignments}, updated_at = CURRENT_TIMESTAMP "
+        f"WHERE id = ${len(columns) + 1} RETURNING *"
+    )
+
+def build_update(
+    table: str,
+    columns: Sequence[str],
+    values: Dict[str, Any],
+    row_id: int
+) -> Optional[Tuple[str, List[Any]]]:
+    """Statement and arguments updating the supplied (non-None) columns, or None if there are none"""
+    # Columns are always taken in declaration order, so the same field set
+    # yields the same SQL text whatever order the request listed them in
+    changed = tuple(column for column in columns if values.get(column) is not None)
+    if not changed:
+        return None
+    return update_statement(table, changed), [values[column] for column in changed] + [row_id]
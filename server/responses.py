@@ -0,0 +1,29 @@
+from decimal import Decimal
+from typing import Any
+
+import asyncpg
+import orjson
+from fastapi.responses import JSONResponse
+
+def _default(value: Any):
+    """Encode the types orjson does not handle natively"""
+    if isinstance(value, asyncpg.Record):
+        return dict(value)
+    if isinstance(value, Decimal):
+        # NUMERIC columns can hold NaN and infinity, which have no integral
+        # exponent; as floats orjson writes them as null
+        if not value.is_finite():
+            return float(value)
+        # Same as FastAPI's encoder: whole numbers stay integers
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by orjson, encoding Records, Decimal and dates directly"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+def json_response(content: Any, status_code: int = 200) -> FastJSONResponse:
+    """Return content as-is to skip FastAPI's jsonable_encoder walk; rows may be Records"""
+    return FastJSONResponse(content, status_code=status_code)
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends
+
+import database
+import metrics
+import passwords
+from routers.auth import require_admin
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.get("/metrics")
+async def get_metrics():
+    """Get in-process latency timers and counters"""
+    data = metrics.snapshot()
+    data["password_hashing"] = {
+        "workers": passwords.PASSWORD_HASH_WORKERS,
+        "max_pending": passwords.PASSWORD_HASH_MAX_PENDING,
+        "pending": passwords.pending(),
+        "bcrypt_rounds": passwords.rounds()
+    }
+    return {
+        "success": True,
+        "data": data
+    }
+
+@router.get("/pool")
+async def get_pool_stats():
+    """Get database pool occupancy, acquire wait and connection churn"""
+    return {
+        "success": True,
+        "data": database.pool_stats()
+    }
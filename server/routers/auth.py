@@ -1,15 +1,17 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
-import bcrypt
-import jwt
 import os
 import logging
 from typing import Optional
 from datetime import datetime, timedelta
 import asyncpg
 
-from database import get_db
+import database
+from database import DEFAULT_TENANT_ID, get_db
+import queries
+from passwords import hash_password, verify_password, needs_rehash
+from token_cache import token_cache
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +32,6 @@ class UserRegister(BaseModel):
     username: str
     email: str
     password: str
-    role: str = "staff"
 
 class UserSetup(BaseModel):
     username: str
@@ -54,8 +55,21 @@ class LoginResponse(BaseModel):
     token: str
     user: dict
 
+def token_claims(user) -> dict:
+    """Claims identifying a user row in the tokens issued to it"""
+    return {
+        "id": user['id'],
+        "username": user['username'],
+        "email": user['email'],
+        "role": user['role'],
+        "tenant_id": user['tenant_id'],
+        "token_version": user['token_version']
+    }
+
 def create_jwt_token(data: dict) -> str:
     """Create JWT token"""
+    import jwt  # deferred: not needed to serve liveness checks during cold start
+    
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(hours=JWT_EXPIRATION_HOURS)
     to_encode.update({"exp": expire})
@@ -64,29 +78,67 @@ def create_jwt_token(data: dict) -> str:
 
 async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """Verify JWT token and return user data"""
+    import jwt
+    
+    # Tokens already verified by this process skip the signature check
+    # until they expire
+    payload = token_cache.get_claims(credentials.credentials)
+    if payload is not None:
+        return payload
     try:
         payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token has expired"
         )
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token"
         )
+    await check_token_version(payload)
+    token_cache.put_claims(credentials.credentials, payload)
+    return payload
+
+async def check_token_version(payload: dict):
+    """Refuse a token issued before its user's last password change"""
+    # Users are not under row-level security, so no tenant is needed
+    async with database.checkout(database.pool) as conn:
+        version = await conn.fetchval(queries.USER_TOKEN_VERSION, payload.get('id'))
+    # Tokens issued before the claim existed count as version 0
+    if version is None or version != payload.get('token_version', 0):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked, please sign in again"
+        )
+
+async def get_tenant_id(token_data: dict = Depends(verify_token)) -> int:
+    """Tenant (shop) the caller belongs to, from the tenant_id claim"""
+    tenant_id = token_data.get('tenant_id')
+    if tenant_id is None:
+        # Issued before shops were separated
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has no tenant, please sign in again"
+        )
+    return tenant_id
+
+async def require_admin(token_data: dict = Depends(verify_token)) -> dict:
+    """Verify JWT token and require the admin role"""
+    if token_data.get('role') != 'admin':
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return token_data
 
 @router.post("/login", response_model=LoginResponse)
 async def login(user_data: UserLogin, conn: asyncpg.Connection = Depends(get_db)):
     """User login endpoint"""
     try:
         # Find user by username or email
-        user = await conn.fetchrow(
-            'SELECT * FROM users WHERE username = $1 OR email = $1',
-            user_data.username
-        )
+        user = await conn.fetchrow(queries.USER_BY_LOGIN, user_data.username)
         
         if not user:
             raise HTTPException(
@@ -95,20 +147,24 @@ async def login(user_data: UserLogin, conn: asyncpg.Connection = Depends(get_db)
             )
         
         # Verify password
-        if not bcrypt.checkpw(user_data.password.encode('utf-8'), user['password'].encode('utf-8')):
+        if not await verify_password(user_data.password, user['password']):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid credentials"
             )
+
+        # Bring the stored hash to the current cost while the plain password is at hand
+        if needs_rehash(user['password']):
+            try:
+                await conn.execute(
+                    queries.USER_REHASH_PASSWORD,
+                    await hash_password(user_data.password), user['id'], user['password']
+                )
+            except Exception as e:
+                logger.warning(f"Password rehash skipped for user {user['id']}: {e}")
         
         # Create JWT token
-        token_data = {
-            "id": user['id'],
-            "username": user['username'],
-            "email": user['email'],
-            "role": user['role']
-        }
-        token = create_jwt_token(token_data)
+        token = create_jwt_token(token_claims(user))
         
         return LoginResponse(
             success=True,
@@ -118,7 +174,8 @@ async def login(user_data: UserLogin, conn: asyncpg.Connection = Depends(get_db)
                 "id": user['id'],
                 "username": user['username'],
                 "email": user['email'],
-                "role": user['role']
+                "role": user['role'],
+                "tenant_id": user['tenant_id']
             }
         )
         
@@ -136,7 +193,7 @@ async def setup_admin(user_data: UserSetup, conn: asyncpg.Connection = Depends(g
     """Setup first admin user"""
     try:
         # Check if any users exist
-        user_count = await conn.fetchval('SELECT COUNT(*) FROM users')
+        user_count = await conn.fetchval(queries.USER_COUNT)
         
         if user_count > 0:
             raise HTTPException(
@@ -145,23 +202,16 @@ async def setup_admin(user_data: UserSetup, conn: asyncpg.Connection = Depends(g
             )
         
         # Hash password
-        hashed_password = bcrypt.hashpw(user_data.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        hashed_password = await hash_password(user_data.password)
         
         # Insert admin user
-        user = await conn.fetchrow('''
-            INSERT INTO users (username, email, password, role)
-            VALUES ($1, $2, $3, $4)
-            RETURNING id, username, email, role
-        ''', user_data.username, user_data.email, hashed_password, 'admin')
+        user = await conn.fetchrow(
+            queries.USER_INSERT,
+            user_data.username, user_data.email, hashed_password, 'admin', DEFAULT_TENANT_ID
+        )
         
         # Create JWT token
-        token_data = {
-            "id": user['id'],
-            "username": user['username'],
-            "email": user['email'],
-            "role": user['role']
-        }
-        token = create_jwt_token(token_data)
+        token = create_jwt_token(token_claims(user))
         
         return LoginResponse(
             success=True,
@@ -171,7 +221,8 @@ async def setup_admin(user_data: UserSetup, conn: asyncpg.Connection = Depends(g
                 "id": user['id'],
                 "username": user['username'],
                 "email": user['email'],
-                "role": user['role']
+                "role": user['role'],
+                "tenant_id": user['tenant_id']
             }
         )
         
@@ -185,12 +236,20 @@ async def setup_admin(user_data: UserSetup, conn: asyncpg.Connection = Depends(g
         )
 
 @router.post("/register", response_model=LoginResponse)
-async def register(user_data: UserRegister, conn: asyncpg.Connection = Depends(get_db)):
-    """Register new user"""
+async def register(
+    user_data: UserRegister,
+    token_data: dict = Depends(require_admin),
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """Register a staff member into the signed-in admin's shop"""
     try:
+        # Shops share one database, so a new user only ever joins the shop
+        # of the admin who adds them, and never as another admin
+        tenant_id = await get_tenant_id(token_data)
+        
         # Check if user already exists
         existing_user = await conn.fetchrow(
-            'SELECT id FROM users WHERE username = $1 OR email = $2',
+            queries.USER_BY_USERNAME_OR_EMAIL,
             user_data.username, user_data.email
         )
         
@@ -201,23 +260,16 @@ async def register(user_data: UserRegister, conn: asyncpg.Connection = Depends(g
             )
         
         # Hash password
-        hashed_password = bcrypt.hashpw(user_data.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        hashed_password = await hash_password(user_data.password)
         
         # Insert new user
-        user = await conn.fetchrow('''
-            INSERT INTO users (username, email, password, role)
-            VALUES ($1, $2, $3, $4)
-            RETURNING id, username, email, role
-        ''', user_data.username, user_data.email, hashed_password, user_data.role)
+        user = await conn.fetchrow(
+            queries.USER_INSERT,
+            user_data.username, user_data.email, hashed_password, 'staff', tenant_id
+        )
         
         # Create JWT token
-        token_data = {
-            "id": user['id'],
-            "username": user['username'],
-            "email": user['email'],
-            "role": user['role']
-        }
-        token = create_jwt_token(token_data)
+        token = create_jwt_token(token_claims(user))
         
         return LoginResponse(
             success=True,
@@ -227,7 +279,8 @@ async def register(user_data: UserRegister, conn: asyncpg.Connection = Depends(g
                 "id": user['id'],
                 "username": user['username'],
                 "email": user['email'],
-                "role": user['role']
+                "role": user['role'],
+                "tenant_id": user['tenant_id']
             }
         )
         
@@ -243,20 +296,22 @@ async def register(user_data: UserRegister, conn: asyncpg.Connection = Depends(g
 @router.get("/me", response_model=dict)
 async def get_current_user(
     token_data: dict = Depends(verify_token),
+    credentials: HTTPAuthorizationCredentials = Depends(security),
     conn: asyncpg.Connection = Depends(get_db)
 ):
     """Get current user information"""
     try:
-        user = await conn.fetchrow(
-            'SELECT id, username, email, role, created_at FROM users WHERE id = $1',
-            token_data['id']
-        )
-        
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
+        user = token_cache.get_user(credentials.credentials)
+        if user is None:
+            user = await conn.fetchrow(queries.USER_PROFILE, token_data['id'])
+            
+            if not user:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="User not found"
+                )
+            user = dict(user)
+            token_cache.put_user(credentials.credentials, user)
         
         return {
             "success": True,
@@ -265,6 +320,7 @@ async def get_current_user(
                 "username": user['username'],
                 "email": user['email'],
                 "role": user['role'],
+                "tenant_id": user['tenant_id'],
                 "created_at": user['created_at']
             }
         }
@@ -287,10 +343,7 @@ async def change_password(
     """Change user password"""
     try:
         # Get current user password
-        user = await conn.fetchrow(
-            'SELECT password FROM users WHERE id = $1',
-            token_data['id']
-        )
+        user = await conn.fetchrow(queries.USER_PASSWORD, token_data['id'])
         
         if not user:
             raise HTTPException(
@@ -299,24 +352,24 @@ async def change_password(
             )
         
         # Verify current password
-        if not bcrypt.checkpw(password_data.current_password.encode('utf-8'), user['password'].encode('utf-8')):
+        if not await verify_password(password_data.current_password, user['password']):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Current password is incorrect"
             )
         
         # Hash new password
-        new_hashed_password = bcrypt.hashpw(password_data.new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        new_hashed_password = await hash_password(password_data.new_password)
         
-        # Update password
-        await conn.execute(
-            'UPDATE users SET password = $1, updated_at = CURRENT_TIMESTAMP WHERE id = $2',
-            new_hashed_password, token_data['id']
-        )
+        # Update password; every token issued before now stops working, so
+        # the caller gets a new one to stay signed in
+        user = await conn.fetchrow(queries.USER_SET_PASSWORD, new_hashed_password, token_data['id'])
+        token_cache.invalidate_user(token_data['id'])
         
         return {
             "success": True,
-            "message": "Password updated successfully"
+            "message": "Password updated successfully",
+            "token": create_jwt_token(token_claims(user))
         }
         
     except HTTPException:
@@ -1,19 +1,25 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, status
 import asyncpg
-from database import get_db
+from tenancy import get_tenant_db
+import queries
+from pagination import PageParams, KeysetQuery, fetch_page, page_response
+from typing import Optional
 
 router = APIRouter()
 
 @router.get("/")
 @router.get("")
-async def get_bills(conn: asyncpg.Connection = Depends(get_db)):
-    """Get all bills"""
+async def get_bills(
+    status_filter: Optional[str] = Query(None, alias="status"),
+    page: PageParams = Depends(),
+    conn: asyncpg.Connection = Depends(get_tenant_db)
+):
+    """Get a page of bills"""
     try:
-        bills = await conn.fetch('SELECT * FROM bills ORDER BY created_at DESC')
-        return {
-            "success": True,
-            "data": [dict(bill) for bill in bills]
-        }
+        query = KeysetQuery(queries.BILL_LIST)
+        query.where_equal('status', status_filter)
+        bills, next_cursor = await fetch_page(conn, query, page)
+        return page_response(bills, next_cursor)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
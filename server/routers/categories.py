@@ -1,19 +1,22 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 import asyncpg
-from database import get_db
+from tenancy import get_tenant_db
+import queries
+from pagination import PageParams, KeysetQuery, fetch_page, page_response
 
 router = APIRouter()
 
 @router.get("/")
 @router.get("")
-async def get_categories(conn: asyncpg.Connection = Depends(get_db)):
-    """Get all categories"""
+async def get_categories(
+    page: PageParams = Depends(),
+    conn: asyncpg.Connection = Depends(get_tenant_db)
+):
+    """Get a page of categories"""
     try:
-        categories = await conn.fetch('SELECT * FROM categories ORDER BY created_at DESC')
-        return {
-            "success": True,
-            "data": [dict(category) for category in categories]
-        }
+        query = KeysetQuery(queries.CATEGORY_LIST)
+        categories, next_cursor = await fetch_page(conn, query, page)
+        return page_response(categories, next_cursor)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,7 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 from pydantic import BaseModel
 import asyncpg
-from database import get_db
+from tenancy import get_read_db, get_write_db
+import queries
+from pagination import PageParams, KeysetQuery, fetch_page, page_response
 from typing import Optional
 
 router = APIRouter()
@@ -21,14 +23,17 @@ class CustomerUpdate(BaseModel):
 
 @router.get("/")
 @router.get("")
-async def get_customers(conn: asyncpg.Connection = Depends(get_db)):
-    """Get all customers"""
+async def get_customers(
+    phone: Optional[str] = None,
+    page: PageParams = Depends(),
+    conn: asyncpg.Connection = Depends(get_read_db)
+):
+    """Get a page of customers"""
     try:
-        customers = await conn.fetch('SELECT * FROM customers ORDER BY created_at DESC')
-        return {
-            "success": True,
-            "data": [dict(customer) for customer in customers]
-        }
+        query = KeysetQuery(queries.CUSTOMER_LIST)
+        query.where_equal('phone', phone)
+        customers, next_cursor = await fetch_page(conn, query, page)
+        return page_response(customers, next_cursor)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -37,14 +42,13 @@ async def get_customers(conn: asyncpg.Connection = Depends(get_db)):
 
 @router.post("/")
 @router.post("")
-async def create_customer(customer: Customer, conn: asyncpg.Connection = Depends(get_db)):
+async def create_customer(customer: Customer, conn: asyncpg.Connection = Depends(get_write_db)):
     """Create new customer"""
     try:
-        result = await conn.fetchrow('''
-            INSERT INTO customers (name, email, phone, address)
-            VALUES ($1, $2, $3, $4)
-            RETURNING *
-        ''', customer.name, customer.email, customer.phone, customer.address)
+        result = await conn.fetchrow(
+            queries.CUSTOMER_INSERT,
+            customer.name, customer.email, customer.phone, customer.address
+        )
         
         return {
             "success": True,
@@ -58,10 +62,10 @@ async def create_customer(customer: Customer, conn: asyncpg.Connection = Depends
         )
 
 @router.get("/{customer_id}")
-async def get_customer(customer_id: int, conn: asyncpg.Connection = Depends(get_db)):
+async def get_customer(customer_id: int, conn: asyncpg.Connection = Depends(get_read_db)):
     """Get specific customer"""
     try:
-        customer = await conn.fetchrow('SELECT * FROM customers WHERE id = $1', customer_id)
+        customer = await conn.fetchrow(queries.CUSTOMER_BY_ID, customer_id)
         if not customer:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -80,50 +84,18 @@ async def get_customer(customer_id: int, conn: asyncpg.Connection = Depends(get_
         )
 
 @router.put("/{customer_id}")
-async def update_customer(customer_id: int, customer: CustomerUpdate, conn: asyncpg.Connection = Depends(get_db)):
+async def update_customer(customer_id: int, customer: CustomerUpdate, conn: asyncpg.Connection = Depends(get_write_db)):
     """Update customer"""
     try:
-        # Build dynamic update query
-        update_fields = []
-        values = []
-        param_count = 1
-        
-        if customer.name is not None:
-            update_fields.append(f"name = ${param_count}")
-            values.append(customer.name)
-            param_count += 1
-        
-        if customer.email is not None:
-            update_fields.append(f"email = ${param_count}")
-            values.append(customer.email)
-            param_count += 1
-        
-        if customer.phone is not None:
-            update_fields.append(f"phone = ${param_count}")
-            values.append(customer.phone)
-            param_count += 1
-        
-        if customer.address is not None:
-            update_fields.append(f"address = ${param_count}")
-            values.append(customer.address)
-            param_count += 1
-        
-        if not update_fields:
+        # One canonical statement per set of changed fields
+        update = queries.build_update('customers', queries.CUSTOMER_UPDATE_COLUMNS, customer.__dict__, customer_id)
+        if update is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="No fields to update"
             )
         
-        update_fields.append(f"updated_at = CURRENT_TIMESTAMP")
-        values.append(customer_id)
-        
-        query = f'''
-            UPDATE customers 
-            SET {', '.join(update_fields)}
-            WHERE id = ${param_count}
-            RETURNING *
-        '''
-        
+        query, values = update
         result = await conn.fetchrow(query, *values)
         
         if not result:
@@ -146,10 +118,10 @@ async def update_customer(customer_id: int, customer: CustomerUpdate, conn: asyn
         )
 
 @router.delete("/{customer_id}")
-async def delete_customer(customer_id: int, conn: asyncpg.Connection = Depends(get_db)):
+async def delete_customer(customer_id: int, conn: asyncpg.Connection = Depends(get_write_db)):
     """Delete customer"""
     try:
-        result = await conn.execute('DELETE FROM customers WHERE id = $1', customer_id)
+        result = await conn.execute(queries.CUSTOMER_DELETE, customer_id)
         
         if result == "DELETE 0":
             raise HTTPException(
@@ -1,31 +1,135 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, status
 import asyncpg
-from database import get_db
+import os
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Optional, Tuple
+from routers.auth import get_tenant_id
+from tenancy import get_read_db
+import queries
+from responses import json_response
 
 router = APIRouter()
 
+# Seconds a computed stats payload is reused; 0 disables the cache
+DASHBOARD_CACHE_TTL = float(os.getenv('DASHBOARD_CACHE_TTL', '5'))
+
+# Stats payloads kept per process; expiring_days comes from the client, so
+# the least recently used are evicted past this many
+DASHBOARD_CACHE_SIZE = int(os.getenv('DASHBOARD_CACHE_SIZE', '256'))
+
+# Keyed by (tenant_id, expiring_days), least recently used first
+_stats_cache: "OrderedDict[Tuple[int, int], Tuple[float, dict]]" = OrderedDict()
+
+def _cached_stats(key: Tuple[int, int]) -> Optional[dict]:
+    """A stats payload computed less than DASHBOARD_CACHE_TTL ago"""
+    cached = _stats_cache.get(key)
+    if cached is None:
+        return None
+    if cached[0] <= time.monotonic():
+        del _stats_cache[key]
+        return None
+    _stats_cache.move_to_end(key)
+    return cached[1]
+
+def _cache_stats(key: Tuple[int, int], data: dict):
+    """Remember a stats payload, evicting the least recently used past DASHBOARD_CACHE_SIZE"""
+    if DASHBOARD_CACHE_TTL <= 0 or DASHBOARD_CACHE_SIZE <= 0:
+        return
+    _stats_cache[key] = (time.monotonic() + DASHBOARD_CACHE_TTL, data)
+    _stats_cache.move_to_end(key)
+    while len(_stats_cache) > DASHBOARD_CACHE_SIZE:
+        _stats_cache.popitem(last=False)
+
 @router.get("/")
 @router.get("")
-async def get_dashboard_stats(conn: asyncpg.Connection = Depends(get_db)):
+@router.get("/stats")
+async def get_dashboard_stats(
+    expiring_days: int = Query(30, ge=0, le=365),
+    tenant_id: int = Depends(get_tenant_id),
+    conn: asyncpg.Connection = Depends(get_read_db)
+):
     """Get dashboard statistics"""
     try:
-        # Get basic stats
-        total_inventory = await conn.fetchval('SELECT COUNT(*) FROM inventory')
-        total_customers = await conn.fetchval('SELECT COUNT(*) FROM customers')
-        total_invoices = await conn.fetchval('SELECT COUNT(*) FROM invoices')
-        total_bills = await conn.fetchval('SELECT COUNT(*) FROM bills')
-        
+        cached = _cached_stats((tenant_id, expiring_days))
+        if cached is not None:
+            return {"success": True, "data": cached}
+
+        # Row-level security limits every table here to the caller's shop
+        stats = await conn.fetchrow(queries.DASHBOARD_STATS, expiring_days)
+
+        data = dict(stats)
+        _cache_stats((tenant_id, expiring_days), data)
+
         return {
+            "success": True,
+            "data": data
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+@router.get("/sales-chart")
+async def get_sales_chart(
+    days: int = Query(30, ge=1, le=366),
+    date_to: Optional[date] = None,
+    category_id: Optional[int] = None,
+    conn: asyncpg.Connection = Depends(get_read_db)
+):
+    """Get daily sales for the chart, one point per day including empty days"""
+    try:
+        end = date_to or date.today()
+        start = end - timedelta(days=days - 1)
+        points = await conn.fetch(queries.DASHBOARD_SALES_BY_DAY, start, end, category_id)
+        by_category = await conn.fetch(queries.DASHBOARD_SALES_BY_CATEGORY, start, end)
+        return json_response({
             "success": True,
             "data": {
-                "total_inventory": total_inventory,
-                "total_customers": total_customers,
-                "total_invoices": total_invoices,
-                "total_bills": total_bills
+                "days": points,
+                "by_category": by_category
             }
-        }
+        })
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+@router.get("/inventory-chart")
+async def get_inventory_chart(
+    days: int = Query(30, ge=1, le=366),
+    conn: asyncpg.Connection = Depends(get_read_db)
+):
+    """Get stock on hand and recent sales per category"""
+    try:
+        categories = await conn.fetch(queries.DASHBOARD_INVENTORY_BY_CATEGORY, days)
+        return json_response({
+            "success": True,
+            "data": categories
+        })
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+@router.get("/recent-activity")
+async def get_recent_activity(
+    limit: int = Query(10, ge=1, le=50),
+    conn: asyncpg.Connection = Depends(get_read_db)
+):
+    """Get the latest invoices and bills"""
+    try:
+        activity = await conn.fetch(queries.DASHBOARD_RECENT_ACTIVITY, limit)
+        return json_response({
+            "success": True,
+            "data": activity
+        })
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error"
-        ) 
\ No newline at end of file
+        )
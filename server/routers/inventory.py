@@ -1,10 +1,25 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, File, Query, Request, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import asyncpg
-from database import get_db
-from typing import Optional
+import csv
+import io
+import logging
+import math
+import re
+from datetime import date
+from routers.auth import get_tenant_id
+from tenancy import get_read_db, get_write_db
+import catalog
+import database
+import queries
+from pagination import DEFAULT_LIMIT, MAX_LIMIT, PageParams, KeysetQuery, fetch_page, page_response
+from exports import ExportQuery, export_response
+from responses import json_response
+from typing import Optional, List, Tuple, Dict
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 # Pydantic models
 class InventoryItem(BaseModel):
@@ -33,14 +48,17 @@ class InventoryUpdate(BaseModel):
 
 @router.get("/")
 @router.get("")
-async def get_inventory(conn: asyncpg.Connection = Depends(get_db)):
-    """Get all inventory items"""
+async def get_inventory(
+    category_id: Optional[int] = None,
+    page: PageParams = Depends(),
+    conn: asyncpg.Connection = Depends(get_read_db)
+):
+    """Get a page of inventory items"""
     try:
-        items = await conn.fetch('SELECT * FROM inventory ORDER BY created_at DESC')
-        return {
-            "success": True,
-            "data": [dict(item) for item in items]
-        }
+        query = KeysetQuery(queries.INVENTORY_LIST)
+        query.where_equal('category_id', category_id)
+        items, next_cursor = await fetch_page(conn, query, page)
+        return page_response(items, next_cursor)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -49,10 +67,10 @@ async def get_inventory(conn: asyncpg.Connection = Depends(get_db)):
 
 @router.post("/")
 @router.post("")
-async def create_inventory_item(item: InventoryItem, conn: asyncpg.Connection = Depends(get_db)):
+async def create_inventory_item(item: InventoryItem, conn: asyncpg.Connection = Depends(get_write_db)):
     """Create new inventory item"""
     try:
-        print("[DEBUG] Incoming item:", item)
+        logger.debug(f"Creating inventory item {item.name!r}")
         
         # Convert empty strings to None for optional fields
         description = item.description if item.description else None
@@ -72,11 +90,7 @@ async def create_inventory_item(item: InventoryItem, conn: asyncpg.Connection =
                     detail="Invalid date format. Use YYYY-MM-DD"
                 )
         
-        result = await conn.fetchrow('''
-            INSERT INTO inventory (name, description, quantity, unit_price, cost_price, category_id, expiry_date, reorder_level, manufacturer, batch_number)
-            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-            RETURNING *
-        ''', item.name, description, item.quantity, item.unit_price, item.cost_price, category_id, expiry_date, item.reorder_level, manufacturer, batch_number)
+        result = await conn.fetchrow(queries.INVENTORY_INSERT, item.name, description, item.quantity, item.unit_price, item.cost_price, category_id, expiry_date, item.reorder_level, manufacturer, batch_number)
         
         return {
             "success": True,
@@ -85,29 +99,274 @@ async def create_inventory_item(item: InventoryItem, conn: asyncpg.Connection =
         }
     except HTTPException:
         raise
+    except asyncpg.UniqueViolationError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="An item with this name and batch number already exists"
+        )
+    except Exception as e:
+        logger.exception("Inventory item creation failed")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
+INVENTORY_EXPORT_COLUMNS = {
+    column: column for column in [
+        'id', 'name', 'description', 'manufacturer', 'batch_number', 'category_id', 'quantity',
+        'unit_price', 'cost_price', 'expiry_date', 'reorder_level', 'created_at', 'updated_at'
+    ]
+}
+
+# CSV import
+IMPORT_COLUMNS = [
+    'name', 'description', 'quantity', 'unit_price', 'cost_price', 'category_id',
+    'expiry_date', 'reorder_level', 'manufacturer', 'batch_number'
+]
+IMPORT_BATCH_SIZE = 5000
+MAX_REPORTED_IMPORT_ERRORS = 500
+# Bounds of the inventory columns; a row past them would fail the whole COPY
+IMPORT_TEXT_MAX_LENGTHS = {'name': 255, 'manufacturer': 255, 'batch_number': 100}
+IMPORT_AMOUNT_LIMIT = 10 ** 8  # NUMERIC(10,2)
+IMPORT_INTEGER_LIMIT = 2 ** 31  # INTEGER
+
+class _ImportRowError(ValueError):
+    pass
+
+def _optional_text(value: Optional[str]) -> Optional[str]:
+    value = (value or '').strip()
+    return value or None
+
+def _bounded_text(row: Dict[str, str], field: str) -> Optional[str]:
+    value = _optional_text(row.get(field))
+    limit = IMPORT_TEXT_MAX_LENGTHS[field]
+    if value is not None and len(value) > limit:
+        raise _ImportRowError(f"{field} must be at most {limit} characters")
+    return value
+
+def _parse_number(value: Optional[str], field: str, cast, default=None):
+    value = (value or '').strip()
+    if not value:
+        if default is None:
+            raise _ImportRowError(f"{field} is required")
+        return default
+    try:
+        number = cast(value)
+    except ValueError:
+        raise _ImportRowError(f"{field} must be a number, got: {value}")
+    limit = IMPORT_INTEGER_LIMIT if cast is int else IMPORT_AMOUNT_LIMIT
+    if not (math.isfinite(number) and abs(round(number, 2)) < limit):
+        raise _ImportRowError(f"{field} must be a number below {limit}, got: {value}")
+    return number
+
+def _parse_import_row(row: Dict[str, str], line_no: int, dates: Dict[str, date]) -> tuple:
+    """Validate one CSV row and convert it to a staging record"""
+    name = _bounded_text(row, 'name')
+    if not name:
+        raise _ImportRowError("name is required")
+
+    quantity = _parse_number(row.get('quantity'), 'quantity', int, 0)
+    if quantity < 0:
+        raise _ImportRowError("quantity cannot be negative")
+    unit_price = _parse_number(row.get('unit_price'), 'unit_price', float)
+    if unit_price < 0:
+        raise _ImportRowError("unit_price cannot be negative")
+    cost_price = _parse_number(row.get('cost_price'), 'cost_price', float, 0.0)
+    reorder_level = _parse_number(row.get('reorder_level'), 'reorder_level', int, 10)
+    category_id = _parse_number(row.get('category_id'), 'category_id', int, 0) or None
+
+    expiry_date = None
+    raw_expiry = (row.get('expiry_date') or '').strip()
+    if raw_expiry:
+        # Distributor sheets repeat a handful of expiry dates, so parse each one once
+        expiry_date = dates.get(raw_expiry)
+        if expiry_date is None:
+            try:
+                expiry_date = dates[raw_expiry] = date.fromisoformat(raw_expiry)
+            except ValueError:
+                raise _ImportRowError(f"Invalid expiry_date format. Use YYYY-MM-DD, got: {raw_expiry}")
+
+    return (
+        line_no, name, _optional_text(row.get('description')), quantity, unit_price, cost_price,
+        category_id, expiry_date, reorder_level,
+        _bounded_text(row, 'manufacturer'), _bounded_text(row, 'batch_number')
+    )
+
+def _read_import_batch(reader: csv.DictReader, dates: Dict[str, date]) -> Tuple[List[tuple], List[dict]]:
+    """Parse up to IMPORT_BATCH_SIZE rows from the CSV reader"""
+    records = []
+    errors = []
+    for row in reader:
+        line_no = reader.line_num
+        try:
+            records.append(_parse_import_row(row, line_no, dates))
+        except _ImportRowError as e:
+            errors.append({"line": line_no, "error": str(e)})
+        if len(records) + len(errors) >= IMPORT_BATCH_SIZE:
+            break
+    return records, errors
+
+@router.post("/import")
+async def import_inventory_csv(file: UploadFile = File(...), conn: asyncpg.Connection = Depends(get_write_db)):
+    """Import inventory from a CSV file, upserting on (name, batch_number)"""
+    # The upload is spooled to disk by the multipart parser; read it lazily
+    # so only one batch of rows is held in memory at a time
+    text = io.TextIOWrapper(file.file, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+    header = await run_in_threadpool(lambda: reader.fieldnames)
+    if not header or 'name' not in header or 'unit_price' not in header:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"CSV header must include name and unit_price; supported columns: {', '.join(IMPORT_COLUMNS)}"
+        )
+
+    errors = []
+    rejected = 0
+    staged = 0
+    dates = {}
+    try:
+        async with conn.transaction():
+            await conn.execute(queries.INVENTORY_IMPORT_STAGE)
+
+            while True:
+                records, batch_errors = await run_in_threadpool(_read_import_batch, reader, dates)
+                if not records and not batch_errors:
+                    break
+                rejected += len(batch_errors)
+                errors.extend(batch_errors[:MAX_REPORTED_IMPORT_ERRORS - len(errors)])
+                if records:
+                    await conn.copy_records_to_table(
+                        'inventory_import',
+                        records=records,
+                        columns=['line_no'] + IMPORT_COLUMNS
+                    )
+                    staged += len(records)
+
+            bad_categories = await conn.fetch(queries.INVENTORY_IMPORT_REJECT_UNKNOWN_CATEGORIES)
+            rejected += len(bad_categories)
+            for row in sorted(bad_categories, key=lambda r: r['line_no']):
+                if len(errors) >= MAX_REPORTED_IMPORT_ERRORS:
+                    break
+                errors.append({"line": row['line_no'], "error": f"Category {row['category_id']} not found"})
+
+            latest = await conn.execute(queries.INVENTORY_IMPORT_LATEST)
+            merged = await conn.fetchrow(queries.INVENTORY_IMPORT_MERGE)
+
+        return {
+            "success": True,
+            "data": {
+                "inserted": merged['inserted'],
+                "updated": merged['updated'],
+                "rejected": rejected,
+                # The command status ends with the number of rows kept
+                "duplicates": staged - len(bad_categories) - int(latest.split()[-1]),
+                "errors": errors
+            },
+            "message": "Inventory import completed"
+        }
+    except HTTPException:
+        raise
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Could not read CSV file: {str(e)}"
+        )
     except Exception as e:
-        print("[ERROR] Exception in create_inventory_item:", str(e))
-        import traceback
-        print("[ERROR] Full traceback:", traceback.format_exc())
+        logger.exception("Inventory import failed")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Internal server error: {str(e)}"
         )
 
+@router.get("/export")
+async def export_inventory(
+    export_format: str = Query("csv", alias="format"),
+    columns: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    tenant_id: int = Depends(get_tenant_id)
+):
+    """Stream inventory as CSV or NDJSON, filtered by creation date"""
+    query = ExportQuery("inventory", INVENTORY_EXPORT_COLUMNS, order_by="id")
+    query.select(columns).date_range("created_at", date_from, date_to)
+    return await export_response(query, export_format, "inventory", tenant_id)
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+# Fields of a search result, as selected by the INVENTORY_SEARCH_* queries
+SEARCH_COLUMNS = (
+    'id', 'name', 'manufacturer', 'batch_number', 'quantity', 'unit_price', 'expiry_date', 'category_id'
+)
+
+def _search_words(text: str) -> List[str]:
+    """Lowercased words of the text, each matched as a word prefix, e.g. 'Para-500' -> ['para', '500']"""
+    return re.findall(r'[^\W_]+', text.lower())
+
+@router.get("/search")
+async def search_inventory(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+    tenant_id: int = Depends(get_tenant_id)
+):
+    """Find items by name prefix, then by word prefixes of name, manufacturer and batch number"""
+    words = _search_words(q)
+    if not words:
+        return json_response({"success": True, "data": []})
+    prefix = q.strip().lower()
+    try:
+        # Name prefixes come from the shop's catalog when it is loaded, and
+        # the database is only asked for word matches if they fall short
+        shop = catalog.lookup(request, tenant_id)
+        items = []
+        if shop is not None:
+            items = [item.as_dict(SEARCH_COLUMNS) for item in shop.prefix(prefix, limit)]
+        if len(items) < limit:
+            async with database.checkout(database.read_source(request), tenant_id) as conn:
+                if shop is None:
+                    items = await conn.fetch(queries.INVENTORY_SEARCH_BY_NAME_PREFIX, prefix, limit)
+                if len(items) < limit:
+                    items += await conn.fetch(queries.INVENTORY_SEARCH_BY_WORDS, words, prefix, limit - len(items))
+        return json_response({
+            "success": True,
+            "data": items
+        })
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception(f"Inventory search failed for {q!r}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
+
 @router.get("/{item_id}")
-async def get_inventory_item(item_id: int, conn: asyncpg.Connection = Depends(get_db)):
-    """Get specific inventory item"""
+async def get_inventory_item(item_id: int, request: Request, tenant_id: int = Depends(get_tenant_id)):
+    """Get specific inventory item, from the shop's catalog when it is loaded"""
+    shop = catalog.lookup(request, tenant_id)
+    if shop is not None:
+        item = shop.get(item_id)
+        if item is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Item not found"
+            )
+        return json_response({
+            "success": True,
+            "data": item.as_dict()
+        })
     try:
-        item = await conn.fetchrow('SELECT * FROM inventory WHERE id = $1', item_id)
+        async with database.checkout(database.read_source(request), tenant_id) as conn:
+            item = await conn.fetchrow(queries.INVENTORY_BY_ID, item_id)
         if not item:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Item not found"
             )
-        return {
+        return json_response({
             "success": True,
-            "data": dict(item)
-        }
+            "data": item
+        })
     except HTTPException:
         raise
     except Exception as e:
@@ -117,89 +376,30 @@ async def get_inventory_item(item_id: int, conn: asyncpg.Connection = Depends(ge
         )
 
 @router.put("/{item_id}")
-async def update_inventory_item(item_id: int, item: InventoryUpdate, conn: asyncpg.Connection = Depends(get_db)):
+async def update_inventory_item(item_id: int, item: InventoryUpdate, conn: asyncpg.Connection = Depends(get_write_db)):
     """Update inventory item"""
     try:
-        # Build dynamic update query
-        update_fields = []
-        values = []
-        param_count = 1
-        
-        if item.name is not None:
-            update_fields.append(f"name = ${param_count}")
-            values.append(item.name)
-            param_count += 1
-        
-        if item.description is not None:
-            update_fields.append(f"description = ${param_count}")
-            values.append(item.description)
-            param_count += 1
-        
-        if item.quantity is not None:
-            update_fields.append(f"quantity = ${param_count}")
-            values.append(item.quantity)
-            param_count += 1
-        
-        if item.unit_price is not None:
-            update_fields.append(f"unit_price = ${param_count}")
-            values.append(item.unit_price)
-            param_count += 1
-        
-        if item.cost_price is not None:
-            update_fields.append(f"cost_price = ${param_count}")
-            values.append(item.cost_price)
-            param_count += 1
-        
-        if item.category_id is not None:
-            update_fields.append(f"category_id = ${param_count}")
-            values.append(item.category_id)
-            param_count += 1
-        
+        values = dict(item.__dict__)
         if item.expiry_date is not None:
             # Convert date string to date object
             from datetime import datetime
             try:
-                expiry_date = datetime.strptime(item.expiry_date, '%Y-%m-%d').date()
-                update_fields.append(f"expiry_date = ${param_count}")
-                values.append(expiry_date)
-                param_count += 1
+                values['expiry_date'] = datetime.strptime(item.expiry_date, '%Y-%m-%d').date()
             except ValueError:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Invalid date format. Use YYYY-MM-DD"
                 )
         
-        if item.reorder_level is not None:
-            update_fields.append(f"reorder_level = ${param_count}")
-            values.append(item.reorder_level)
-            param_count += 1
-        
-        if item.manufacturer is not None:
-            update_fields.append(f"manufacturer = ${param_count}")
-            values.append(item.manufacturer)
-            param_count += 1
-        
-        if item.batch_number is not None:
-            update_fields.append(f"batch_number = ${param_count}")
-            values.append(item.batch_number)
-            param_count += 1
-        
-        if not update_fields:
+        # One canonical statement per set of changed fields
+        update = queries.build_update('inventory', queries.INVENTORY_UPDATE_COLUMNS, values, item_id)
+        if update is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="No fields to update"
             )
         
-        update_fields.append(f"updated_at = CURRENT_TIMESTAMP")
-        values.append(item_id)
-        
-        query = f'''
-            UPDATE inventory 
-            SET {', '.join(update_fields)}
-            WHERE id = ${param_count}
-            RETURNING *
-        '''
-        
+        query, values = update
         result = await conn.fetchrow(query, *values)
         
         if not result:
@@ -215,20 +415,23 @@ async def update_inventory_item(item_id: int, item: InventoryUpdate, conn: async
         }
     except HTTPException:
         raise
+    except asyncpg.UniqueViolationError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="An item with this name and batch number already exists"
+        )
     except Exception as e:
-        print("[ERROR] Exception in update_inventory_item:", str(e))
-        import traceback
-        print("[ERROR] Full traceback:", traceback.format_exc())
+        logger.exception(f"Inventory item {item_id} update failed")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Internal server error: {str(e)}"
+            detail="Internal server error"
         )
 
 @router.delete("/{item_id}")
-async def delete_inventory_item(item_id: int, conn: asyncpg.Connection = Depends(get_db)):
+async def delete_inventory_item(item_id: int, conn: asyncpg.Connection = Depends(get_write_db)):
     """Delete inventory item"""
     try:
-        result = await conn.execute('DELETE FROM inventory WHERE id = $1', item_id)
+        result = await conn.execute(queries.INVENTORY_DELETE, item_id)
         
         if result == "DELETE 0":
             raise HTTPException(
@@ -249,7 +452,7 @@ async def delete_inventory_item(item_id: int, conn: asyncpg.Connection = Depends
         )
 
 @router.patch("/{item_id}/stock")
-async def update_stock(item_id: int, data: dict, conn: asyncpg.Connection = Depends(get_db)):
+async def update_stock(item_id: int, data: dict, conn: asyncpg.Connection = Depends(get_write_db)):
     """Update inventory stock"""
     try:
         quantity = data.get('quantity')
@@ -259,12 +462,7 @@ async def update_stock(item_id: int, data: dict, conn: asyncpg.Connection = Depe
                 detail="Quantity is required"
             )
         
-        result = await conn.fetchrow('''
-            UPDATE inventory 
-            SET quantity = $1, updated_at = CURRENT_TIMESTAMP
-            WHERE id = $2
-            RETURNING *
-        ''', quantity, item_id)
+        result = await conn.fetchrow(queries.INVENTORY_SET_STOCK, quantity, item_id)
         
         if not result:
             raise HTTPException(
@@ -286,18 +484,21 @@ async def update_stock(item_id: int, data: dict, conn: asyncpg.Connection = Depe
         ) 
 
 @router.get("/low-stock/items")
-async def get_low_stock_items(conn: asyncpg.Connection = Depends(get_db)):
-    """Get items that are low on stock (below reorder level)"""
+async def get_low_stock_items(
+    category_id: Optional[int] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    conn: asyncpg.Connection = Depends(get_read_db)
+):
+    """Get items that are low on stock (below reorder level), lowest stock ratio first"""
     try:
-        items = await conn.fetch('''
-            SELECT * FROM inventory 
-            WHERE quantity <= reorder_level 
-            ORDER BY (quantity::float / reorder_level::float) ASC
-        ''')
-        return {
+        if category_id is None:
+            items = await conn.fetch(queries.INVENTORY_LOW_STOCK, limit)
+        else:
+            items = await conn.fetch(queries.INVENTORY_LOW_STOCK_BY_CATEGORY, category_id, limit)
+        return json_response({
             "success": True,
-            "data": [dict(item) for item in items]
-        }
+            "data": items
+        })
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -305,20 +506,14 @@ async def get_low_stock_items(conn: asyncpg.Connection = Depends(get_db)):
         )
 
 @router.get("/expiring/items")
-async def get_expiring_items(days: int = 30, conn: asyncpg.Connection = Depends(get_db)):
+async def get_expiring_items(days: int = 30, conn: asyncpg.Connection = Depends(get_read_db)):
     """Get items that are expiring within the specified number of days"""
     try:
-        items = await conn.fetch('''
-            SELECT * FROM inventory 
-            WHERE expiry_date IS NOT NULL 
-            AND expiry_date <= CURRENT_DATE + $1
-            AND expiry_date >= CURRENT_DATE
-            ORDER BY expiry_date ASC
-        ''', days)
-        return {
+        items = await conn.fetch(queries.INVENTORY_EXPIRING, days)
+        return json_response({
             "success": True,
-            "data": [dict(item) for item in items]
-        }
+            "data": items
+        })
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
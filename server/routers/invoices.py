@@ -1,10 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, status
 import asyncpg
-from database import get_db
-from pydantic import BaseModel, validator
-from typing import Optional, List
+from routers.auth import get_tenant_id
+from tenancy import get_read_db, get_write_db
+import queries
+from pagination import PageParams, KeysetQuery, fetch_page
+from exports import ExportQuery, export_response
+from responses import json_response
+from pydantic import BaseModel, ValidationError, validator
+from typing import Optional, List, Any, Tuple
 from datetime import datetime, date
 import logging
+import math
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -70,66 +76,213 @@ class Invoice(BaseModel):
         except (ValueError, AttributeError) as e:
             raise ValueError(f'Invalid date format. Expected YYYY-MM-DD, got: {v}')
 
+INVOICE_EXPORT_COLUMNS = {
+    "id": "i.id",
+    "invoice_date": "i.invoice_date",
+    "customer_id": "i.customer_id",
+    "customer_name": "COALESCE(c.name, i.customer_name)",
+    "customer_phone": "COALESCE(c.phone, i.customer_phone)",
+    "total_amount": "i.total_amount",
+    "status": "i.status",
+    "payment_method": "i.payment_method",
+    "due_date": "i.due_date",
+    "notes": "i.notes",
+    "created_at": "i.created_at"
+}
+
+INVOICE_ITEM_EXPORT_COLUMNS = {
+    "invoice_id": "ii.invoice_id",
+    "invoice_date": "i.invoice_date",
+    "item_id": "ii.id",
+    "inventory_id": "ii.inventory_id",
+    "item_name": "COALESCE(inv.name, ii.item_text)",
+    "batch_number": "inv.batch_number",
+    "quantity": "ii.quantity",
+    "unit_price": "ii.unit_price",
+    "discount_percentage": "ii.discount_percentage",
+    "discount_amount": "ii.discount_amount",
+    "gst_percentage": "ii.gst_percentage",
+    "gst_amount": "ii.gst_amount",
+    "line_total": "ii.quantity * ii.unit_price - COALESCE(ii.discount_amount, 0) + COALESCE(ii.gst_amount, 0)"
+}
+
+class InvoiceBatch(BaseModel):
+    invoices: List[Any]
+
+MAX_BATCH_SIZE = 20000
+# Bounds of the columns batch records are merged into; staging is TEXT and
+# DOUBLE PRECISION, so values past them are rejected per record up front
+CUSTOMER_NAME_MAX_LENGTH = 255   # customers.name VARCHAR(255)
+CUSTOMER_EMAIL_MAX_LENGTH = 255  # customers.email VARCHAR(255)
+CUSTOMER_PHONE_MAX_LENGTH = 20   # customers.phone VARCHAR(20)
+AMOUNT_LIMIT = 10 ** 8           # NUMERIC(10,2)
+PERCENTAGE_LIMIT = 10 ** 3       # NUMERIC(5,2)
+QUANTITY_LIMIT = 2 ** 31         # INTEGER
+
+def item_amounts(item: InvoiceItem) -> Tuple[float, float, float]:
+    """Return the (discount, GST, total) amounts of a line, deriving missing ones from percentages"""
+    discount_amount = item.discount_amount
+    gst_amount = item.gst_amount
+    if item.discount_percentage and not discount_amount:
+        discount_amount = (item.quantity * item.unit_price) * (item.discount_percentage / 100)
+    
+    if item.gst_percentage and not gst_amount:
+        subtotal = (item.quantity * item.unit_price) - (discount_amount or 0)
+        gst_amount = subtotal * (item.gst_percentage / 100)
+
+    total = (
+        item.quantity * item.unit_price 
+        - (discount_amount or 0) 
+        + (gst_amount or 0)
+    )
+    return discount_amount, gst_amount, total
+
+def calculate_item_total(item: InvoiceItem) -> float:
+    """Fill in missing discount/GST amounts and return the line total"""
+    item.discount_amount, item.gst_amount, total = item_amounts(item)
+    return total
+
+async def insert_invoice_items(
+    conn: asyncpg.Connection,
+    invoice_id: int,
+    invoice_created_at: datetime,
+    items: List[InvoiceItem]
+) -> int:
+    """Insert all line items of an invoice with a single statement"""
+    result = await conn.execute(
+        queries.INVOICE_ITEMS_INSERT,
+        invoice_id,
+        invoice_created_at,
+        [item.inventory_id for item in items],
+        [item.item_text for item in items],
+        [item.quantity for item in items],
+        [item.unit_price for item in items],
+        [item.discount_percentage for item in items],
+        [item.discount_amount for item in items],
+        [item.gst_percentage for item in items],
+        [item.gst_amount for item in items]
+    )
+    # Command status is "INSERT 0 <rows>"
+    return int(result.split()[-1])
+
+async def decrement_stock(conn: asyncpg.Connection, inventory_ids: List[int], quantities: List[int]):
+    """Subtract sold quantities from inventory with a single statement"""
+    if not inventory_ids:
+        return
+    await conn.execute(queries.INVENTORY_DECREMENT_STOCK, inventory_ids, quantities)
+
 @router.get("/")
 @router.get("")
-async def get_invoices(conn: asyncpg.Connection = Depends(get_db)):
-    """Get all invoices with their items"""
+async def get_invoices(
+    status_filter: Optional[str] = Query(None, alias="status"),
+    customer_id: Optional[int] = None,
+    page: PageParams = Depends(),
+    conn: asyncpg.Connection = Depends(get_read_db)
+):
+    """Get a page of invoices with their items"""
     try:
-        # Fetch all invoices
-        invoices = await conn.fetch('''
-            SELECT 
-                i.*,
-                c.name as customer_name,
-                c.email as customer_email,
-                c.phone as customer_phone,
-                c.address as customer_address
-            FROM invoices i
-            LEFT JOIN customers c ON i.customer_id = c.id
-            ORDER BY i.created_at DESC
-        ''')
+        # Fetch one page of invoices, newest first
+        query = KeysetQuery(queries.INVOICE_LIST, alias='i')
+        query.where_equal('i.status', status_filter)
+        query.where_equal('i.customer_id', customer_id)
+        invoices, next_cursor = await fetch_page(conn, query, page)
         
         # Convert invoices to list of dictionaries
         invoice_list = [dict(invoice) for invoice in invoices]
         
-        # Fetch items for each invoice
+        # Fetch the items for the whole page in a single query
+        items_by_invoice = {invoice['id']: [] for invoice in invoice_list}
+        if items_by_invoice:
+            # The page's created_at range confines the lookup to its months' partitions
+            created = [invoice['created_at'] for invoice in invoice_list]
+            items = await conn.fetch(
+                queries.INVOICE_ITEMS_FOR_INVOICES, list(items_by_invoice), min(created), max(created)
+            )
+            for item in items:
+                items_by_invoice[item['invoice_id']].append(item)
+        
         for invoice in invoice_list:
-            items = await conn.fetch('''
-                SELECT 
-                    ii.*,
-                    inv.name as inventory_name,
-                    inv.description as inventory_description
-                FROM invoice_items ii
-                LEFT JOIN inventory inv ON ii.inventory_id = inv.id
-                WHERE ii.invoice_id = $1
-            ''', invoice['id'])
-            invoice['items'] = [dict(item) for item in items]
+            invoice['items'] = items_by_invoice[invoice['id']]
         
-        return {
+        return json_response({
             "success": True,
-            "data": invoice_list
-        }
+            "data": invoice_list,
+            "next_cursor": next_cursor
+        })
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Internal server error: {str(e)}"
         )
 
-@router.post("/")
-@router.post("")
-async def create_invoice(invoice: Invoice, conn: asyncpg.Connection = Depends(get_db)):
-    """Create a new invoice with automatic customer creation if needed"""
+@router.get("/export")
+async def export_invoices(
+    export_format: str = Query("csv", alias="format"),
+    columns: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    tenant_id: int = Depends(get_tenant_id)
+):
+    """Stream invoices as CSV or NDJSON, filtered by invoice date"""
+    query = ExportQuery(
+        "invoices i LEFT JOIN customers c ON i.customer_id = c.id",
+        INVOICE_EXPORT_COLUMNS,
+        order_by="i.invoice_date, i.id"
+    )
+    query.select(columns).date_range("i.invoice_date", date_from, date_to)
+    return await export_response(query, export_format, "invoices", tenant_id)
+
+@router.get("/items/export")
+async def export_invoice_items(
+    export_format: str = Query("csv", alias="format"),
+    columns: Optional[str] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    tenant_id: int = Depends(get_tenant_id)
+):
+    """Stream invoice line items as CSV or NDJSON, filtered by invoice date"""
+    query = ExportQuery(
+        """invoice_items ii
+        JOIN invoices i ON ii.invoice_id = i.id AND ii.invoice_created_at = i.created_at
+        LEFT JOIN inventory inv ON ii.inventory_id = inv.id""",
+        INVOICE_ITEM_EXPORT_COLUMNS,
+        order_by="i.invoice_date, ii.invoice_id, ii.id"
+    )
+    query.select(columns).date_range("i.invoice_date", date_from, date_to)
+    return await export_response(query, export_format, "invoice_items", tenant_id)
+
+@router.get("/{invoice_id}")
+async def get_invoice(invoice_id: int, conn: asyncpg.Connection = Depends(get_read_db)):
+    """Get one invoice with its items"""
     try:
-        # Verify invoice_items table exists
-        try:
-            await conn.fetchval("SELECT COUNT(*) FROM invoice_items LIMIT 1")
-            logger.info("invoice_items table exists and is accessible")
-        except Exception as e:
-            logger.error(f"Error accessing invoice_items table: {str(e)}")
+        invoice = await conn.fetchrow(queries.INVOICE_BY_ID, invoice_id)
+        if invoice is None:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error accessing invoice_items table: {str(e)}"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Invoice not found"
             )
+        invoice = dict(invoice)
+        invoice['items'] = await conn.fetch(
+            queries.INVOICE_ITEMS_FOR_INVOICES, [invoice_id], invoice['created_at'], invoice['created_at']
+        )
+        return json_response({
+            "success": True,
+            "data": invoice
+        })
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching invoice {invoice_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Internal server error"
+        )
 
+@router.post("/")
+@router.post("")
+async def create_invoice(invoice: Invoice, conn: asyncpg.Connection = Depends(get_write_db)):
+    """Create a new invoice with automatic customer creation if needed"""
+    try:
         # Log incoming request
         logger.info(f"Creating invoice with {len(invoice.items)} items")
         logger.info(f"Customer info: {invoice.customer}")
@@ -143,7 +296,7 @@ async def create_invoice(invoice: Invoice, conn: asyncpg.Connection = Depends(ge
                 # First try to find the customer by phone number if provided
                 if invoice.customer.customer_phone:
                     existing_customer = await conn.fetchrow(
-                        'SELECT id FROM customers WHERE phone = $1',
+                        queries.CUSTOMER_ID_BY_PHONE,
                         invoice.customer.customer_phone
                     )
                     if existing_customer:
@@ -153,11 +306,8 @@ async def create_invoice(invoice: Invoice, conn: asyncpg.Connection = Depends(ge
                 # If customer not found, create a new one
                 if not customer_id:
                     try:
-                        new_customer = await conn.fetchrow('''
-                            INSERT INTO customers (name, email, phone, address)
-                            VALUES ($1, $2, $3, $4)
-                            RETURNING id
-                        ''', 
+                        new_customer = await conn.fetchrow(
+                        queries.CUSTOMER_INSERT,
                         invoice.customer.customer_name,
                         invoice.customer.customer_email,
                         invoice.customer.customer_phone,
@@ -173,23 +323,7 @@ async def create_invoice(invoice: Invoice, conn: asyncpg.Connection = Depends(ge
                         )
 
             # Calculate total amount
-            total_amount = 0
-            for item in invoice.items:
-                # Calculate amounts if not provided
-                if item.discount_percentage and not item.discount_amount:
-                    item.discount_amount = (item.quantity * item.unit_price) * (item.discount_percentage / 100)
-                
-                if item.gst_percentage and not item.gst_amount:
-                    subtotal = (item.quantity * item.unit_price) - (item.discount_amount or 0)
-                    item.gst_amount = subtotal * (item.gst_percentage / 100)
-
-                # Calculate item total
-                item_total = (
-                    item.quantity * item.unit_price 
-                    - (item.discount_amount or 0) 
-                    + (item.gst_amount or 0)
-                )
-                total_amount += item_total
+            total_amount = sum(calculate_item_total(item) for item in invoice.items)
 
             # Parse dates
             invoice_date = datetime.strptime(invoice.invoice_date, '%Y-%m-%d') if invoice.invoice_date else datetime.now()
@@ -198,16 +332,8 @@ async def create_invoice(invoice: Invoice, conn: asyncpg.Connection = Depends(ge
 
             # Insert invoice
             try:
-                invoice_query = """
-                    INSERT INTO invoices (
-                        customer_id, customer_name, customer_phone, customer_address,
-                        invoice_date, total_amount, status, payment_method, notes,
-                        due_date
-                    ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10)
-                    RETURNING id
-                """
-                invoice_id = await conn.fetchval(
-                    invoice_query,
+                invoice_id, invoice_created_at = await conn.fetchrow(
+                    queries.INVOICE_INSERT,
                     customer_id,  # Now using the found or created customer_id
                     invoice.customer.customer_name,
                     invoice.customer.customer_phone,
@@ -227,75 +353,22 @@ async def create_invoice(invoice: Invoice, conn: asyncpg.Connection = Depends(ge
                     detail=f"Error creating invoice record: {str(e)}"
                 )
 
-            # Insert invoice items
-            logger.info(f"Starting to insert {len(invoice.items)} items for invoice {invoice_id}")
-            for idx, item in enumerate(invoice.items):
-                try:
-                    # Log the item data before insertion
-                    logger.info(f"Attempting to insert item {idx + 1}: {item.dict()}")
-                    
-                    item_query = """
-                        INSERT INTO invoice_items (
-                            invoice_id, inventory_id, item_text,
-                            quantity, unit_price,
-                            discount_percentage, discount_amount,
-                            gst_percentage, gst_amount
-                        ) VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
-                        RETURNING id
-                    """
-                    
-                    # Log the actual values being inserted
-                    values = [
-                        invoice_id,
-                        item.inventory_id,
-                        item.item_text,
-                        item.quantity,
-                        item.unit_price,
-                        item.discount_percentage,
-                        item.discount_amount,
-                        item.gst_percentage,
-                        item.gst_amount
-                    ]
-                    logger.info(f"Item {idx + 1} values: {values}")
-                    
-                    item_id = await conn.fetchval(
-                        item_query,
-                        *values
-                    )
-                    logger.info(f"Successfully created invoice item {idx + 1} with ID: {item_id}")
-
-                    # Verify the item was inserted
-                    verification = await conn.fetchrow(
-                        "SELECT * FROM invoice_items WHERE id = $1",
-                        item_id
-                    )
-                    if verification:
-                        logger.info(f"Verified item {idx + 1} insertion: {dict(verification)}")
-                    else:
-                        logger.error(f"Item {idx + 1} not found after insertion!")
-
-                    # Update inventory quantity if inventory_id is provided
-                    if item.inventory_id:
-                        await conn.execute(
-                            "UPDATE inventory SET quantity = quantity - $1 WHERE id = $2",
-                            item.quantity,
-                            item.inventory_id
-                        )
-                        logger.info(f"Updated inventory quantity for item {item.inventory_id}")
-                except Exception as e:
-                    logger.error(f"Error inserting invoice item {idx + 1}: {str(e)}")
-                    logger.error(f"Failed item data: {item.dict()}")
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail=f"Error inserting invoice item {idx + 1}: {str(e)}"
-                    )
-
-            # Verify all items were inserted
-            final_count = await conn.fetchval(
-                "SELECT COUNT(*) FROM invoice_items WHERE invoice_id = $1",
-                invoice_id
-            )
-            logger.info(f"Final invoice items count: {final_count}")
+            # Insert invoice items and update stock, one statement each
+            try:
+                items_count = await insert_invoice_items(conn, invoice_id, invoice_created_at, invoice.items)
+                stocked_items = [item for item in invoice.items if item.inventory_id]
+                await decrement_stock(
+                    conn,
+                    [item.inventory_id for item in stocked_items],
+                    [item.quantity for item in stocked_items]
+                )
+                logger.info(f"Inserted {items_count} items for invoice {invoice_id}")
+            except Exception as e:
+                logger.error(f"Error inserting invoice items: {str(e)}")
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Error inserting invoice items: {str(e)}"
+                )
 
             return {
                 "success": True,
@@ -304,7 +377,7 @@ async def create_invoice(invoice: Invoice, conn: asyncpg.Connection = Depends(ge
                 "data": {
                     "invoice_id": invoice_id,
                     "customer_id": customer_id,
-                    "items_count": final_count
+                    "items_count": items_count
                 }
             }
 
@@ -315,4 +388,181 @@ async def create_invoice(invoice: Invoice, conn: asyncpg.Connection = Depends(ge
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Internal server error: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+def _out_of_range(value: Optional[float], limit: int) -> bool:
+    """Whether a value would not fit a NUMERIC column holding less than limit at two decimals"""
+    return value is not None and not (math.isfinite(value) and abs(round(value, 2)) < limit)
+
+def _batch_item_rows(rec_no: int, invoice: Invoice) -> Tuple[List[tuple], float]:
+    """Staging rows for a batch record's items, priced, and the record's total"""
+    total_amount = 0
+    rows = []
+    for line_no, item in enumerate(invoice.items):
+        discount_amount, gst_amount, item_total = item_amounts(item)
+        total_amount += item_total
+        rows.append((
+            rec_no,
+            line_no,
+            item.inventory_id,
+            item.item_text,
+            item.quantity,
+            item.unit_price,
+            item.discount_percentage,
+            discount_amount,
+            item.gst_percentage,
+            gst_amount
+        ))
+    return rows, total_amount
+
+def _batch_record_error(invoice: Invoice, items: List[tuple], total_amount: float) -> Optional[str]:
+    """Why a batch record would not fit the invoice, item or customer columns, if it would not"""
+    customer = invoice.customer
+    if customer.customer_id is None and customer.customer_name is not None:
+        for field, value, limit in (
+            ('customer_name', customer.customer_name, CUSTOMER_NAME_MAX_LENGTH),
+            ('customer_email', customer.customer_email, CUSTOMER_EMAIL_MAX_LENGTH),
+            ('customer_phone', customer.customer_phone, CUSTOMER_PHONE_MAX_LENGTH),
+        ):
+            if value is not None and len(value) > limit:
+                return f"customer.{field}: at most {limit} characters"
+    for (_, line_no, _, _, quantity, unit_price, discount_percentage, discount_amount,
+         gst_percentage, gst_amount) in items:
+        if quantity >= QUANTITY_LIMIT:
+            return f"items.{line_no}.quantity: must be less than {QUANTITY_LIMIT}"
+        for field, value, limit in (
+            ('unit_price', unit_price, AMOUNT_LIMIT),
+            ('discount_amount', discount_amount, AMOUNT_LIMIT),
+            ('gst_amount', gst_amount, AMOUNT_LIMIT),
+            ('discount_percentage', discount_percentage, PERCENTAGE_LIMIT),
+            ('gst_percentage', gst_percentage, PERCENTAGE_LIMIT),
+        ):
+            if _out_of_range(value, limit):
+                return f"items.{line_no}.{field}: must be a number below {limit}"
+    if _out_of_range(total_amount, AMOUNT_LIMIT):
+        return f"total_amount: must be a number below {AMOUNT_LIMIT}"
+    return None
+
+def _describe_validation_error(error: ValidationError) -> str:
+    """Flatten a pydantic error into a single readable line"""
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors()
+    )
+
+@router.post("/batch")
+async def create_invoices_batch(batch: InvoiceBatch, conn: asyncpg.Connection = Depends(get_write_db)):
+    """Create many invoices at once, reporting failures per record"""
+    if len(batch.invoices) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"A batch may contain at most {MAX_BATCH_SIZE} invoices"
+        )
+
+    errors = []
+    invoice_rows = []
+    item_rows = []
+    parsed_dates = {}
+    now = datetime.now()
+
+    def parse_date(value: str) -> datetime:
+        if value not in parsed_dates:
+            parsed_dates[value] = datetime.strptime(value, '%Y-%m-%d')
+        return parsed_dates[value]
+
+    # Validate and price every record in Python; bad records are reported, not fatal
+    for idx, record in enumerate(batch.invoices):
+        try:
+            invoice = Invoice(**record)
+        except ValidationError as e:
+            errors.append({"index": idx, "error": _describe_validation_error(e)})
+            continue
+        except TypeError:
+            errors.append({"index": idx, "error": "Invoice must be an object"})
+            continue
+
+        record_items, total_amount = _batch_item_rows(idx, invoice)
+        error = _batch_record_error(invoice, record_items, total_amount)
+        if error:
+            errors.append({"index": idx, "error": error})
+            continue
+        item_rows.extend(record_items)
+
+        # A record without an invoice date is dated at the batch's arrival,
+        # so the staged date is never NULL
+        customer = invoice.customer
+        invoice_rows.append((
+            idx,
+            customer.customer_id,
+            customer.customer_name,
+            customer.customer_phone,
+            customer.customer_address,
+            customer.customer_email,
+            parse_date(invoice.invoice_date) if invoice.invoice_date else now,
+            parse_date(invoice.due_date).date() if invoice.due_date else None,
+            total_amount,
+            invoice.payment_method,
+            invoice.notes
+        ))
+
+    created = []
+    try:
+        if invoice_rows:
+            async with conn.transaction():
+                # Stage the batch with COPY, then merge it with a fixed number of statements
+                await conn.execute(queries.INVOICE_BATCH_STAGE)
+                await conn.copy_records_to_table(
+                    'invoice_batch',
+                    records=invoice_rows,
+                    columns=[
+                        'rec_no', 'customer_id', 'customer_name', 'customer_phone',
+                        'customer_address', 'customer_email', 'invoice_date', 'due_date',
+                        'total_amount', 'payment_method', 'notes'
+                    ]
+                )
+                if item_rows:
+                    await conn.copy_records_to_table(
+                        'invoice_item_batch',
+                        records=item_rows,
+                        columns=[
+                            'rec_no', 'line_no', 'inventory_id', 'item_text', 'quantity',
+                            'unit_price', 'discount_percentage', 'discount_amount',
+                            'gst_percentage', 'gst_amount'
+                        ]
+                    )
+
+                # Reject records that reference missing customers or inventory
+                rejected = await conn.fetch(queries.INVOICE_BATCH_MISSING_REFERENCES)
+                if rejected:
+                    rejected_ids = [row['rec_no'] for row in rejected]
+                    errors.extend({"index": row['rec_no'], "error": row['reason']} for row in rejected)
+                    await conn.execute(queries.INVOICE_BATCH_DISCARD, rejected_ids)
+                    await conn.execute(queries.INVOICE_ITEM_BATCH_DISCARD, rejected_ids)
+
+                await conn.execute(queries.INVOICE_BATCH_RESOLVE_CUSTOMERS)
+                await conn.execute(queries.INVOICE_BATCH_MERGE)
+                created = await conn.fetch(queries.INVOICE_BATCH_CREATED)
+
+        logger.info(f"Invoice batch: {len(created)} created, {len(errors)} rejected")
+        errors.sort(key=lambda error: error["index"])
+        return {
+            "success": True,
+            "data": {
+                "created_count": len(created),
+                "error_count": len(errors),
+                "invoices": [
+                    {
+                        "index": row['rec_no'],
+                        "invoice_id": row['invoice_id'],
+                        "customer_id": row['customer_id']
+                    }
+                    for row in created
+                ],
+                "errors": errors
+            }
+        }
+    except Exception as e:
+        logger.error(f"Error creating invoice batch: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Internal server error: {str(e)}"
+        )
@@ -1,19 +1,25 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, status
 import asyncpg
-from database import get_db
+from tenancy import get_tenant_db
+import queries
+from pagination import PageParams, KeysetQuery, fetch_page, page_response
+from typing import Optional
 
 router = APIRouter()
 
 @router.get("/")
 @router.get("")
-async def get_purchase_orders(conn: asyncpg.Connection = Depends(get_db)):
-    """Get all purchase orders"""
+async def get_purchase_orders(
+    status_filter: Optional[str] = Query(None, alias="status"),
+    page: PageParams = Depends(),
+    conn: asyncpg.Connection = Depends(get_tenant_db)
+):
+    """Get a page of purchase orders"""
     try:
-        orders = await conn.fetch('SELECT * FROM purchase_orders ORDER BY created_at DESC')
-        return {
-            "success": True,
-            "data": [dict(order) for order in orders]
-        }
+        query = KeysetQuery(queries.PURCHASE_ORDER_LIST)
+        query.where_equal('status', status_filter)
+        orders, next_cursor = await fetch_page(conn, query, page)
+        return page_response(orders, next_cursor)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
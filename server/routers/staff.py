@@ -1,19 +1,27 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 import asyncpg
 from database import get_db
+from routers.auth import get_tenant_id
+import queries
+from pagination import PageParams, KeysetQuery, fetch_page, page_response
 
 router = APIRouter()
 
 @router.get("/")
 @router.get("")
-async def get_staff(conn: asyncpg.Connection = Depends(get_db)):
-    """Get all staff"""
+async def get_staff(
+    page: PageParams = Depends(),
+    tenant_id: int = Depends(get_tenant_id),
+    conn: asyncpg.Connection = Depends(get_db)
+):
+    """Get a page of staff"""
     try:
-        staff = await conn.fetch('SELECT * FROM users WHERE role = $1 ORDER BY created_at DESC', 'staff')
-        return {
-            "success": True,
-            "data": [dict(member) for member in staff]
-        }
+        # Users are not under row-level security, so filter by shop here
+        query = KeysetQuery(queries.USER_LIST)
+        query.where_equal('tenant_id', tenant_id)
+        query.where_equal('role', 'staff')
+        staff, next_cursor = await fetch_page(conn, query, page)
+        return page_response(staff, next_cursor)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
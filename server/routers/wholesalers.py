@@ -1,19 +1,20 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 import asyncpg
-from database import get_db
+from tenancy import get_tenant_db
+from pagination import PageParams, page_response
 
 router = APIRouter()
 
 @router.get("/")
 @router.get("")
-async def get_wholesalers(conn: asyncpg.Connection = Depends(get_db)):
-    """Get all wholesalers"""
+async def get_wholesalers(
+    page: PageParams = Depends(),
+    conn: asyncpg.Connection = Depends(get_tenant_db)
+):
+    """Get a page of wholesalers"""
     try:
         # Placeholder - would need a wholesalers table
-        return {
-            "success": True,
-            "data": []
-        }
+        return page_response([], None)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
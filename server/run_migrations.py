@@ -1,34 +1,77 @@
 import os
+import re
 import asyncio
 import asyncpg
 import logging
 from pathlib import Path
+from typing import List
+
+from secret_store import get_secret
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-async def run_migrations():
-    """Run all migration scripts in order"""
-    # Database configuration
-    db_host = os.getenv('DB_HOST', 'localhost')
-    db_port = int(os.getenv('DB_PORT', '5432'))
-    db_name = os.getenv('DB_NAME', 'medicine_shop')
-    db_user = os.getenv('DB_USER', 'postgres')
-    db_password = os.getenv('DB_PASSWORD', '')
+MIGRATIONS_DIR = Path(__file__).parent / 'migrations'
+# Session advisory lock held by whoever bootstraps or migrates the schema
+SCHEMA_LOCK_KEY = 7201540
+# First line of a migration that must run outside a transaction
+NO_TRANSACTION_MARKER = '-- migrate:no-transaction'
+# Name of the index a concurrent build creates
+CONCURRENT_INDEX = re.compile(
+    r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)', re.IGNORECASE
+)
 
-    logger.info(f"Connecting to database: {db_host}:{db_port}/{db_name}")
+def split_statements(sql: str) -> List[str]:
+    """Split a migration of plain statements (no function bodies) on semicolons"""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith('--')]
+    return [statement.strip() for statement in '\n'.join(lines).split(';') if statement.strip()]
 
-    try:
-        # Create connection
-        conn = await asyncpg.connect(
-            host=db_host,
-            port=db_port,
-            database=db_name,
-            user=db_user,
-            password=db_password
-        )
+def migration_order(path: Path):
+    """Sort key: the original unnumbered migrations by name, then NNN_*.sql by number"""
+    prefix = path.name.split('_', 1)[0]
+    if prefix.isdigit():
+        return (1, int(prefix), path.name)
+    return (0, 0, path.name)
+
+def is_legacy(path: Path) -> bool:
+    """Whether a file is one of the original unnumbered migrations"""
+    return migration_order(path)[0] == 0
+
+def migration_files() -> List[Path]:
+    """All migration files in the order they are applied"""
+    return sorted(MIGRATIONS_DIR.glob('*.sql'), key=migration_order)
 
+async def invalid_indexes(conn: asyncpg.Connection, names: List[str]) -> List[str]:
+    """Those of the named indexes that exist but are marked INVALID"""
+    rows = await conn.fetch('''
+        SELECT name FROM unnest($1::text[]) AS name
+        JOIN pg_index ON pg_index.indexrelid = to_regclass(name)
+        WHERE NOT pg_index.indisvalid
+    ''', names)
+    return [row['name'] for row in rows]
+
+async def run_no_transaction_statement(conn: asyncpg.Connection, statement: str) -> List[str]:
+    """Run one statement of a no-transaction migration; returns the index it builds, if any"""
+    match = CONCURRENT_INDEX.match(statement)
+    if match is None:
+        await conn.execute(statement)
+        return []
+    # An interrupted concurrent build leaves an INVALID index behind, which
+    # IF NOT EXISTS would keep: drop it and build it again
+    name = match.group(1)
+    if await invalid_indexes(conn, [name]):
+        logger.warning(f"Dropping invalid index {name} left by an interrupted build")
+        await conn.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+    await conn.execute(statement)
+    return [name]
+
+# The schema version is the number of the newest NNN_*.sql migration;
+# instances only serve once this script has brought the database to it
+SCHEMA_VERSION = max((migration_order(path)[1] for path in migration_files()), default=0)
+
+async def apply_migrations(conn: asyncpg.Connection, fresh: bool = False):
+    """Apply every migration not yet recorded, holding the schema lock"""
+    await conn.execute('SELECT pg_advisory_lock($1)', SCHEMA_LOCK_KEY)
+    try:
         # Create migrations table if it doesn't exist
         await conn.execute('''
             CREATE TABLE IF NOT EXISTS migrations (
@@ -42,29 +85,82 @@ async def run_migrations():
         applied_migrations = await conn.fetch('SELECT filename FROM migrations')
         applied_filenames = {row['filename'] for row in applied_migrations}
 
-        # Get all migration files
-        migrations_dir = Path(__file__).parent / 'migrations'
-        migration_files = sorted([f for f in migrations_dir.glob('*.sql')])
-
         # Run each migration that hasn't been applied
-        for migration_file in migration_files:
+        for migration_file in migration_files():
             filename = migration_file.name
-            if filename not in applied_filenames:
+            if filename in applied_filenames:
+                logger.info(f"Skipping already applied migration: {filename}")
+            elif is_legacy(migration_file) and not fresh:
+                # The unnumbered files were applied by hand before they were
+                # recorded, and add_invoice_item_fields.sql starts by dropping
+                # invoice_items: on an existing database they are only
+                # recorded, never run
+                await conn.execute('INSERT INTO migrations (filename) VALUES ($1)', filename)
+                logger.info(f"Recorded legacy migration as applied without running it: {filename}")
+            else:
                 logger.info(f"Applying migration: {filename}")
                 
                 # Read and execute migration
                 sql = migration_file.read_text()
-                async with conn.transaction():
-                    await conn.execute(sql)
+                if sql.startswith(NO_TRANSACTION_MARKER):
+                    # Statements such as CREATE INDEX CONCURRENTLY cannot run
+                    # inside a transaction block, so run them one at a time
+                    indexes = []
+                    for statement in split_statements(sql):
+                        indexes += await run_no_transaction_statement(conn, statement)
+                    invalid = await invalid_indexes(conn, indexes)
+                    if invalid:
+                        raise RuntimeError(
+                            f"{filename} left invalid indexes ({', '.join(invalid)}); not recording it"
+                        )
                     await conn.execute(
                         'INSERT INTO migrations (filename) VALUES ($1)',
                         filename
                     )
+                else:
+                    async with conn.transaction():
+                        await conn.execute(sql)
+                        await conn.execute(
+                            'INSERT INTO migrations (filename) VALUES ($1)',
+                            filename
+                        )
                 logger.info(f"✅ Successfully applied migration: {filename}")
-            else:
-                logger.info(f"Skipping already applied migration: {filename}")
+    finally:
+        await conn.execute('SELECT pg_advisory_unlock($1)', SCHEMA_LOCK_KEY)
+
+async def run_migrations():
+    """Create the tables, run all migration scripts in order and record the schema version"""
+    # Imported here: database imports this module for the schema version
+    import database
+    import passwords
+
+    # Database configuration
+    db_host = os.getenv('DB_HOST', 'localhost')
+    db_port = int(os.getenv('DB_PORT', '5432'))
+    db_name = os.getenv('DB_NAME', 'medicine_shop')
+    db_user = os.getenv('DB_USER', 'postgres')
+    db_password = await get_secret('db-password') or ''
+
+    logger.info(f"Connecting to database: {db_host}:{db_port}/{db_name}")
+
+    try:
+        # Create connection
+        conn = await asyncpg.connect(
+            host=db_host,
+            port=db_port,
+            database=db_name,
+            user=db_user,
+            password=db_password,
+            # Index builds and table rewrites run for as long as they need;
+            # the API's DB_COMMAND_TIMEOUT would cancel them client-side
+            command_timeout=None
+        )
 
-        await conn.close()
+        try:
+            await database.bootstrap_schema(conn)
+        finally:
+            await conn.close()
+            passwords.shutdown()
         logger.info("✅ All migrations completed successfully")
 
     except Exception as e:
@@ -72,4 +168,6 @@ async def run_migrations():
         raise
 
 if __name__ == '__main__':
-    asyncio.run(run_migrations()) 
\ No newline at end of file
+    # Set up logging
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_migrations())
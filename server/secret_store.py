@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Backends tried in order until one has the secret
+SECRET_PROVIDERS = os.getenv('SECRET_PROVIDERS', 'env,file,gcp')
+# Directory where secrets are mounted as files, one file per secret id
+SECRETS_DIR = os.getenv('SECRETS_DIR', '/secrets')
+GCP_PROJECT = os.getenv('GCP_PROJECT', 'galvanic-vim-464504-n5')
+# Seconds a resolved secret is reused before it is looked up again
+SECRET_CACHE_TTL = float(os.getenv('SECRET_CACHE_TTL', '300'))
+
+class EnvSecretProvider:
+    """Secrets from environment variables: db-password is read from DB_PASSWORD"""
+
+    name = 'env'
+
+    async def get(self, secret_id: str) -> Optional[str]:
+        return os.environ.get(secret_id.upper().replace('-', '_'))
+
+class FileSecretProvider:
+    """Secrets mounted as files, as Cloud Run and Kubernetes volume mounts do"""
+
+    name = 'file'
+
+    def __init__(self, directory: str = SECRETS_DIR):
+        self.directory = Path(directory)
+
+    def _read(self, secret_id: str) -> Optional[str]:
+        path = self.directory / secret_id
+        if not path.is_file():
+            return None
+        return path.read_text(encoding='utf-8').rstrip('\n')
+
+    async def get(self, secret_id: str) -> Optional[str]:
+        return await asyncio.get_running_loop().run_in_executor(None, self._read, secret_id)
+
+class GcpSecretProvider:
+    """Google Cloud Secret Manager, with the client library imported on first use"""
+
+    name = 'gcp'
+
+    def __init__(self, project: str = GCP_PROJECT):
+        self.project = project
+        self._client = None
+
+    async def get(self, secret_id: str) -> Optional[str]:
+        if self._client is None:
+            try:
+                from google.cloud import secretmanager
+            except ImportError:
+                logger.warning("google-cloud-secret-manager is not installed; skipping Secret Manager")
+                return None
+            self._client = secretmanager.SecretManagerServiceAsyncClient()
+        name = f"projects/{self.project}/secrets/{secret_id}/versions/latest"
+        response = await self._client.access_secret_version(request={"name": name})
+        return response.payload.data.decode("UTF-8")
+
+PROVIDER_TYPES = {
+    provider.name: provider
+    for provider in (EnvSecretProvider, FileSecretProvider, GcpSecretProvider)
+}
+
+class SecretStore:
+    """Resolves secrets through a chain of providers and caches them for a TTL"""
+
+    def __init__(self, providers: List[object], ttl: float = SECRET_CACHE_TTL):
+        self.providers = providers
+        self.ttl = ttl
+        self._cache: Dict[str, Tuple[float, str]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def get(self, secret_id: str) -> Optional[str]:
+        """Return the secret value, or None when no provider has it"""
+        cached = self._cache.get(secret_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        # Concurrent callers share one lookup per secret
+        lock = self._locks.setdefault(secret_id, asyncio.Lock())
+        async with lock:
+            cached = self._cache.get(secret_id)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+            for provider in self.providers:
+                try:
+                    value = await provider.get(secret_id)
+                except Exception as e:
+                    logger.error(f"Failed to get secret {secret_id} from {provider.name}: {e}")
+                    continue
+                if value is not None:
+                    self._cache[secret_id] = (time.monotonic() + self.ttl, value)
+                    return value
+        return None
+
+    def clear(self):
+        self._cache.clear()
+
+def providers_from_config(config: str = SECRET_PROVIDERS) -> List[object]:
+    """Instantiate the providers named in a comma separated list"""
+    providers = []
+    for name in (part.strip() for part in config.split(',')):
+        if not name:
+            continue
+        if name not in PROVIDER_TYPES:
+            raise ValueError(f"Unknown secret provider: {name}. Use one of: {', '.join(PROVIDER_TYPES)}")
+        providers.append(PROVIDER_TYPES[name]())
+    return providers
+
+secret_store = SecretStore(providers_from_config())
+
+async def get_secret(secret_id: str) -> Optional[str]:
+    """Get a secret from the configured providers"""
+    return await secret_store.get(secret_id)
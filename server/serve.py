@@ -0,0 +1,119 @@
+"""
+Multi-process launcher: runs uvicorn with one worker per available CPU.
+
+Before any worker starts, the parent process splits the database connection
+budget across the workers so that their pools together stay under the
+server's max_connections. Everything else, including waiting for the
+database, happens in each worker's background warm-up, so the port is bound
+right away. The schema is left to run_migrations.py.
+
+    cd server && python serve.py
+"""
+
+import asyncio
+import logging
+import os
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Worker processes; defaults to the CPUs this process may run on
+WEB_CONCURRENCY = os.getenv('WEB_CONCURRENCY')
+# Connections all workers of this instance may hold together; when unset
+# it is derived from max_connections less DB_CONNECTION_RESERVE
+DB_CONNECTION_BUDGET = os.getenv('DB_CONNECTION_BUDGET')
+# Connections left for other instances, admin sessions and migrations
+DB_CONNECTION_RESERVE = int(os.getenv('DB_CONNECTION_RESERVE', '5'))
+# max_connections assumed when the database cannot be asked at launch
+DB_MAX_CONNECTIONS_FALLBACK = int(os.getenv('DB_MAX_CONNECTIONS_FALLBACK', '100'))
+# Seconds the launcher waits for the database before using the fallback
+DB_PROBE_TIMEOUT = float(os.getenv('DB_PROBE_TIMEOUT', '10'))
+
+def available_cpus() -> int:
+    """CPUs this process may be scheduled on, honouring affinity masks"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+def worker_count() -> int:
+    return max(1, int(WEB_CONCURRENCY) if WEB_CONCURRENCY else available_cpus())
+
+def pool_size_per_worker(workers: int, max_connections: int) -> int:
+    """Largest pool each worker can open without the instance exceeding its budget"""
+    import catalog
+    import database
+
+    if DB_CONNECTION_BUDGET:
+        budget = int(DB_CONNECTION_BUDGET)
+    else:
+        budget = max_connections - DB_CONNECTION_RESERVE
+    if catalog.CATALOG_ENABLED:
+        # Each worker also holds a connection listening for inventory changes
+        budget -= workers
+    # A read pool on another database of the same server shares its budget;
+    # a replica has its own max_connections, at least the primary's
+    pools = 2 if database.READ_POOL_ENABLED and not database.DB_READ_HOST else 1
+    per_worker = budget // (workers * pools)
+    if per_worker < 1:
+        raise SystemExit(
+            f"A connection budget of {budget} cannot serve {workers} workers; "
+            f"lower WEB_CONCURRENCY or raise DB_CONNECTION_BUDGET"
+        )
+    # DB_POOL_MAX_SIZE stays the ceiling when the budget would allow more
+    return min(database.DB_POOL_MAX_SIZE, per_worker)
+
+async def read_max_connections() -> int:
+    """Usable max_connections of the database, or the fallback when it is not reachable"""
+    import database
+
+    try:
+        return await asyncio.wait_for(database.max_usable_connections(), DB_PROBE_TIMEOUT)
+    except Exception as e:
+        logger.warning(
+            f"Could not read max_connections ({e or type(e).__name__}); "
+            f"assuming {DB_MAX_CONNECTIONS_FALLBACK}"
+        )
+        return DB_MAX_CONNECTIONS_FALLBACK
+
+def main():
+    import uvicorn
+
+    logging.basicConfig(level=logging.INFO)
+
+    workers = worker_count()
+    # An explicit budget needs nothing from the database
+    max_connections = 0 if DB_CONNECTION_BUDGET else asyncio.run(read_max_connections())
+
+    # Settings are read at import, and each worker imports the app afresh
+    # with this environment
+    pool_max = pool_size_per_worker(workers, max_connections)
+    os.environ['DB_POOL_MAX_SIZE'] = str(pool_max)
+    os.environ['DB_POOL_MIN_SIZE'] = str(min(int(os.getenv('DB_POOL_MIN_SIZE', '1')), pool_max))
+    read_pool_max = min(int(os.getenv('DB_READ_POOL_MAX_SIZE', str(pool_max))), pool_max)
+    os.environ['DB_READ_POOL_MAX_SIZE'] = str(read_pool_max)
+    os.environ.setdefault('PASSWORD_HASH_WORKERS', str(max(1, available_cpus() // workers)))
+    if workers == 1:
+        # uvicorn serves a single worker from this process, where database
+        # was already imported with the old values
+        import database
+        database.DB_POOL_MAX_SIZE = pool_max
+        database.DB_POOL_MIN_SIZE = int(os.environ['DB_POOL_MIN_SIZE'])
+        database.DB_READ_POOL_MAX_SIZE = read_pool_max
+    logger.info(f"Starting {workers} workers with up to {pool_max} database connections each")
+
+    uvicorn.run(
+        "main:app",
+        host=os.getenv('HOST', '0.0.0.0'),
+        port=int(os.getenv('PORT', '8080')),
+        workers=workers,
+        timeout_keep_alive=75,
+        log_level="info"
+    )
+
+if __name__ == '__main__':
+    main()
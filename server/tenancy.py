@@ -0,0 +1,17 @@
+from fastapi import Depends, Request
+
+import database
+from routers.auth import get_tenant_id
+
+async def get_tenant_db(tenant_id: int = Depends(get_tenant_id)):
+    """Dependency to get a primary connection scoped to the caller's shop"""
+    async with database.checkout(database.pool, tenant_id) as conn:
+        yield conn
+
+# Routes that modify data, or must see their own writes, use the primary
+get_write_db = get_tenant_db
+
+async def get_read_db(request: Request, tenant_id: int = Depends(get_tenant_id)):
+    """Dependency to get a connection for reads: the replica unless the client just wrote"""
+    async with database.checkout(database.read_source(request), tenant_id) as conn:
+        yield conn
@@ -0,0 +1,54 @@
+"""
+Token revocation: a password change refuses the tokens issued before it,
+here at once and on other instances once their token cache lets go. The API
+tests need a database; see conftest.py.
+"""
+
+import time
+
+import pytest
+
+import token_cache
+from token_cache import TokenCache
+
+def test_cached_token_is_rechecked_after_the_ttl(monkeypatch):
+    monkeypatch.setattr(token_cache, 'TOKEN_CACHE_TTL', 60.0)
+    cache = TokenCache()
+    cache.put_claims('token', {'id': 1, 'exp': time.time() + 24 * 3600})
+    assert cache._entries[cache._key('token')].expires_at <= time.time() + 60
+
+    monkeypatch.setattr(token_cache, 'TOKEN_CACHE_TTL', 0.0)
+    cache.put_claims('token', {'id': 1, 'exp': time.time() + 24 * 3600})
+    assert cache.get_claims('token') is None
+
+@pytest.mark.anyio
+async def test_password_change_revokes_earlier_tokens(client, make_shop):
+    _, headers = await make_shop()
+    assert (await client.get('/api/auth/me', headers=headers)).status_code == 200
+
+    response = await client.put(
+        '/api/auth/change-password',
+        json={'current_password': 'test-password', 'new_password': 'new-password'},
+        headers=headers
+    )
+    assert response.status_code == 200
+    new_headers = {'Authorization': f"Bearer {response.json()['token']}"}
+
+    response = await client.get('/api/auth/me', headers=headers)
+    assert response.status_code == 401
+    assert response.json()['detail'] == "Token has been revoked, please sign in again"
+    assert (await client.get('/api/auth/me', headers=new_headers)).status_code == 200
+
+@pytest.mark.anyio
+async def test_change_through_another_instance_is_seen(db, client, make_shop, monkeypatch):
+    # Another instance changed the password; this one only has its cache
+    monkeypatch.setattr(token_cache, 'TOKEN_CACHE_TTL', 0.0)
+    shop, headers = await make_shop()
+    assert (await client.get('/api/auth/me', headers=headers)).status_code == 200
+
+    async with db.checkout(db.pool) as conn:
+        await conn.execute(
+            'UPDATE users SET token_version = token_version + 1 WHERE id = $1', shop['admin']['id']
+        )
+
+    assert (await client.get('/api/auth/me', headers=headers)).status_code == 401
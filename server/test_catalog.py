@@ -0,0 +1,202 @@
+"""
+Unit tests for the in-process inventory catalog (catalog.py); no database needed.
+
+    cd server && python -m pytest -q test_catalog.py
+"""
+
+import json
+
+import pytest
+
+import catalog
+
+def make_item(item_id: int, name: str) -> catalog.CatalogItem:
+    values = {'id': item_id, 'name': name, 'tenant_id': 1}
+    return catalog.CatalogItem(tuple(values.get(column) for column in catalog.CATALOG_COLUMNS))
+
+def make_shop(*names: str, ready: bool = True) -> catalog.ShopCatalog:
+    shop = catalog.ShopCatalog()
+    for item_id, name in enumerate(names, start=1):
+        shop.put(make_item(item_id, name))
+    shop.ready = ready
+    return shop
+
+def notify(tenant_id=None, ids=None):
+    change = {}
+    if tenant_id is not None:
+        change['tenant_id'] = tenant_id
+    if ids is not None:
+        change['ids'] = ids
+    catalog._on_notification(None, 0, catalog.CATALOG_CHANNEL, json.dumps(change))
+
+class FakeRequest:
+    def __init__(self, cookies=None):
+        self.cookies = cookies or {}
+
+@pytest.fixture(autouse=True)
+def catalog_state(monkeypatch):
+    """Fresh module state, with spawned loads and refreshes recorded instead of run"""
+    spawned = []
+
+    def spawn(coro):
+        spawned.append(coro.cr_code.co_name)
+        coro.close()
+
+    monkeypatch.setattr(catalog, '_shops', catalog.OrderedDict())
+    monkeypatch.setattr(catalog, '_oversized', set())
+    monkeypatch.setattr(catalog, '_loading', set())
+    monkeypatch.setattr(catalog, '_backoff', {})
+    monkeypatch.setattr(catalog, '_listening', True)
+    monkeypatch.setattr(catalog, '_spawn', spawn)
+    return spawned
+
+def test_prefix_returns_matches_in_name_order():
+    shop = make_shop('Paracetamol 650', 'Amoxicillin', 'paracetamol 500', 'Pantoprazole')
+    assert [item.name for item in shop.prefix('para', 10)] == ['paracetamol 500', 'Paracetamol 650']
+    assert [item.name for item in shop.prefix('pa', 10)] == ['Pantoprazole', 'paracetamol 500', 'Paracetamol 650']
+
+def test_prefix_stops_at_limit_and_on_no_match():
+    shop = make_shop('Dolo 1', 'Dolo 2', 'Dolo 3')
+    assert [item.id for item in shop.prefix('dolo', 2)] == [1, 2]
+    assert shop.prefix('zz', 10) == []
+    assert shop.prefix('dolo 4', 10) == []
+
+def test_put_replaces_a_renamed_item():
+    shop = make_shop('Cetirizine', 'Amlodipine')
+    shop.put(make_item(1, 'Zyrtec'))
+    assert len(shop.items) == 2
+    assert shop.names == [('amlodipine', 2), ('zyrtec', 1)]
+    assert shop.prefix('cet', 10) == []
+    assert shop.get(1).name == 'Zyrtec'
+
+def test_remove_keeps_names_in_step_with_items():
+    shop = make_shop('Losartan', 'Losartan', 'Metformin')
+    shop.remove(1)
+    shop.remove(42)
+    assert set(shop.items) == {2, 3}
+    assert shop.names == [('losartan', 2), ('metformin', 3)]
+
+def test_load_replaces_items_and_sorts_names():
+    class Row(tuple):
+        """Stands in for asyncpg.Record: iterates values, indexes by column"""
+        def __getitem__(self, key):
+            if isinstance(key, str):
+                key = catalog.CATALOG_COLUMNS.index(key)
+            return tuple.__getitem__(self, key)
+
+    def row(item_id, name):
+        values = {'id': item_id, 'name': name}
+        return Row(values.get(column) for column in catalog.CATALOG_COLUMNS)
+
+    shop = make_shop('Old')
+    shop.load([row(7, 'Zinc'), row(3, 'azithromycin')])
+    assert set(shop.items) == {3, 7}
+    assert shop.names == [('azithromycin', 3), ('zinc', 7)]
+
+def test_notification_with_ids_refreshes_a_loaded_shop(catalog_state):
+    shop = catalog._shops[1] = make_shop('Dolo')
+    notify(1, [1, 5])
+    assert shop.pending == {1, 5}
+    assert shop.refreshing
+    assert catalog_state == ['_refresh']
+    # A second change while refreshing is picked up by the same refresh
+    notify(1, [6])
+    assert shop.pending == {1, 5, 6}
+    assert catalog_state == ['_refresh']
+
+def test_notification_while_loading_waits_for_the_load(catalog_state):
+    shop = catalog._shops[1] = make_shop(ready=False)
+    notify(1, [3])
+    assert shop.pending == {3}
+    assert not shop.refreshing
+    assert catalog_state == []
+
+def test_notification_without_ids_drops_the_shop():
+    catalog._shops[1] = make_shop('Dolo')
+    catalog._shops[2] = make_shop('Dolo')
+    notify(1)
+    assert list(catalog._shops) == [2]
+
+def test_truncate_notification_drops_every_shop():
+    catalog._shops[1] = make_shop('Dolo')
+    catalog._shops[2] = make_shop('Dolo')
+    notify()
+    assert not catalog._shops
+
+def test_notification_for_an_unloaded_shop_is_ignored(catalog_state):
+    catalog._shops[1] = make_shop('Dolo')
+    notify(2, [1])
+    assert list(catalog._shops) == [1]
+    assert catalog_state == []
+
+def test_lookup_loads_on_first_use_and_serves_once_ready(catalog_state):
+    assert catalog.lookup(FakeRequest(), 1) is None
+    assert catalog_state == ['_load']
+    catalog._shops[1].ready = True
+    assert catalog.lookup(FakeRequest(), 1) is catalog._shops[1]
+
+def test_lookup_skips_the_catalog_for_pinned_clients_and_when_not_listening(monkeypatch):
+    catalog._shops[1] = make_shop('Dolo')
+    assert catalog.lookup(FakeRequest({catalog.database.DB_READ_PIN_COOKIE: '1'}), 1) is None
+    monkeypatch.setattr(catalog, '_listening', False)
+    assert catalog.lookup(FakeRequest(), 1) is None
+
+def test_evict_drops_least_recently_used_shops(monkeypatch):
+    monkeypatch.setattr(catalog, 'CATALOG_MAX_ITEMS', 5)
+    for tenant_id in (1, 2, 3):
+        catalog._shops[tenant_id] = make_shop('A', 'B')
+    catalog.lookup(FakeRequest(), 1)
+    catalog._evict(catalog._shops[3])
+    assert list(catalog._shops) == [3, 1]
+
+def test_evict_keeps_the_shop_just_loaded_and_shops_still_loading(monkeypatch):
+    monkeypatch.setattr(catalog, 'CATALOG_MAX_ITEMS', 2)
+    catalog._shops[1] = make_shop(ready=False)
+    catalog._shops[2] = make_shop('A', 'B')
+    catalog._shops[3] = make_shop('A', 'B', 'C')
+    catalog._evict(catalog._shops[3])
+    assert list(catalog._shops) == [1, 3]
+
+def test_oversized_shop_is_not_loaded_again(catalog_state):
+    catalog._oversized.add(1)
+    assert catalog.lookup(FakeRequest(), 1) is None
+    assert catalog_state == []
+
+def test_shop_dropped_while_loading_is_not_loaded_twice(catalog_state):
+    catalog.lookup(FakeRequest(), 1)
+    notify()
+    assert catalog.lookup(FakeRequest(), 1) is None
+    assert catalog_state == ['_load']
+
+@pytest.mark.anyio
+async def test_failed_loads_back_off(catalog_state, monkeypatch):
+    monkeypatch.setattr(catalog, 'CATALOG_RETRY_SECONDS', 1.0)
+    monkeypatch.setattr(catalog, 'CATALOG_RETRY_MAX_SECONDS', 3.0)
+    now = [100.0]
+    monkeypatch.setattr(catalog.time, 'monotonic', lambda: now[0])
+    # No pool: every load fails as it would with the database unreachable
+    monkeypatch.setattr(catalog.database, 'pool', None)
+
+    async def lookup_and_load():
+        loads = len(catalog_state)
+        catalog.lookup(FakeRequest(), 1)
+        if len(catalog_state) > loads:
+            await catalog._load(1, catalog._shops[1])
+
+    await lookup_and_load()
+    assert catalog_state == ['_load']
+    assert 1 not in catalog._shops and 1 not in catalog._loading
+
+    # Lookups during the delay go to the database without loading
+    for _ in range(10):
+        await lookup_and_load()
+    assert catalog_state == ['_load']
+
+    # The delay doubles after each failure, up to the maximum
+    for attempts, delay in enumerate((1.0, 2.0, 3.0, 3.0), start=1):
+        now[0] += delay - 0.01
+        await lookup_and_load()
+        assert len(catalog_state) == attempts
+        now[0] += 0.01
+        await lookup_and_load()
+        assert len(catalog_state) == attempts + 1
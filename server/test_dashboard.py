@@ -0,0 +1,35 @@
+"""
+Dashboard stats cache (routers/dashboard.py): bounded however many
+expiring_days values clients ask for.
+"""
+
+import pytest
+
+from routers import dashboard
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(dashboard, 'DASHBOARD_CACHE_TTL', 60.0)
+    monkeypatch.setattr(dashboard, 'DASHBOARD_CACHE_SIZE', 3)
+    dashboard._stats_cache.clear()
+    yield
+    dashboard._stats_cache.clear()
+
+def test_cache_keeps_at_most_its_size():
+    for expiring_days in range(366):
+        dashboard._cache_stats((1, expiring_days), {'expiring_count': expiring_days})
+    assert list(dashboard._stats_cache) == [(1, 363), (1, 364), (1, 365)]
+
+def test_least_recently_used_is_evicted_first():
+    for expiring_days in (7, 30, 90):
+        dashboard._cache_stats((1, expiring_days), {'expiring_count': expiring_days})
+    assert dashboard._cached_stats((1, 7)) == {'expiring_count': 7}
+
+    dashboard._cache_stats((2, 30), {'expiring_count': 0})
+    assert dashboard._cached_stats((1, 30)) is None
+    assert dashboard._cached_stats((1, 7)) == {'expiring_count': 7}
+
+def test_expired_stats_are_dropped():
+    dashboard._stats_cache[(1, 30)] = (0.0, {'expiring_count': 1})
+    assert dashboard._cached_stats((1, 30)) is None
+    assert not dashboard._stats_cache
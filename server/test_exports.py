@@ -0,0 +1,46 @@
+"""
+Streamed exports (exports.py): refused before the response starts while the
+database is not ready, then streamed through the API. The API test needs a
+database; see conftest.py.
+"""
+
+import csv
+import io
+
+import pytest
+from fastapi import HTTPException
+
+import database
+from exports import ExportQuery, export_response
+
+pytestmark = pytest.mark.anyio
+
+async def test_export_is_refused_until_the_pool_is_ready(monkeypatch):
+    monkeypatch.setattr(database, 'pool', None)
+    monkeypatch.setattr(database, 'read_pool', None)
+    query = ExportQuery('inventory', {'id': 'id'}, order_by='id')
+
+    with pytest.raises(HTTPException) as error:
+        await export_response(query, 'csv', 'inventory', 1)
+    assert error.value.status_code == 503
+    assert error.value.headers == {'Retry-After': '1'}
+
+async def test_unknown_format_is_rejected():
+    query = ExportQuery('inventory', {'id': 'id'}, order_by='id')
+    with pytest.raises(HTTPException) as error:
+        await export_response(query, 'xlsx', 'inventory', 1)
+    assert error.value.status_code == 400
+
+async def test_inventory_export_streams_the_shops_rows(client, make_shop):
+    _, headers = await make_shop()
+    for name in ('Cetirizine', 'Amoxicillin 250'):
+        response = await client.post('/api/inventory', json={'name': name, 'unit_price': 1.5}, headers=headers)
+        assert response.status_code == 200
+
+    response = await client.get('/api/inventory/export', params={'columns': 'name,unit_price'}, headers=headers)
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    assert list(csv.reader(io.StringIO(response.text))) == [
+        ['name', 'unit_price'], ['Cetirizine', '1.50'], ['Amoxicillin 250', '1.50']
+    ]
@@ -0,0 +1,77 @@
+"""
+CSV import through POST /api/inventory/import: the counts it reports and
+the upsert on (name, batch number). Needs a database; see conftest.py.
+"""
+
+import asyncio
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+async def import_csv(client, headers, text: str) -> dict:
+    response = await client.post(
+        '/api/inventory/import',
+        files={'file': ('items.csv', text.encode('utf-8'), 'text/csv')},
+        headers=headers
+    )
+    assert response.status_code == 200, response.text
+    return response.json()['data']
+
+async def list_items(client, headers) -> dict:
+    body = (await client.get('/api/inventory', params={'limit': 500}, headers=headers)).json()
+    return {(item['name'], item['batch_number']): item for item in body['data']}
+
+async def test_import_counts(client, make_shop):
+    _, headers = await make_shop()
+    response = await client.post(
+        '/api/inventory',
+        json={'name': 'Paracetamol 500', 'unit_price': 2.0, 'quantity': 5, 'batch_number': 'B1'},
+        headers=headers
+    )
+    assert response.status_code == 200
+
+    result = await import_csv(client, headers, (
+        "name,unit_price,quantity,batch_number\n"
+        "Paracetamol 500,2.5,40,B1\n"
+        "Amoxicillin 250,5,10,A1\n"
+        "Cetirizine,1.2,-3,\n"
+        "Ibuprofen 400,3,5,\n"
+        "Ibuprofen 400,3.2,7,\n"
+    ))
+
+    assert {key: result[key] for key in ('inserted', 'updated', 'rejected', 'duplicates')} == {
+        'inserted': 2, 'updated': 1, 'rejected': 1, 'duplicates': 1
+    }
+    assert result['errors'] == [{'line': 4, 'error': 'quantity cannot be negative'}]
+    items = await list_items(client, headers)
+    assert set(items) == {('Paracetamol 500', 'B1'), ('Amoxicillin 250', 'A1'), ('Ibuprofen 400', None)}
+    assert items[('Paracetamol 500', 'B1')]['quantity'] == 40
+    assert items[('Ibuprofen 400', None)]['quantity'] == 7
+
+async def test_reimport_updates_every_row(client, make_shop):
+    _, headers = await make_shop()
+    text = "name,unit_price,quantity,batch_number\nAmoxicillin 250,5,10,A1\nCetirizine,1.2,3,\n"
+    assert (await import_csv(client, headers, text))['inserted'] == 2
+
+    result = await import_csv(client, headers, text)
+    assert (result['inserted'], result['updated']) == (0, 2)
+    assert len(await list_items(client, headers)) == 2
+
+async def test_concurrent_imports_add_an_item_once(client, make_shop):
+    _, headers = await make_shop()
+    text = "name,unit_price,quantity,batch_number\nAzithromycin 500,9,12,Z1\n"
+
+    results = await asyncio.gather(*(import_csv(client, headers, text) for _ in range(2)))
+
+    assert sorted((result['inserted'], result['updated']) for result in results) == [(0, 1), (1, 0)]
+    assert list(await list_items(client, headers)) == [('Azithromycin 500', 'Z1')]
+
+async def test_create_rejects_an_existing_name_and_batch(client, make_shop):
+    _, headers = await make_shop()
+    item = {'name': 'Cetirizine', 'unit_price': 1.2, 'quantity': 3}
+    assert (await client.post('/api/inventory', json=item, headers=headers)).status_code == 200
+
+    response = await client.post('/api/inventory', json=item, headers=headers)
+    assert response.status_code == 400
+    assert len(await list_items(client, headers)) == 1
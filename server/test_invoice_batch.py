@@ -0,0 +1,123 @@
+"""
+POST /api/invoices/batch: the per-record checks against the column bounds
+on their own, then per-record error reporting through the API. The API
+tests need a database; see conftest.py.
+"""
+
+import math
+
+import pytest
+from pydantic import ValidationError
+
+from routers.invoices import (
+    AMOUNT_LIMIT, CUSTOMER_NAME_MAX_LENGTH, CUSTOMER_PHONE_MAX_LENGTH, PERCENTAGE_LIMIT, QUANTITY_LIMIT,
+    Invoice, _batch_item_rows, _batch_record_error
+)
+
+def make_invoice(customer=None, **item) -> Invoice:
+    line = {'item_text': 'Syrup', 'quantity': 1, 'unit_price': 10.0, **item}
+    return Invoice(customer=customer or {'customer_name': 'Walk-in'}, items=[line])
+
+def record_error(invoice: Invoice):
+    rows, total_amount = _batch_item_rows(0, invoice)
+    return _batch_record_error(invoice, rows, total_amount)
+
+def test_item_rows_are_priced():
+    invoice = make_invoice(quantity=2, unit_price=50.0, discount_percentage=10, gst_percentage=5)
+    rows, total_amount = _batch_item_rows(7, invoice)
+    assert rows == [(7, 0, None, 'Syrup', 2, 50.0, 10, 10.0, 5, 4.5)]
+    assert total_amount == pytest.approx(94.5)
+
+@pytest.mark.parametrize('customer, item', [
+    ({'customer_name': 'N' * CUSTOMER_NAME_MAX_LENGTH, 'customer_phone': '9' * CUSTOMER_PHONE_MAX_LENGTH}, {}),
+    (None, {'quantity': QUANTITY_LIMIT - 1, 'unit_price': 0.0}),
+    (None, {'unit_price': AMOUNT_LIMIT - 0.01}),
+    (None, {'discount_percentage': PERCENTAGE_LIMIT - 0.01, 'gst_percentage': PERCENTAGE_LIMIT - 0.01}),
+])
+def test_record_within_bounds_is_accepted(customer, item):
+    assert record_error(make_invoice(customer=customer, **item)) is None
+
+@pytest.mark.parametrize('customer, message', [
+    ({'customer_name': 'N' * (CUSTOMER_NAME_MAX_LENGTH + 1)}, 'customer.customer_name'),
+    ({'customer_name': 'Walk-in', 'customer_phone': '9' * (CUSTOMER_PHONE_MAX_LENGTH + 1)}, 'customer.customer_phone'),
+    ({'customer_name': 'Walk-in', 'customer_email': 'e' * 300}, 'customer.customer_email'),
+])
+def test_oversized_new_customer_is_rejected(customer, message):
+    assert record_error(make_invoice(customer=customer)).startswith(message)
+
+def test_existing_customer_details_are_not_checked():
+    # Only a new customer is created from the record's details
+    customer = {'customer_id': 1, 'customer_name': 'N' * (CUSTOMER_NAME_MAX_LENGTH + 1)}
+    assert record_error(make_invoice(customer=customer)) is None
+
+@pytest.mark.parametrize('item, message', [
+    ({'quantity': QUANTITY_LIMIT}, 'items.0.quantity'),
+    ({'unit_price': AMOUNT_LIMIT}, 'items.0.unit_price'),
+    # Rounds up to the limit when stored at two decimals
+    ({'unit_price': AMOUNT_LIMIT - 0.001}, 'items.0.unit_price'),
+    ({'unit_price': math.inf}, 'items.0.unit_price'),
+    ({'unit_price': math.nan}, 'items.0.unit_price'),
+    ({'discount_amount': AMOUNT_LIMIT}, 'items.0.discount_amount'),
+    ({'gst_percentage': PERCENTAGE_LIMIT}, 'items.0.gst_percentage'),
+    ({'discount_percentage': -PERCENTAGE_LIMIT}, 'items.0.discount_percentage'),
+])
+def test_values_past_the_columns_are_rejected(item, message):
+    assert record_error(make_invoice(**item)).startswith(message)
+
+def test_total_past_the_column_is_rejected():
+    # Each line fits, their sum does not
+    invoice = Invoice(customer={'customer_name': 'Walk-in'}, items=[
+        {'item_text': 'Syrup', 'quantity': 1, 'unit_price': AMOUNT_LIMIT * 0.6},
+        {'item_text': 'Tablets', 'quantity': 1, 'unit_price': AMOUNT_LIMIT * 0.6},
+    ])
+    assert record_error(invoice).startswith('total_amount')
+
+@pytest.mark.parametrize('item', [{'quantity': 0}, {'quantity': -1}, {'unit_price': -0.01}])
+def test_negative_quantities_and_prices_fail_validation(item):
+    with pytest.raises(ValidationError):
+        make_invoice(**item)
+
+@pytest.mark.anyio
+async def test_batch_reports_errors_per_record(client, make_shop):
+    _, headers = await make_shop()
+    response = await client.post(
+        '/api/inventory',
+        json={'name': 'Paracetamol 500', 'unit_price': 2.0, 'quantity': 50},
+        headers=headers
+    )
+    item = response.json()['data']
+
+    def record(phone='9000000001', **line):
+        return {
+            'customer': {'customer_name': 'Walk-in', 'customer_phone': phone},
+            'items': [{'inventory_id': item['id'], 'quantity': 2, 'unit_price': 2.0, **line}]
+        }
+
+    response = await client.post('/api/invoices/batch', json={'invoices': [
+        record(),
+        record(quantity=-1),
+        'not an invoice',
+        record(phone='9' * (CUSTOMER_PHONE_MAX_LENGTH + 1)),
+        record(unit_price=AMOUNT_LIMIT),
+        record(inventory_id=2 ** 31 - 1),
+        record(quantity=3),
+    ]}, headers=headers)
+
+    assert response.status_code == 200
+    data = response.json()['data']
+    assert (data['created_count'], data['error_count']) == (2, 5)
+    assert [created['index'] for created in data['invoices']] == [0, 6]
+    assert [error['index'] for error in data['errors']] == [1, 2, 3, 4, 5]
+    errors = {error['index']: error['error'] for error in data['errors']}
+    assert 'quantity' in errors[1]
+    assert errors[2] == 'Invoice must be an object'
+    assert errors[3].startswith('customer.customer_phone')
+    assert errors[4].startswith('items.0.unit_price')
+    assert errors[5] == f"Inventory item {2 ** 31 - 1} not found"
+
+    # Both records share the new customer by phone, and only they sold stock
+    assert len({created['customer_id'] for created in data['invoices']}) == 1
+    stock = (await client.get(f"/api/inventory/{item['id']}", headers=headers)).json()['data']
+    assert stock['quantity'] == 45
+    invoice = (await client.get(f"/api/invoices/{data['invoices'][1]['invoice_id']}", headers=headers)).json()['data']
+    assert [line['quantity'] for line in invoice['items']] == [3]
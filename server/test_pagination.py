@@ -0,0 +1,85 @@
+"""
+Keyset pagination (pagination.py): cursors and query building on their own,
+then paging through the API. The API tests need a database; see conftest.py.
+"""
+
+from datetime import date, datetime
+
+import pytest
+from fastapi import HTTPException
+
+from pagination import KeysetQuery, PageParams, decode_cursor, encode_cursor
+
+# Tables listed in (created_at, id) keyset order by the list endpoints
+PAGED_TABLES = ['users', 'categories', 'inventory', 'customers', 'invoices', 'purchase_orders', 'bills']
+
+def page_params(limit=2, cursor=None, date_from=None, date_to=None) -> PageParams:
+    return PageParams(limit=limit, cursor=cursor, date_from=date_from, date_to=date_to)
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 3, 1, 9, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(created_at, 42)) == (created_at, 42)
+
+def test_missing_cursor_is_first_page():
+    assert decode_cursor(None) is None
+    assert decode_cursor('') is None
+
+@pytest.mark.parametrize('cursor', ['not base64!', 'bm8tc2VwYXJhdG9y', 'MjAyNC0wMy0wMXx4'])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+def test_first_page_orders_newest_first_and_fetches_one_extra():
+    query = KeysetQuery('SELECT * FROM customers')
+    sql = query.build(page_params(limit=2))
+    assert sql.endswith('ORDER BY created_at DESC, id DESC\nLIMIT $1')
+    assert query.args == [3]
+
+def test_next_page_starts_after_the_cursor():
+    position = (datetime(2024, 3, 1, 9, 30), 42)
+    query = KeysetQuery('SELECT * FROM invoices i', alias='i')
+    query.where_equal('i.status', 'paid')
+    sql = query.build(page_params(cursor=encode_cursor(*position), date_from=date(2024, 1, 1)))
+    assert 'i.status = $1' in sql
+    assert 'i.created_at >= $2::timestamp' in sql
+    assert '(i.created_at, i.id) < ($3::timestamp, $4::integer)' in sql
+    assert query.args == ['paid', datetime(2024, 1, 1), *position, 3]
+
+@pytest.mark.anyio
+async def test_paged_tables_have_created_at(db):
+    async with db.checkout(db.pool) as conn:
+        nullable = await conn.fetch('''
+            SELECT table_name FROM information_schema.columns
+            WHERE table_schema = 'public' AND column_name = 'created_at'
+              AND table_name = ANY($1::text[]) AND is_nullable = 'YES'
+        ''', PAGED_TABLES)
+    assert [row['table_name'] for row in nullable] == []
+
+@pytest.mark.anyio
+async def test_pages_cover_every_row_once(client, make_shop):
+    _, headers = await make_shop()
+    names = [f"Customer {number}" for number in range(5)]
+    for name in names:
+        response = await client.post('/api/customers', json={'name': name}, headers=headers)
+        assert response.status_code == 200
+
+    seen, cursor = [], None
+    while True:
+        params = {'limit': 2, **({'cursor': cursor} if cursor else {})}
+        body = (await client.get('/api/customers', params=params, headers=headers)).json()
+        assert len(body['data']) <= 2
+        seen += [customer['name'] for customer in body['data']]
+        cursor = body['next_cursor']
+        if cursor is None:
+            break
+    assert seen == list(reversed(names))
+
+@pytest.mark.anyio
+async def test_row_without_created_at_is_rejected(db, make_shop):
+    import asyncpg
+
+    shop, _ = await make_shop()
+    async with db.checkout(db.pool, shop['tenant']['id']) as conn:
+        with pytest.raises(asyncpg.NotNullViolationError):
+            await conn.execute("INSERT INTO customers (name, created_at) VALUES ('Legacy', NULL)")
@@ -0,0 +1,28 @@
+"""
+Invoice partition upkeep (partitions.py) against a real database; see
+conftest.py.
+"""
+
+import asyncpg
+import pytest
+
+import partitions
+
+pytestmark = pytest.mark.anyio
+
+async def test_lock_on_busy_invoices_gives_up(db, monkeypatch):
+    monkeypatch.setattr(partitions, 'PARTITION_LOCK_TIMEOUT', '100ms')
+    async with db.checkout(db.pool) as reader, db.checkout(db.pool) as maintainer:
+        # A long read, such as an export, holds invoices until it ends
+        async with reader.transaction():
+            await reader.fetch('SELECT id FROM invoices LIMIT 1')
+            with pytest.raises(asyncpg.LockNotAvailableError):
+                async with maintainer.transaction():
+                    await partitions.set_lock_timeout(maintainer)
+                    await maintainer.execute('LOCK TABLE invoices IN ACCESS EXCLUSIVE MODE')
+
+async def test_maintenance_runs_on_its_own_connection(db, monkeypatch):
+    # Nothing is taken from the request pool, even when it is gone
+    monkeypatch.setattr(db, 'pool', None)
+    result = await partitions.run_dedicated_maintenance()
+    assert set(result) == {'created', 'archived', 'frozen'}
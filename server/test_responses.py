@@ -0,0 +1,24 @@
+"""
+JSON responses rendered by orjson (responses.py).
+"""
+
+import json
+from decimal import Decimal
+
+import pytest
+
+from responses import json_response
+
+def rendered(content):
+    return json.loads(json_response(content).body)
+
+@pytest.mark.parametrize('value, expected', [
+    (Decimal('12'), 12),
+    (Decimal('1E+2'), 100),
+    (Decimal('12.50'), 12.5),
+    (Decimal('NaN'), None),
+    (Decimal('Infinity'), None),
+    (Decimal('-Infinity'), None),
+])
+def test_decimals(value, expected):
+    assert rendered({'amount': value}) == {'amount': expected}
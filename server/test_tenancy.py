@@ -0,0 +1,49 @@
+"""
+Shop isolation through the API: two shops onboarded with create_shop.py
+each see only their own rows. Needs a database; see conftest.py.
+"""
+
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+async def test_new_shop_gets_its_own_tenant_and_admin(make_shop):
+    first, _ = await make_shop('First shop')
+    second, _ = await make_shop('Second shop')
+
+    assert first['tenant']['id'] != second['tenant']['id']
+    assert first['admin']['role'] == 'admin'
+    assert first['admin']['tenant_id'] == first['tenant']['id']
+
+async def test_taken_login_creates_no_shop(db, make_shop):
+    from create_shop import create_shop
+
+    shop, _ = await make_shop()
+    admin = shop['admin']
+    async with db.checkout(db.pool) as conn:
+        tenants = await conn.fetchval('SELECT COUNT(*) FROM tenants')
+        with pytest.raises(ValueError):
+            await create_shop(conn, 'Copy', admin['username'], 'other@example.com', 'test-password')
+        assert await conn.fetchval('SELECT COUNT(*) FROM tenants') == tenants
+
+async def test_shops_do_not_see_each_others_rows(client, make_shop):
+    _, first = await make_shop('First shop')
+    _, second = await make_shop('Second shop')
+
+    response = await client.post('/api/customers', json={'name': 'First customer'}, headers=first)
+    assert response.status_code == 200
+    first_customer = response.json()['data']
+    response = await client.post('/api/customers', json={'name': 'Second customer'}, headers=second)
+    assert response.status_code == 200
+
+    listed = (await client.get('/api/customers', headers=first)).json()['data']
+    assert [customer['name'] for customer in listed] == ['First customer']
+    listed = (await client.get('/api/customers', headers=second)).json()['data']
+    assert [customer['name'] for customer in listed] == ['Second customer']
+
+    response = await client.get(f"/api/customers/{first_customer['id']}", headers=second)
+    assert response.status_code == 404
+    response = await client.delete(f"/api/customers/{first_customer['id']}", headers=second)
+    assert response.status_code == 404
+    response = await client.get(f"/api/customers/{first_customer['id']}", headers=first)
+    assert response.status_code == 200
@@ -0,0 +1,93 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import metrics
+
+# Verified tokens kept per process
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', '1024'))
+# Seconds a verified token is trusted before its user's token version is
+# read again; bounds how long a password change made through another
+# instance takes to sign sessions out here
+TOKEN_CACHE_TTL = float(os.getenv('TOKEN_CACHE_TTL', '60'))
+
+class _Entry:
+    __slots__ = ('claims', 'user', 'expires_at')
+
+    def __init__(self, claims: Dict[str, Any], expires_at: float):
+        self.claims = claims
+        self.user: Optional[Dict[str, Any]] = None
+        self.expires_at = expires_at
+
+class TokenCache:
+    """Bounded LRU of verified JWT claims and user rows, keyed by token digest"""
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[bytes, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        # Raw tokens are never kept in memory as dictionary keys
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def _live(self, key: bytes) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def get_claims(self, token: str) -> Optional[Dict[str, Any]]:
+        """Claims of a previously verified token that has not expired yet"""
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            entry = self._live(self._key(token))
+        metrics.increment('token_cache.hit' if entry else 'token_cache.miss')
+        return entry.claims if entry else None
+
+    def put_claims(self, token: str, claims: Dict[str, Any]):
+        """Remember a verified token for TOKEN_CACHE_TTL, or until its exp claim if sooner"""
+        if self.max_size <= 0 or 'exp' not in claims:
+            return
+        key = self._key(token)
+        expires_at = min(float(claims['exp']), time.time() + TOKEN_CACHE_TTL)
+        with self._lock:
+            self._entries[key] = _Entry(claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def get_user(self, token: str) -> Optional[Dict[str, Any]]:
+        """User row cached alongside a token"""
+        with self._lock:
+            entry = self._live(self._key(token))
+            return entry.user if entry else None
+
+    def put_user(self, token: str, user: Dict[str, Any]):
+        """Attach a user row to a cached token"""
+        with self._lock:
+            entry = self._live(self._key(token))
+            if entry is not None:
+                entry.user = user
+
+    def invalidate_user(self, user_id: int):
+        """Drop every cached token of a user, e.g. after a password or role change"""
+        with self._lock:
+            stale = [key for key, entry in self._entries.items() if entry.claims.get('id') == user_id]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+token_cache = TokenCache()